@@ -1,4 +1,13 @@
 # Initialize backend package
-from . import api
-from . import processors
-from . import storage
\ No newline at end of file
+# Subpackages are imported on first access (PEP 562), so importing one
+# module does not load the service, the PDF stack and every client
+import importlib
+
+_SUBPACKAGES = ("api", "processors", "storage")
+
+def __getattr__(name):
+    if name in _SUBPACKAGES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_SUBPACKAGES)
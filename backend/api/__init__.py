@@ -1,3 +1,14 @@
 # Initialize backend.api package
-from .cleanup_port import ensure_port_available
-from .document_processor_service import app
\ No newline at end of file
+# Exports are imported on first access (PEP 562) to keep startup cheap
+import importlib
+
+_EXPORTS = {
+    "app": ".document_processor_service"
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_EXPORTS)
@@ -0,0 +1,70 @@
+import asyncio
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+from backend.config import API_URL, BATCH_CONCURRENCY, DEFAULT_COLLECTION
+from backend.tracing import inject_headers, span
+import logging
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# (file name, raw bytes, content type)
+UploadItem = Tuple[str, bytes, str]
+
+async def _ingest_one(session: "aiohttp.ClientSession", api_url: str, item: UploadItem, collection: str) -> Dict[str, Any]:
+    filename, data, content_type = item
+    import aiohttp
+    form = aiohttp.FormData()
+    form.add_field("file", data, filename=filename, content_type=content_type)
+    form.add_field("collection", collection)
+    # Each task runs in its own context copy, so concurrent uploads get sibling spans
+    with span("batch.ingest_file", filename=filename):
+        async with session.post(f"{api_url}/ingest", data=form, headers=inject_headers()) as response:
+            if response.status != 200:
+                raise Exception(f"API Error ({response.status}): {await response.text()}")
+            return await response.json()
+
+async def ingest_files(
+    items: List[UploadItem],
+    collection: str = DEFAULT_COLLECTION,
+    api_url: str = API_URL,
+    concurrency: int = BATCH_CONCURRENCY,
+    on_start: Optional[Callable[[str], None]] = None,
+    on_done: Optional[Callable[[str, Optional[Dict[str, Any]], Optional[Exception]], None]] = None,
+    timeout: float = 300
+) -> Dict[str, Any]:
+    """Upload files to /ingest concurrently, at most `concurrency` at a time.
+
+    on_done is called as each file finishes (in completion order) with its
+    result or the exception that failed it; one failure does not stop the
+    rest of the batch. Returns {filename: result or exception}.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # Imported here: aiohttp is only needed once a batch is actually uploaded
+    import aiohttp
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=timeout)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(timeout=client_timeout, connector=connector) as session:
+        async with session.get(f"{api_url}/health", timeout=aiohttp.ClientTimeout(total=5)) as health:
+            if health.status != 200:
+                raise Exception("Document processing service is not available")
+
+        async def run(item: UploadItem):
+            async with semaphore:
+                if on_start:
+                    on_start(item[0])
+                try:
+                    return item[0], await _ingest_one(session, api_url, item, collection), None
+                except Exception as e:
+                    logger.error(f"Error ingesting {item[0]}: {e}")
+                    return item[0], None, e
+
+        results = {}
+        for finished in asyncio.as_completed([run(item) for item in items]):
+            filename, result, error = await finished
+            results[filename] = error if error is not None else result
+            if on_done:
+                on_done(filename, result, error)
+        return results
@@ -0,0 +1,170 @@
+import importlib.util
+import threading
+import time
+import httpx
+from typing import Dict, Optional
+from backend.config import (
+    API_URL,
+    SERVICE_TIMEOUT,
+    SERVICE_MAX_CONNECTIONS,
+    SERVICE_HEALTH_INTERVAL,
+    SERVICE_FAILURE_THRESHOLD,
+    SERVICE_RESET_TIMEOUT
+)
+from backend.tracing import inject_headers, span
+import logging
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 needs the optional h2 package; without it httpx keeps HTTP/1.1 keep-alive connections
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+class ServiceUnavailableError(Exception):
+    """Raised without a network round trip while the circuit to the service is open."""
+
+class ServiceClient:
+    """Process-wide pooled HTTP client for the API service with a circuit breaker.
+
+    Connections are kept alive and shared by every caller. Health is probed
+    by a background thread instead of before each request; after
+    failure_threshold consecutive failures the circuit opens and calls fail
+    fast until a probe (or a single trial request after reset_timeout)
+    succeeds. Only transport errors and gateway/overload statuses count as
+    failures; a 500 for one bad document says the service is up.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    FAILURE_STATUSES = frozenset({502, 503, 504})
+
+    def __init__(self, api_url: str = API_URL, timeout: float = SERVICE_TIMEOUT,
+                 max_connections: int = SERVICE_MAX_CONNECTIONS,
+                 health_interval: Optional[float] = SERVICE_HEALTH_INTERVAL,
+                 failure_threshold: int = SERVICE_FAILURE_THRESHOLD,
+                 reset_timeout: float = SERVICE_RESET_TIMEOUT,
+                 transport: Optional[httpx.BaseTransport] = None):
+        self.api_url = api_url.rstrip("/")
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.client = httpx.Client(
+            base_url=self.api_url,
+            timeout=timeout,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            # Only connection failures are retried; a request that reached the service is not resent
+            transport=transport or httpx.HTTPTransport(retries=2, http2=HTTP2_AVAILABLE)
+        )
+        self.state = self.CLOSED
+        self.healthy: Optional[bool] = None
+        self.last_health_check: Optional[float] = None
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._health_thread = None
+        if health_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_interval,), name="service-health", daemon=True
+            )
+            self._health_thread.start()
+
+    def _health_loop(self, interval: float):
+        while not self._stop.is_set():
+            self.check_health()
+            self._stop.wait(interval)
+
+    def check_health(self) -> bool:
+        """Probe /health once and update the cached health state and circuit."""
+        try:
+            healthy = self.client.get("/health", timeout=5).status_code == 200
+        except httpx.HTTPError as e:
+            logger.debug(f"Health probe to {self.api_url} failed: {e}")
+            healthy = False
+        self.healthy = healthy
+        self.last_health_check = time.time()
+        if healthy:
+            self._record_success()
+        else:
+            self._record_failure()
+        return healthy
+
+    def _record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Service at {self.api_url} recovered; closing circuit")
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or (
+                    self.state == self.CLOSED and self._failures >= self.failure_threshold):
+                logger.warning(f"Service at {self.api_url} unavailable; opening circuit")
+                self.state = self.OPEN
+                self._opened_at = time.time()
+
+    def _before_request(self) -> bool:
+        """Fail fast while the circuit is open; returns whether this request is the half-open trial."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return False
+            if self.state == self.OPEN and time.time() - self._opened_at < self.reset_timeout:
+                raise ServiceUnavailableError(f"Document processing service at {self.api_url} is not available")
+            if self._trial_in_flight:
+                # Others keep failing fast until the trial request settles the circuit
+                raise ServiceUnavailableError(f"Document processing service at {self.api_url} is being retried")
+            # Let one trial request through
+            self.state = self.HALF_OPEN
+            self._trial_in_flight = True
+            return True
+
+    def request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """Send a request over the shared pool, tracking failures for the circuit."""
+        trial = self._before_request()
+        try:
+            with span(f"service {method} {path}") as request_span:
+                kwargs["headers"] = inject_headers(dict(kwargs.get("headers") or {}))
+                response = self.client.request(method, path, **kwargs)
+                request_span.set_attribute("http.status_code", response.status_code)
+        except httpx.HTTPError:
+            self._record_failure()
+            raise
+        except BaseException:
+            if trial:
+                with self._lock:
+                    self._trial_in_flight = False
+            raise
+        if response.status_code in self.FAILURE_STATUSES:
+            self._record_failure()
+        else:
+            self._record_success()
+        return response
+
+    def stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "healthy": self.healthy,
+            "consecutive_failures": self._failures,
+            "last_health_check": self.last_health_check,
+            "http2": HTTP2_AVAILABLE
+        }
+
+    def close(self):
+        self._stop.set()
+        self.client.close()
+
+_clients: Dict[str, ServiceClient] = {}
+_clients_lock = threading.Lock()
+
+def get_service_client(api_url: str = API_URL) -> ServiceClient:
+    """Return the shared client for api_url, creating it on first use."""
+    with _clients_lock:
+        client = _clients.get(api_url)
+        if client is None:
+            client = _clients[api_url] = ServiceClient(api_url)
+        return client
@@ -1,14 +1,41 @@
 import os
+import asyncio
+import socket
+import tempfile
+import threading
+from contextlib import asynccontextmanager
 import logging
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File, Form
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
 import uvicorn
 import traceback
-from backend.api.cleanup_port import ensure_port_available
 from backend.processors.document_processor import DocumentProcessor
+from backend.processors.ingest import IngestPipeline
+from backend.metrics import REGISTRY
+from backend.profiler import PROFILE_KINDS, ProfilerBusyError, capture_profile
+from backend.tracing import REQUEST_ID_HEADER, configure_tracing, extract_context, span
+from backend.storage.collections import CollectionManager, validate_collection_name
+from backend.storage.vector_store import QuotaExceededError
+from backend.config import (
+    DEFAULT_COLLECTION,
+    SEARCH_MAX_K,
+    INGEST_UPLOAD_DIR,
+    INGEST_MAX_UPLOAD_BYTES,
+    INGEST_READ_BYTES,
+    INGEST_FILE_TYPES,
+    PROFILING_ENABLED,
+    PROFILE_DIR,
+    PROFILE_INTERVAL,
+    PROFILE_MAX_SECONDS,
+    API_PORT,
+    LAUNCH_DRAIN_TIMEOUT,
+    LAUNCH_LISTEN_FD,
+    LAUNCH_READY_FD,
+    LAUNCH_WORKER_INDEX
+)
 import time
-import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Optional
 
 # Configure detailed logging
 logging.basicConfig(
@@ -17,77 +44,180 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build state before a launcher-managed worker reports ready; finish queued ingests on shutdown."""
+    ready_fd = os.environ.pop(LAUNCH_READY_FD, None)
+    if ready_fd:
+        await asyncio.to_thread(get_pipeline)
+        os.write(int(ready_fd), b"ready\n")
+        os.close(int(ready_fd))
+        logger.info(f"Worker {os.getpid()} ready")
+    yield
+    if pipeline is not None:
+        await asyncio.to_thread(pipeline.shutdown)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Document Processing API",
-    description="API for processing documents with chunking and embeddings"
+    description="API for processing documents with chunking and embeddings",
+    lifespan=lifespan
+)
+
+# Each launcher worker keeps its own metrics and profiles; label them so scrapes
+# reaching different workers are separate series rather than counters that reset
+WORKER_INDEX = os.environ.get(LAUNCH_WORKER_INDEX, "0")
+REGISTRY.set_constant_labels(worker=WORKER_INDEX)
+
+HTTP_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds", "API request latency by method, route and status"
 )
 
-# Initialize document processor with error handling
-try:
-    processor = DocumentProcessor()
-except Exception as e:
-    logger.error(f"Failed to initialize document processor: {e}")
-    raise
+configure_tracing("api")
+
+@app.middleware("http")
+async def trace_and_time_requests(request: Request, call_next):
+    """Continue the caller's trace (or start one), time the request and return its request id."""
+    start = time.perf_counter()
+    with span(f"{request.method} {request.url.path}", **extract_context(request.headers)) as request_span:
+        response = await call_next(request)
+        # Label by route template, not raw path, to keep the series count bounded
+        route = request.scope.get("route")
+        route_path = route.path if route else "unmatched"
+        request_span.name = f"{request.method} {route_path}"
+        request_span.set_attribute("http.status_code", response.status_code)
+    HTTP_SECONDS.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        route=route_path,
+        status=response.status_code
+    )
+    response.headers[REQUEST_ID_HEADER] = request_span.trace_id
+    return response
+
+# Built on first use so importing the app (tests, workers, tooling) stays cheap
+processor: Optional[DocumentProcessor] = None
+# Shared vector stores, one per collection, served to every frontend session
+collections: Optional[CollectionManager] = None
+# Extraction, chunking and embedding run here, off the event loop
+pipeline: Optional[IngestPipeline] = None
+_init_lock = threading.RLock()
+
+def get_processor() -> DocumentProcessor:
+    global processor
+    with _init_lock:
+        if processor is None:
+            try:
+                processor = DocumentProcessor()
+            except Exception as e:
+                logger.error(f"Failed to initialize document processor: {e}")
+                raise
+        return processor
+
+def get_collections() -> CollectionManager:
+    global collections
+    with _init_lock:
+        if collections is None:
+            collections = CollectionManager()
+        return collections
+
+def get_pipeline() -> IngestPipeline:
+    global pipeline
+    with _init_lock:
+        if pipeline is None:
+            pipeline = IngestPipeline(get_processor(), get_collections())
+        return pipeline
 
 class ProcessingRequest(BaseModel):
     text: str
     source_name: str
+    add_to_store: bool = False
+    collection: str = DEFAULT_COLLECTION
+
+class AddDocumentsRequest(BaseModel):
+    source_name: str
+    chunks: List[str]
+    embeddings: List[List[float]]
+    stats: Optional[List[Dict[str, Optional[int]]]] = None  # Per-chunk counts and offsets from chunking
+    collection: str = DEFAULT_COLLECTION
+
+class SearchRequest(BaseModel):
+    query: Optional[str] = None
+    embedding: Optional[List[float]] = None
+    k: int = Field(3, ge=1, le=SEARCH_MAX_K)
+    collection: str = DEFAULT_COLLECTION
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
     try:
         # Test the document processor
-        processor.preprocess_text("test")
+        get_processor().preprocess_text("test")
         return {"status": "healthy", "message": "Service is ready"}
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail="Service is not healthy")
 
+@app.get("/metrics")
+def metrics(format: str = Query("prometheus")):
+    """Counters and per-stage timings in the Prometheus text format, or JSON with format=json.
+
+    Series carry a worker label: each API worker reports only its own.
+    """
+    if format == "json":
+        return REGISTRY.snapshot()
+    return PlainTextResponse(REGISTRY.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.post("/debug/profile")
+async def profile(
+    seconds: float = Query(10, gt=0, le=PROFILE_MAX_SECONDS),
+    interval: float = Query(PROFILE_INTERVAL, ge=0.001),
+    format: str = Query("json"),
+    kind: str = Query("cpu")
+):
+    """Sample all threads for a number of seconds while the service keeps serving requests.
+
+    Only the worker that receives the request is profiled. Writes wall and
+    CPU collapsed-stack files named after it to PROFILE_DIR and returns a
+    summary with its worker index and pid, or one profile's collapsed stacks
+    with format=collapsed. PyPDF extraction and tesseract OCR run in the
+    shared process pool's children, which are not sampled: ingest threads
+    show up waiting on pool futures, not in the parsing and OCR themselves.
+    """
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled; set PROFILING_ENABLED=1")
+    if kind not in PROFILE_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(PROFILE_KINDS)}")
+    try:
+        # Sample from a worker thread so the event loop itself shows up in the profile
+        result = await asyncio.to_thread(capture_profile, seconds, interval)
+        files = result.write(PROFILE_DIR, time.strftime(f"profile-%Y%m%d-%H%M%S-worker{WORKER_INDEX}"))
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        logger.error(f"Failed to capture profile: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Worker {WORKER_INDEX} wrote profile to {files['wall']} and {files['cpu']} ({result.overhead:.1%} sampler CPU)")
+    if format == "collapsed":
+        return PlainTextResponse(result.collapsed(kind))
+    return {"worker": WORKER_INDEX, "pid": os.getpid(), "files": files, **result.summary()}
+
 @app.post("/process-document")
 async def process_document(request: ProcessingRequest):
     """Process a single document with full processing capabilities."""
     try:
+        validate_collection(request.collection)
         logger.info(f"Processing document: {request.source_name}")
         start_time = time.time()
 
-        # Process document in chunks to handle large documents
-        processed_chunks = []
-        embeddings_list = []
-
-        # Initial text preprocessing
-        text = processor.preprocess_text(request.text)
-        chunks = processor.chunk_text(text)
-
-        # Process chunks in batches
-        batch_size = 5
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:i + batch_size]
-            try:
-                batch_embeddings = processor.create_embeddings(batch)
-                processed_chunks.extend(batch)
-                embeddings_list.extend(batch_embeddings)
-            except Exception as batch_error:
-                logger.error(f"Error processing batch {i//batch_size}: {batch_error}")
-                continue
-
-        # Prepare response
-        result = {
-            "chunks": processed_chunks,
-            "embeddings": np.array(embeddings_list) if embeddings_list else np.array([]),
-            "stats": {
-                "total_chunks": len(processed_chunks),
-                "processed_chunks": len(embeddings_list),
-                "total_words": sum(len(chunk.split()) for chunk in processed_chunks),
-                "avg_chunk_size": sum(len(chunk.split()) for chunk in processed_chunks) / len(processed_chunks) if processed_chunks else 0,
-                "processing_time": time.time() - start_time
-            }
-        }
+        result = await asyncio.wrap_future(get_pipeline().submit_text(
+            request.text, request.source_name, request.collection, request.add_to_store
+        ))
 
         # Format response
         response = {
-            "chunks": [{"text": chunk} for chunk in result["chunks"]],
+            "chunks": result["records"],
             "embeddings": result["embeddings"].tolist() if result["embeddings"] is not None else [],
             "processing_stats": result["stats"]
         }
@@ -96,22 +226,157 @@ async def process_document(request: ProcessingRequest):
                    f"in {time.time() - start_time:.2f} seconds")
         return response
 
+    except HTTPException:
+        raise
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         error_msg = f"Error processing document: {str(e)}"
         logger.error(f"{error_msg}\n{traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_msg)
 
-if __name__ == "__main__":
+async def save_upload(upload: UploadFile) -> str:
+    """Stream an upload to a temporary file without holding it in memory."""
+    os.makedirs(INGEST_UPLOAD_DIR, exist_ok=True)
+    suffix = os.path.splitext(upload.filename or "")[1].lower()
+    fd, path = tempfile.mkstemp(dir=INGEST_UPLOAD_DIR, suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                block = await upload.read(INGEST_READ_BYTES)
+                if not block:
+                    break
+                size += len(block)
+                if size > INGEST_MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds {INGEST_MAX_UPLOAD_BYTES} bytes"
+                    )
+                out.write(block)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+@app.post("/ingest")
+async def ingest(file: UploadFile = File(...), collection: str = Form(DEFAULT_COLLECTION)):
+    """Upload a PDF or text file and extract, chunk, embed and store it server-side."""
+    validate_collection(collection)
+    filename = os.path.basename(file.filename or "")
+    if os.path.splitext(filename)[1].lower() not in INGEST_FILE_TYPES:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Unsupported file type; expected one of {', '.join(INGEST_FILE_TYPES)}"
+        )
+
+    path = await save_upload(file)
+    try:
+        # The pipeline owns (and removes) the spooled file from here on
+        result = await asyncio.wrap_future(get_pipeline().submit_file(path, filename, collection))
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        error_msg = f"Error ingesting {filename}: {str(e)}"
+        logger.error(f"{error_msg}\n{traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+
+    return {
+        "source_name": filename,
+        "collection": collection,
+        "processing_stats": result["stats"]
+    }
+
+def validate_collection(name: str):
+    """Reject unsafe collection names with a 400."""
     try:
-        port = int(os.environ.get("PORT", 8002))
-        logger.info(f"Starting FastAPI service on port {port}...")
+        validate_collection_name(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # Ensure port is available
-        if not ensure_port_available(port):
-            raise RuntimeError(f"Could not secure port {port}")
+@app.get("/collections")
+def list_collections():
+    """List collections with their load state and quota usage."""
+    return {"collections": get_collections().list_collections()}
 
-        # Start the server
-        uvicorn.run(app, host="0.0.0.0", port=port, log_level="debug")
+@app.delete("/collections/{name}")
+def drop_collection(name: str):
+    """Delete a collection and its cache namespace."""
+    validate_collection(name)
+    get_collections().drop(name)
+    return {"status": "ok"}
+
+@app.get("/documents")
+def list_documents(collection: str = Query(DEFAULT_COLLECTION)):
+    """List documents held in a shared collection."""
+    validate_collection(collection)
+    with get_collections().use(collection) as active:
+        documents = active.vector_store.list_documents()
+        generation = active.vector_store.get_versions()["generation"]
+    return {
+        "documents": documents,
+        "total_chunks": sum(doc["chunks"] for doc in documents),
+        "generation": generation
+    }
+
+@app.post("/documents")
+def add_documents(request: AddDocumentsRequest):
+    """Add pre-computed chunks and embeddings to a shared collection."""
+    validate_collection(request.collection)
+    try:
+        with get_collections().use(request.collection) as collection:
+            collection.vector_store.add_documents(
+                request.chunks, request.embeddings, request.source_name, request.stats
+            )
+        return {"status": "ok", "added_chunks": len(request.chunks)}
+    except QuotaExceededError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error adding documents: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/documents")
+def clear_documents(collection: str = Query(DEFAULT_COLLECTION)):
+    """Remove every document from a shared collection."""
+    validate_collection(collection)
+    with get_collections().use(collection) as active:
+        active.vector_store.clear()
+    return {"status": "ok"}
+
+@app.post("/search")
+def search(request: SearchRequest):
+    """Search a shared collection by query text or embedding."""
+    validate_collection(request.collection)
+    if request.embedding is None and not request.query:
+        raise HTTPException(status_code=400, detail="Either query or embedding must be provided")
+    try:
+        with get_collections().use(request.collection) as collection:
+            embedding = request.embedding
+            if embedding is None:
+                embedding = get_processor().create_embeddings(
+                    [request.query], cache_manager=collection.cache_manager
+                )[0]
+            return {"results": collection.vector_store.search(embedding, request.k)}
+    except Exception as e:
+        logger.error(f"Error searching documents: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+if __name__ == "__main__":
+    try:
+        listen_fd = os.environ.pop(LAUNCH_LISTEN_FD, None)
+        if listen_fd:
+            # Worker under launch.py: serve the socket the supervisor bound for every worker
+            sock = socket.socket(fileno=int(listen_fd))
+            logger.info(f"Worker {os.getpid()} serving {sock.getsockname()}")
+            config = uvicorn.Config(app, log_level="info", timeout_graceful_shutdown=int(LAUNCH_DRAIN_TIMEOUT))
+            uvicorn.Server(config).run(sockets=[sock])
+        else:
+            logger.info(f"Starting FastAPI service on port {API_PORT}...")
+            # A port held by another process fails the bind instead of being killed
+            uvicorn.run(app, host="0.0.0.0", port=API_PORT, log_level="debug",
+                        timeout_graceful_shutdown=int(LAUNCH_DRAIN_TIMEOUT))
     except Exception as e:
         logger.error(f"Failed to start service: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
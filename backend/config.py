@@ -8,11 +8,93 @@ VECTOR_DIMENSION = 1024  # Mistral's embedding dimension
 CHUNK_SIZE = 2000  # Reduced to avoid token limits
 CHUNK_OVERLAP = 400  # Reduced proportionally
 MAX_BATCH_SIZE = 5  # Reduced batch size for better token management
+EMBEDDING_BATCH_TOKENS = 15000  # Token limit per embeddings request; batches are cut before exceeding it
 MAX_RECURSIVE_CHUNKS = 50  # Maximum chunks per recursive split
+VECTOR_STORE_DIR = os.environ.get("VECTOR_STORE_DIR", ".vector_store")  # Shared store persisted by the API service
+CACHE_DIR = os.environ.get("CACHE_DIR", ".cache")  # Root directory for cache files
+CACHE_MEMORY_BYTES = int(os.environ.get("CACHE_MEMORY_BYTES", 64 * 1024 ** 2))  # In-memory LRU tier budget
+CACHE_MAX_DISK_ENTRIES = int(os.environ.get("CACHE_MAX_DISK_ENTRIES", 50000))  # Per cache file; oldest evicted first
+CACHE_SWEEP_INTERVAL = float(os.environ.get("CACHE_SWEEP_INTERVAL", 3600))  # Seconds between background TTL sweeps
+# Collections keep their caches in CACHE_DIR/<name>; shared directories use a
+# leading dot, which no collection name can have, so dropping one never deletes them
+EXTRACTION_CACHE_DIR = os.path.join(CACHE_DIR, ".extractions")  # Per-page PDF text keyed by content digest
+
+# Collection Configuration
+DEFAULT_COLLECTION = "default"  # Collection used when none is specified
+MAX_LOADED_COLLECTIONS = int(os.environ.get("MAX_LOADED_COLLECTIONS", 8))  # Idle collections beyond this are evicted (LRU)
+COLLECTION_MAX_ROWS = int(os.environ.get("COLLECTION_MAX_ROWS", 200000))  # Per-collection chunk quota
+COLLECTION_MAX_BYTES = int(os.environ.get("COLLECTION_MAX_BYTES", 2 * 1024 ** 3))  # Per-collection memory quota
+SEARCH_MAX_K = int(os.environ.get("SEARCH_MAX_K", 100))  # Most results one /search request may ask for
+
+# Service Configuration
+API_URL = os.environ.get("API_URL", "http://127.0.0.1:8002")  # Document processing service
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 4))  # Uploads in flight per batch; keep <= INGEST_WORKERS
+SERVICE_TIMEOUT = float(os.environ.get("SERVICE_TIMEOUT", 30))  # Default per-request timeout in seconds
+SERVICE_MAX_CONNECTIONS = int(os.environ.get("SERVICE_MAX_CONNECTIONS", 20))  # Pooled keep-alive connections per process
+SERVICE_HEALTH_INTERVAL = float(os.environ.get("SERVICE_HEALTH_INTERVAL", 10))  # Seconds between background health probes
+SERVICE_FAILURE_THRESHOLD = 3  # Consecutive failures before the circuit opens
+SERVICE_RESET_TIMEOUT = 15  # Seconds an open circuit fails fast before a trial request
+
+# Launcher Configuration
+API_PORT = int(os.environ.get("PORT", 8002))  # Port the launcher binds for all API workers
+API_WORKERS = int(os.environ.get("API_WORKERS", 2))  # uvicorn worker processes sharing the API port and mmapped stores
+FRONTEND_PORT = int(os.environ.get("FRONTEND_PORT", 5000))
+LAUNCH_READY_TIMEOUT = float(os.environ.get("LAUNCH_READY_TIMEOUT", 60))  # Seconds for workers to report ready
+LAUNCH_DRAIN_TIMEOUT = float(os.environ.get("LAUNCH_DRAIN_TIMEOUT", 30))  # Seconds in-flight requests get on shutdown
+LAUNCH_MAX_RESTART_DELAY = 30  # Cap on the backoff between restarts of a crashing worker
+LAUNCH_LISTEN_FD = "LAUNCH_LISTEN_FD"  # Env var: inherited listening socket a worker serves
+LAUNCH_READY_FD = "LAUNCH_READY_FD"  # Env var: pipe a worker writes to once it can serve
+LAUNCH_WORKER_INDEX = "LAUNCH_WORKER_INDEX"  # Env var: worker slot, the worker label on its metrics and profiles
+
+# PDF Extraction Configuration
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", 64))  # Below this, extract pages sequentially
+PDF_EXTRACTION_WORKERS = int(os.environ.get("PDF_EXTRACTION_WORKERS", 0)) or None  # None = one per CPU
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", 0)) or None  # Tesseract processes; None = one per CPU
+# OCR policies: DPIs tried in order, escalating while tesseract confidence is low
+OCR_POLICIES = {
+    "fast": (150,),
+    "balanced": (150, 300),
+    "accurate": (300,)
+}
+OCR_POLICY = os.environ.get("OCR_POLICY", "balanced")
+OCR_MIN_CONFIDENCE = float(os.environ.get("OCR_MIN_CONFIDENCE", 70))  # Mean word confidence (0-100) to accept a page
+OCR_QUEUE_DEPTH = 2  # Pages in flight per OCR worker; bounds peak memory
+
+# Ingest Configuration
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", 4))  # Documents extracted/embedded concurrently by the API service
+INGEST_UPLOAD_DIR = os.environ.get("INGEST_UPLOAD_DIR", os.path.join(CACHE_DIR, ".uploads"))  # Uploads spooled here until ingested
+INGEST_MAX_UPLOAD_BYTES = int(os.environ.get("INGEST_MAX_UPLOAD_BYTES", 200 * 1024 ** 2))  # Larger uploads are rejected with 413
+INGEST_READ_BYTES = 1024 ** 2  # Upload bytes read per await while streaming to disk
+INGEST_FILE_TYPES = (".pdf", ".txt")
+
+# Tracing Configuration
+TRACE_FILE = os.environ.get("TRACE_FILE", "")  # JSON-lines span log, e.g. .traces/spans.jsonl; empty disables export
+
+# Profiling Configuration
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"  # Exposes POST /debug/profile on the API service
+PROFILE_DIR = os.environ.get("PROFILE_DIR", ".profiles")  # Collapsed-stack output for flamegraphs
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.01))  # Seconds between stack samples
+PROFILE_MAX_SECONDS = 120  # Longest capture one request may ask for
+
+# Semantic Cache Configuration
+SEMANTIC_CACHE_THRESHOLD = float(os.environ.get("SEMANTIC_CACHE_THRESHOLD", 0.95))  # Minimum cosine similarity for a hit
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.environ.get("SEMANTIC_CACHE_MAX_ENTRIES", 1000))  # Oldest entries are overwritten
+
+# Reranking Configuration
+RERANK_ENABLED = os.environ.get("RERANK_ENABLED", "0") == "1"  # Rescore vector hits with a local cross-encoder
+RERANK_MODEL = os.environ.get("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", 20))  # Vector hits rescored per query before keeping k
+RERANK_BATCH_SIZE = 32  # (query, chunk) pairs per cross-encoder forward pass
+RERANK_CACHE_BYTES = 8 * 1024 ** 2  # In-memory (query, chunk) score cache budget
+
+# Context Configuration
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", 60000))  # Prompt context tokens; keep well under the model's window
 
 # Model Configuration
+MISTRAL_ENDPOINT = os.environ.get("MISTRAL_ENDPOINT", "https://api.mistral.ai")  # Point at a local fake server for benchmarks
 EMBEDDING_MODEL = "mistral-embed"  # Mistral's embedding model
 LLM_MODEL = "mistral-large-latest"  # Mistral's latest large model
+TOKENIZER_MODEL = os.environ.get("TOKENIZER_MODEL", "mistral-large-2411")  # mistral_common tokenizer for LLM_MODEL; "-latest" aliases are not recognised
 
 # System prompt for RAG
 SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on the provided context. 
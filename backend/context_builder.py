@@ -0,0 +1,160 @@
+from typing import Dict, List, Optional, Set
+from backend.config import CONTEXT_TOKEN_BUDGET, CHUNK_OVERLAP
+from backend.metrics import REGISTRY
+from backend.tokenizer import count_tokens
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEADER = "From document '{source}':\n"
+SEPARATOR = "\n\n"
+
+CONTEXT_TOKENS = REGISTRY.histogram(
+    "rag_context_tokens", "Prompt context tokens per query after packing",
+    buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+)
+
+def _relevance(chunk: Dict) -> float:
+    return chunk.get("rerank_score", chunk.get("score", 0.0))
+
+def _tokens(chunk: Dict) -> int:
+    tokens = chunk.get("tokens")
+    return tokens if tokens is not None else count_tokens(chunk["text"])
+
+def _overlap_words(left: str, right: str, max_words: int = CHUNK_OVERLAP) -> int:
+    """Number of words at the end of left repeated at the start of right."""
+    tail = left.split()[-max_words:]
+    head = right.split()[:max_words]
+    for n in range(min(len(tail), len(head)), 0, -1):
+        if tail[-n:] == head[:n]:
+            return n
+    return 0
+
+def _continues(left: Dict, right: Dict) -> bool:
+    """Whether right picks up where left ends in their source, by character offsets.
+
+    Consecutive rows are not always neighbours in the text: a failed
+    embedding batch leaves a gap and a re-ingest appends after the old rows.
+    Chunks stored without offsets are never merged.
+    """
+    if None in (left.get("start"), left.get("end"), right.get("start")):
+        return False
+    return left["start"] < right["start"] <= left["end"]
+
+class _Packer:
+    """Greedy relevance-per-token selection where adjacent chunks of a source share a header."""
+
+    def __init__(self, chunks: List[Dict]):
+        self.chunks = chunks
+        self.tokens = [_tokens(chunk) for chunk in chunks]
+        relevance = [_relevance(chunk) for chunk in chunks]
+        # Cross-encoder scores can be negative; only their order matters for value
+        floor = min(relevance) if relevance else 0.0
+        self.values = [score - floor + 1e-3 for score in relevance]
+        self.by_position = {
+            (chunk["source"], chunk["position"]): i
+            for i, chunk in enumerate(chunks) if chunk.get("position") is not None
+        }
+        self._header_tokens: Dict[str, int] = {}
+        self._overlap_tokens: Dict[tuple, int] = {}
+
+    def header_tokens(self, source: str) -> int:
+        if source not in self._header_tokens:
+            self._header_tokens[source] = count_tokens(HEADER.format(source=source) + SEPARATOR)
+        return self._header_tokens[source]
+
+    def neighbor(self, i: int, offset: int) -> Optional[int]:
+        chunk = self.chunks[i]
+        if chunk.get("position") is None:
+            return None
+        j = self.by_position.get((chunk["source"], chunk["position"] + offset))
+        if j is None:
+            return None
+        left, right = (j, i) if offset < 0 else (i, j)
+        return j if _continues(self.chunks[left], self.chunks[right]) else None
+
+    def overlap_tokens(self, left: int, right: int) -> int:
+        """Tokens saved by dropping the words right repeats from left when merging them."""
+        if (left, right) not in self._overlap_tokens:
+            words = _overlap_words(self.chunks[left]["text"], self.chunks[right]["text"])
+            overlap = " ".join(self.chunks[right]["text"].split()[:words])
+            self._overlap_tokens[(left, right)] = count_tokens(overlap) if words else 0
+        return self._overlap_tokens[(left, right)]
+
+    def marginal_cost(self, i: int, selected: Set[int]) -> int:
+        """Tokens chunk i adds given the chunks already selected."""
+        cost = self.tokens[i]
+        before, after = self.neighbor(i, -1), self.neighbor(i, 1)
+        joined = 0
+        if before in selected:
+            cost -= self.overlap_tokens(before, i)
+            joined += 1
+        if after in selected:
+            cost -= self.overlap_tokens(i, after)
+            joined += 1
+        # A new block pays for its header; bridging two blocks saves one
+        return cost + self.header_tokens(self.chunks[i]["source"]) * (1 - joined)
+
+    def select(self, budget: int) -> Set[int]:
+        order = sorted(range(len(self.chunks)), key=lambda i: self.values[i] / max(self.tokens[i], 1), reverse=True)
+        selected: Set[int] = set()
+        used = 0
+        for i in order:
+            cost = self.marginal_cost(i, selected)
+            # Skip chunks that do not fit rather than stopping, so smaller ones can fill the gap
+            if used + cost <= budget:
+                selected.add(i)
+                used += cost
+
+        # Greedy by density can lose to one large, highly relevant chunk (the knapsack 1/2 bound)
+        best = max(
+            (i for i in range(len(self.chunks)) if self.marginal_cost(i, set()) <= budget),
+            key=lambda i: self.values[i], default=None
+        )
+        if best is not None and self.values[best] > sum(self.values[i] for i in selected):
+            return {best}
+        return selected
+
+    def render(self, selected: Set[int]) -> List[Dict]:
+        """Merge runs of adjacent selected chunks into blocks, most relevant block first."""
+        blocks = []
+        seen: Set[int] = set()
+        for i in sorted(selected, key=lambda i: (self.chunks[i]["source"], self.chunks[i].get("position") or 0)):
+            if i in seen:
+                continue
+            run = [i]
+            while (following := self.neighbor(run[-1], 1)) in selected:
+                run.append(following)
+            seen.update(run)
+            text = self.chunks[run[0]]["text"]
+            for left, right in zip(run, run[1:]):
+                words = self.chunks[right]["text"].split()
+                text += " " + " ".join(words[_overlap_words(self.chunks[left]["text"], self.chunks[right]["text"]):])
+            blocks.append({
+                "source": self.chunks[i]["source"],
+                "text": text.rstrip(),
+                "members": run,
+                "relevance": max(self.values[j] for j in run)
+            })
+        return sorted(blocks, key=lambda block: block["relevance"], reverse=True)
+
+def build_context(chunks: List[Dict], budget: int = CONTEXT_TOKEN_BUDGET) -> Dict:
+    """Pack retrieved chunks into a prompt context of at most budget tokens.
+
+    Chunks are chosen by relevance per token, adjacent chunks of one source
+    are merged under a single header with their overlapping words removed,
+    and blocks are ordered most relevant first. Returns the context text,
+    the chunks it includes and its token count.
+    """
+    if not chunks:
+        return {"context": "", "chunks": [], "tokens": 0}
+
+    packer = _Packer(chunks)
+    selected = packer.select(budget)
+    blocks = packer.render(selected)
+    context = SEPARATOR.join(HEADER.format(source=block["source"]) + block["text"] for block in blocks)
+    included = [chunks[i] for block in blocks for i in block["members"]]
+    tokens = count_tokens(context)
+    CONTEXT_TOKENS.observe(tokens)
+    logger.info(f"Packed {len(included)} of {len(chunks)} chunks into {len(blocks)} blocks, {tokens} tokens")
+    return {"context": context, "chunks": included, "tokens": tokens}
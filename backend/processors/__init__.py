@@ -1,3 +1,16 @@
 # Initialize backend.processors package
-from .document_processor import DocumentProcessor
-from .pdf_processor import PDFProcessor
\ No newline at end of file
+# Exports are imported on first access (PEP 562) to keep startup cheap
+import importlib
+
+_EXPORTS = {
+    "DocumentProcessor": ".document_processor",
+    "PDFProcessor": ".pdf_processor",
+    "IngestPipeline": ".ingest"
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_EXPORTS)
@@ -1,29 +1,60 @@
-from typing import List, Dict, Optional, Callable
+import threading
+from typing import TYPE_CHECKING, List, Dict, Optional, Callable
 import numpy as np
-from mistralai.client import MistralClient
 from backend.config import (
     MISTRAL_API_KEY, 
     CHUNK_SIZE, 
     CHUNK_OVERLAP, 
+    MISTRAL_ENDPOINT,
     EMBEDDING_MODEL,
     MAX_BATCH_SIZE,
+    EMBEDDING_BATCH_TOKENS,
     MAX_RECURSIVE_CHUNKS
 )
 from backend.storage.cache_manager import CacheManager
+from backend.metrics import EMBEDDING_TEXTS, stage_timer
+from backend.tokenizer import chunk_stats, count_tokens
+from backend.tracing import propagate, span
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 
+if TYPE_CHECKING:
+    from mistralai.client import MistralClient
+
 logger = logging.getLogger(__name__)
 
+_mistral_clients: Dict[str, "MistralClient"] = {}
+_mistral_lock = threading.Lock()
+
+def get_mistral_client(endpoint: str = MISTRAL_ENDPOINT) -> "MistralClient":
+    """Process-wide Mistral client per endpoint; mistralai is imported on first use."""
+    with _mistral_lock:
+        client = _mistral_clients.get(endpoint)
+        if client is None:
+            from mistralai.client import MistralClient
+            client = _mistral_clients[endpoint] = MistralClient(api_key=MISTRAL_API_KEY, endpoint=endpoint)
+        return client
+
 class DocumentProcessor:
     def __init__(self):
         if not MISTRAL_API_KEY:
             raise ValueError("Mistral API key is not set")
-        self.client = MistralClient(api_key=MISTRAL_API_KEY)
+        self._client: Optional["MistralClient"] = None
         self.processing_cancelled = False
         self.cache_manager = CacheManager()
 
+    @property
+    def client(self) -> "MistralClient":
+        """Mistral client, created on first use rather than at startup."""
+        if self._client is None:
+            self._client = get_mistral_client()
+        return self._client
+
+    @client.setter
+    def client(self, client: "MistralClient"):
+        self._client = client
+
     def cancel_processing(self):
         """Cancel ongoing document processing."""
         self.processing_cancelled = True
@@ -39,8 +70,9 @@ class DocumentProcessor:
             return ""
 
         logger.info(f"Preprocessing text of length {len(text)}")
-        text = ' '.join(text.split())
-        text = ''.join(char for char in text if char.isprintable())
+        with stage_timer("document_processor", "preprocess"):
+            text = ' '.join(text.split())
+            text = ''.join(char for char in text if char.isprintable())
         return text
 
     def recursive_chunk_text(self, text: str, depth: int = 0) -> List[str]:
@@ -79,7 +111,8 @@ class DocumentProcessor:
             else:
                 if current_chunk:
                     chunk_text = '. '.join(current_chunk) if '. ' in text else '\n\n'.join(current_chunk)
-                    if len(chunk_text.split()) > CHUNK_SIZE:
+                    # Joining sections does not change their word count
+                    if current_size > CHUNK_SIZE:
                         sub_chunks = self.recursive_chunk_text(chunk_text, depth + 1)
                         chunks.extend(sub_chunks)
                     else:
@@ -90,7 +123,7 @@ class DocumentProcessor:
 
         if current_chunk:
             chunk_text = '. '.join(current_chunk) if '. ' in text else '\n\n'.join(current_chunk)
-            if len(chunk_text.split()) > CHUNK_SIZE:
+            if current_size > CHUNK_SIZE:
                 sub_chunks = self.recursive_chunk_text(chunk_text, depth + 1)
                 chunks.extend(sub_chunks)
             else:
@@ -100,6 +133,15 @@ class DocumentProcessor:
 
     def chunk_text(self, text: str) -> List[str]:
         """Split text into chunks using recursive strategy."""
+        return [record["text"] for record in self.chunk_records(text)]
+
+    def chunk_records(self, text: str) -> List[Dict]:
+        """Split text into chunks, each with its word, token and character counts and offsets.
+
+        Offsets are into the preprocessed text. The counts are computed here
+        once and stored with the chunk, so batching, statistics and context
+        packing read them instead of re-splitting chunk texts.
+        """
         try:
             text = self.preprocess_text(text)
             if not text:
@@ -107,7 +149,8 @@ class DocumentProcessor:
                 return []
 
             logger.info(f"Starting text chunking for text of length {len(text)}")
-            chunks = self.recursive_chunk_text(text)
+            with stage_timer("document_processor", "chunk"):
+                chunks = self.recursive_chunk_text(text)
 
             # Post-process chunks to ensure size constraints
             final_chunks = []
@@ -119,21 +162,32 @@ class DocumentProcessor:
                 if len(chunk_words) > CHUNK_SIZE:
                     # Split into smaller chunks with overlap
                     for i in range(0, len(chunk_words), CHUNK_SIZE - CHUNK_OVERLAP):
-                        sub_chunk = ' '.join(chunk_words[i:i + CHUNK_SIZE])
-                        if sub_chunk and len(sub_chunk.split()) <= CHUNK_SIZE:
-                            final_chunks.append(sub_chunk)
+                        sub_words = chunk_words[i:i + CHUNK_SIZE]
+                        if sub_words:
+                            final_chunks.append((' '.join(sub_words), len(sub_words)))
                 else:
-                    final_chunks.append(chunk)
+                    final_chunks.append((chunk, len(chunk_words)))
+
+            with stage_timer("document_processor", "chunk_stats"):
+                records = []
+                cursor = 0
+                for chunk, words in final_chunks:
+                    # Chunks appear in order; overlapping ones start after the previous start
+                    start = text.find(chunk, cursor)
+                    if start >= 0:
+                        cursor = start + 1
+                    records.append({"text": chunk, **chunk_stats(chunk, start if start >= 0 else None, words)})
 
-            logger.info(f"Generated {len(final_chunks)} chunks")
-            return final_chunks
+            logger.info(f"Generated {len(records)} chunks")
+            return records
 
         except Exception as e:
             logger.error(f"Error in chunk_text: {str(e)}")
             raise
 
-    def process_chunk_batch(self, batch: List[str]) -> List[np.ndarray]:
+    def process_chunk_batch(self, batch: List[str], cache_manager: Optional[CacheManager] = None) -> List[np.ndarray]:
         """Process a batch of chunks to create embeddings with caching."""
+        cache_manager = cache_manager or self.cache_manager
         if not batch:
             logger.warning("Empty batch provided for processing")
             return []
@@ -142,34 +196,37 @@ class DocumentProcessor:
             raise Exception("Processing cancelled by user")
 
         try:
-            # Check cache first
-            cached_embeddings = []
-            uncached_chunks = []
-
-            for chunk in batch:
-                cached_embedding = self.cache_manager.get_embedding_cache(chunk)
-                if cached_embedding is not None:
-                    cached_embeddings.append(cached_embedding)
-                else:
-                    uncached_chunks.append(chunk)
+            # Check cache first; results keep the order of the batch
+            embeddings: List[Optional[List[float]]] = []
+
+            with stage_timer("document_processor", "embedding_cache_lookup"):
+                for chunk in batch:
+                    embeddings.append(cache_manager.get_embedding_cache(chunk))
+            uncached = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            uncached_chunks = [batch[i] for i in uncached]
 
             if not uncached_chunks:
-                logger.info(f"Using {len(cached_embeddings)} cached embeddings")
-                return cached_embeddings
+                logger.info(f"Using {len(embeddings)} cached embeddings")
+                return embeddings
 
             # Process uncached chunks
-            response = self.client.embeddings(
-                model=EMBEDDING_MODEL,
-                input=uncached_chunks
-            )
+            with span("mistral.embeddings", model=EMBEDDING_MODEL, texts=len(uncached_chunks)), \
+                    stage_timer("document_processor", "embedding_api"):
+                response = self.client.embeddings(
+                    model=EMBEDDING_MODEL,
+                    input=uncached_chunks
+                )
+            EMBEDDING_TEXTS.inc(len(uncached_chunks))
             new_embeddings = [embed_data.embedding for embed_data in response.data]
 
-            # Cache new embeddings
-            for chunk, embedding in zip(uncached_chunks, new_embeddings):
-                self.cache_manager.cache_embedding(chunk, embedding)
+            # Cache new embeddings with one locked write for the whole batch
+            with stage_timer("document_processor", "embedding_cache_write"):
+                cache_manager.cache_embeddings(dict(zip(uncached_chunks, new_embeddings)))
 
-            # Combine cached and new embeddings
-            return cached_embeddings + new_embeddings
+            # Fill the new embeddings in next to the cached ones
+            for i, embedding in zip(uncached, new_embeddings):
+                embeddings[i] = embedding
+            return embeddings
 
         except Exception as e:
             logger.error(f"Error in process_chunk_batch: {str(e)}")
@@ -182,7 +239,7 @@ class DocumentProcessor:
                         raise Exception("Processing cancelled by user")
 
                     try:
-                        cached_embedding = self.cache_manager.get_embedding_cache(chunk)
+                        cached_embedding = cache_manager.get_embedding_cache(chunk)
                         if cached_embedding is not None:
                             results.append(cached_embedding)
                             continue
@@ -192,7 +249,7 @@ class DocumentProcessor:
                             input=[chunk]
                         )
                         embedding = response.data[0].embedding
-                        self.cache_manager.cache_embedding(chunk, embedding)
+                        cache_manager.cache_embedding(chunk, embedding)
                         results.append(embedding)
                     except Exception as chunk_error:
                         logger.error(f"Error processing individual chunk: {str(chunk_error)}")
@@ -201,50 +258,60 @@ class DocumentProcessor:
                 return results
             raise
 
-    def create_embeddings(self, chunks: List[str], progress_callback: Optional[Callable[[float, str], None]] = None) -> np.ndarray:
-        """Generate embeddings using parallel processing and progress tracking."""
+    def create_embeddings(self, chunks: List[str], progress_callback: Optional[Callable[[float, str], None]] = None,
+                          cache_manager: Optional[CacheManager] = None,
+                          token_counts: Optional[List[int]] = None) -> np.ndarray:
+        """Generate embeddings, in chunk order, using parallel processing and progress tracking.
+
+        Batches hold up to MAX_BATCH_SIZE chunks and EMBEDDING_BATCH_TOKENS
+        tokens; pass the chunks' stored token counts to avoid counting again.
+        """
         if not chunks:
             logger.warning("No chunks provided for embedding creation")
             return np.array([])
 
         try:
-            all_embeddings = []
-            total_batches = (len(chunks) + MAX_BATCH_SIZE - 1) // MAX_BATCH_SIZE
+            if token_counts is None:
+                token_counts = [count_tokens(chunk) for chunk in chunks]
+
+            batches = []
+            batch, batch_tokens = [], 0
+            for chunk, tokens in zip(chunks, token_counts):
+                if batch and (len(batch) >= MAX_BATCH_SIZE or batch_tokens + tokens > EMBEDDING_BATCH_TOKENS):
+                    batches.append(batch)
+                    batch, batch_tokens = [], 0
+                batch.append(chunk)
+                batch_tokens += tokens
+            batches.append(batch)
+
+            results: Dict[int, List] = {}
             completed_batches = 0
 
             with ThreadPoolExecutor(max_workers=3) as executor:
-                futures = []
+                futures = {}
 
-                for i in range(0, len(chunks), MAX_BATCH_SIZE):
+                for index, batch in enumerate(batches):
                     if self.processing_cancelled:
                         raise Exception("Processing cancelled by user")
-
-                    batch = chunks[i:i + MAX_BATCH_SIZE]
-                    total_tokens = sum(len(chunk.split()) for chunk in batch)
-
-                    if total_tokens > 15000:  # Mistral token limit
-                        batch = [chunk for chunk in batch if len(chunk.split()) <= 2000]
-
-                    if batch:
-                        futures.append(executor.submit(self.process_chunk_batch, batch))
+                    futures[executor.submit(propagate(self.process_chunk_batch), batch, cache_manager)] = index
 
                 for future in as_completed(futures):
                     if self.processing_cancelled:
                         raise Exception("Processing cancelled by user")
 
                     try:
-                        batch_embeddings = future.result()
-                        all_embeddings.extend(batch_embeddings)
+                        results[futures[future]] = future.result()
 
                         completed_batches += 1
                         if progress_callback:
-                            progress = completed_batches / total_batches
+                            progress = completed_batches / len(batches)
                             progress_callback(progress)
                     except Exception as e:
                         logger.error(f"Error processing batch: {str(e)}")
                         continue
 
-            return np.array(all_embeddings)
+            # Batches finish in any order; reassemble them in chunk order
+            return np.array([embedding for index in sorted(results) for embedding in results[index]])
 
         except Exception as e:
             if "Processing cancelled by user" in str(e):
@@ -258,6 +325,8 @@ class DocumentProcessor:
             raise ValueError("Empty document provided")
 
         self.reset_cancel_flag()
+        # The embedding callbacks below call it unconditionally
+        progress_callback = progress_callback or (lambda progress, message: None)
         start_time = time.time()
         total_words = len(text.split())
         logger.info(f"Starting document processing with {total_words} words")
@@ -272,7 +341,8 @@ class DocumentProcessor:
                 logger.info("Large document detected, processing in sections")
                 # Split into major sections first
                 sections = text.split('\n\n')
-                processed_sections = []
+                records = []
+                all_embeddings = []
                 total_sections = len(sections)
 
                 for i, section in enumerate(sections):
@@ -283,47 +353,43 @@ class DocumentProcessor:
                         progress = 0.1 + (0.8 * (i / total_sections))
                         progress_callback(progress, f"Processing section {i+1}/{total_sections}...")
 
-                    # Process each section individually
-                    section_chunks = self.chunk_text(section)
-                    if section_chunks:
+                    # Process each section individually; offsets are only meaningful within a section
+                    section_records = [
+                        {**record, "start": None, "end": None} for record in self.chunk_records(section)
+                    ]
+                    if section_records:
                         section_embeddings = self.create_embeddings(
-                            section_chunks,
+                            [record["text"] for record in section_records],
                             lambda p: progress_callback(progress + (0.8/total_sections) * p, 
-                            f"Generating embeddings for section {i+1}...")
+                            f"Generating embeddings for section {i+1}..."),
+                            token_counts=[record["tokens"] for record in section_records]
                         )
-                        processed_sections.append({
-                            'chunks': section_chunks,
-                            'embeddings': section_embeddings
-                        })
-
-                # Combine results
-                all_chunks = []
-                all_embeddings = []
-                for section in processed_sections:
-                    all_chunks.extend(section['chunks'])
-                    if len(section['embeddings']) > 0:
-                        all_embeddings.extend(section['embeddings'])
+                        records.extend(section_records)
+                        if len(section_embeddings) > 0:
+                            all_embeddings.extend(section_embeddings)
 
                 embeddings = np.array(all_embeddings) if all_embeddings else np.array([])
 
             else:
                 # Process normally for smaller documents
-                chunks = self.chunk_text(text)
-                if not chunks:
+                records = self.chunk_records(text)
+                if not records:
                     raise ValueError("Text chunking failed to produce any chunks")
 
                 embeddings = self.create_embeddings(
-                    chunks, 
-                    lambda p: progress_callback(0.3 + 0.6 * p, "Processing embeddings...")
+                    [record["text"] for record in records],
+                    lambda p: progress_callback(0.3 + 0.6 * p, "Processing embeddings..."),
+                    token_counts=[record["tokens"] for record in records]
                 )
 
             processing_time = time.time() - start_time
 
-            # Calculate document statistics
+            # Calculate document statistics from the counts taken at chunking time
             doc_stats = {
-                "total_chunks": len(all_chunks) if "all_chunks" in locals() else len(chunks),
-                "avg_chunk_size": sum(len(chunk.split()) for chunk in (all_chunks if "all_chunks" in locals() else chunks)) / len(all_chunks if "all_chunks" in locals() else chunks) if (all_chunks if "all_chunks" in locals() else chunks) else 0,
+                "total_chunks": len(records),
+                "avg_chunk_size": sum(record["words"] for record in records) / len(records) if records else 0,
                 "total_words": total_words,
+                "total_tokens": sum(record["tokens"] for record in records),
                 "processing_time": processing_time
             }
 
@@ -332,7 +398,8 @@ class DocumentProcessor:
 
             logger.info(f"Document processing completed in {processing_time:.2f} seconds")
             return {
-                "chunks": all_chunks if "all_chunks" in locals() else chunks,
+                "chunks": [record["text"] for record in records],
+                "records": records,
                 "embeddings": embeddings,
                 "stats": doc_stats
             }
@@ -0,0 +1,132 @@
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+import numpy as np
+from backend.config import INGEST_WORKERS, INGEST_FILE_TYPES
+from backend.processors.document_processor import DocumentProcessor
+from backend.processors.pdf_processor import PDFProcessor, shutdown_process_pools
+from backend.storage.collections import CollectionManager
+from backend.metrics import REGISTRY, STAGE_SECONDS, stage_timer
+from backend.tokenizer import CHUNK_STAT_FIELDS
+from backend.tracing import propagate, span
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_BATCH_SIZE = 5
+
+DOCUMENTS = REGISTRY.counter("rag_ingested_documents_total", "Documents ingested by file type")
+
+class IngestPipeline:
+    """Runs extraction, chunking, embedding and storage for uploads on a worker pool.
+
+    Heavy work stays in the API service, sized by INGEST_WORKERS, so the
+    frontend only uploads bytes. PDF extraction and OCR fan out further into
+    one process pool shared by all ingest threads.
+    """
+
+    def __init__(self, processor: DocumentProcessor, collections: CollectionManager,
+                 pdf_processor: Optional[PDFProcessor] = None, workers: int = INGEST_WORKERS):
+        self.processor = processor
+        self.collections = collections
+        self.pdf_processor = pdf_processor or PDFProcessor()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+
+    def extract_text(self, path: str, filename: str) -> str:
+        """Read the text of an uploaded file, extracting PDFs (with OCR if needed)."""
+        suffix = os.path.splitext(filename)[1].lower()
+        if suffix not in INGEST_FILE_TYPES:
+            raise ValueError(f"Unsupported file type '{suffix}'; expected one of {', '.join(INGEST_FILE_TYPES)}")
+        if suffix == ".pdf":
+            with open(path, 'rb') as f:
+                return self.pdf_processor.extract_text(f.read())
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except UnicodeDecodeError:
+            raise ValueError(f"{filename} is not valid UTF-8 text")
+
+    def process_text(self, text: str, source_name: str, collection: str, add_to_store: bool = True) -> Dict:
+        """Chunk and embed text, optionally adding it to a collection's store."""
+        start_time = time.time()
+        processed_records = []
+        embeddings_list = []
+
+        with span("ingest.chunk"):
+            records = self.processor.chunk_records(text)
+
+        with self.collections.use(collection) as active:
+            with span("ingest.embed", chunks=len(records)), stage_timer("ingest", "embed"):
+                for i in range(0, len(records), EMBEDDING_BATCH_SIZE):
+                    batch = records[i:i + EMBEDDING_BATCH_SIZE]
+                    try:
+                        batch_embeddings = self.processor.create_embeddings(
+                            [record["text"] for record in batch], cache_manager=active.cache_manager,
+                            token_counts=[record["tokens"] for record in batch]
+                        )
+                        processed_records.extend(batch)
+                        embeddings_list.extend(batch_embeddings)
+                    except Exception as batch_error:
+                        logger.error(f"Error processing batch {i // EMBEDDING_BATCH_SIZE}: {batch_error}")
+                        continue
+
+            processed_chunks = [record["text"] for record in processed_records]
+            embeddings = np.array(embeddings_list) if embeddings_list else np.array([])
+            if add_to_store and processed_chunks:
+                with span("ingest.store", chunks=len(processed_chunks)), stage_timer("ingest", "store"):
+                    active.vector_store.add_documents(
+                        processed_chunks, embeddings, source_name,
+                        [{field: record[field] for field in CHUNK_STAT_FIELDS} for record in processed_records]
+                    )
+
+        # Counted once at chunking time rather than re-splitting every chunk
+        total_words = sum(record["words"] for record in processed_records)
+        return {
+            "chunks": processed_chunks,
+            "records": processed_records,
+            "embeddings": embeddings,
+            "stats": {
+                "total_chunks": len(processed_chunks),
+                "processed_chunks": len(embeddings_list),
+                "total_words": total_words,
+                "total_tokens": sum(record["tokens"] for record in processed_records),
+                "avg_chunk_size": total_words / len(processed_chunks) if processed_chunks else 0,
+                "processing_time": time.time() - start_time
+            }
+        }
+
+    def ingest_file(self, path: str, filename: str, collection: str) -> Dict:
+        """Extract, chunk, embed and store an uploaded file; the file is removed afterwards."""
+        try:
+            start_time = time.time()
+            logger.info(f"Ingesting {filename} into collection '{collection}'")
+            with span("ingest.extract", filename=filename), stage_timer("ingest", "extract"):
+                text = self.extract_text(path, filename)
+            if not text or not text.strip():
+                raise ValueError(f"No text could be extracted from {filename}")
+            extraction_time = time.time() - start_time
+
+            result = self.process_text(text, filename, collection)
+            result["stats"]["extraction_time"] = extraction_time
+            result["stats"]["processing_time"] = time.time() - start_time
+            STAGE_SECONDS.observe(result["stats"]["processing_time"], component="ingest", stage="total")
+            DOCUMENTS.inc(kind=os.path.splitext(filename)[1].lower().lstrip("."))
+            logger.info(f"Ingested {filename}: {result['stats']['total_chunks']} chunks "
+                        f"in {result['stats']['processing_time']:.2f} seconds")
+            return result
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def submit_file(self, path: str, filename: str, collection: str) -> Future:
+        """Queue an uploaded file for ingestion on the worker pool."""
+        return self.executor.submit(propagate(self.ingest_file), path, filename, collection)
+
+    def submit_text(self, text: str, source_name: str, collection: str, add_to_store: bool = True) -> Future:
+        """Queue already extracted text for chunking and embedding on the worker pool."""
+        return self.executor.submit(propagate(self.process_text), text, source_name, collection, add_to_store)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+        shutdown_process_pools()
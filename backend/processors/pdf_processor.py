@@ -1,84 +1,371 @@
 import io
 import logging
+import multiprocessing
 import os
-from typing import Optional, List
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, Optional, List, Tuple
 import PyPDF2
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path, pdfinfo_from_bytes
 import pytesseract
 from PIL import Image
 import numpy as np
+from backend.storage.extraction_cache import ExtractionCache
+from backend.metrics import OCR_PAGES, STAGE_SECONDS, CACHE_REQUESTS, stage_timer
+from backend.config import (
+    PDF_PARALLEL_MIN_PAGES,
+    PDF_EXTRACTION_WORKERS,
+    OCR_WORKERS,
+    OCR_POLICY,
+    OCR_POLICIES,
+    OCR_MIN_CONFIDENCE,
+    OCR_QUEUE_DEPTH
+)
 
 logger = logging.getLogger(__name__)
 
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+
+def shared_process_pool(workers: int) -> ProcessPoolExecutor:
+    """Process-wide pool of PDF worker processes, shared by every concurrent ingest.
+
+    Each ingest thread used to start its own pool, so INGEST_WORKERS uploads
+    could run INGEST_WORKERS times as many tesseract processes as there are
+    cores. Workers start from a forkserver (spawn where unavailable) rather
+    than being forked from the multithreaded API process.
+    """
+    with _process_pools_lock:
+        pool = _process_pools.get(workers)
+        if pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = _process_pools[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method)
+            )
+        return pool
+
+def _discard_process_pool(workers: int, pool: ProcessPoolExecutor):
+    """Forget a pool whose worker died so the next extraction starts a fresh one."""
+    with _process_pools_lock:
+        if _process_pools.get(workers) is pool:
+            del _process_pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def shutdown_process_pools():
+    with _process_pools_lock:
+        pools = list(_process_pools.values())
+        _process_pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+def _extract_page_text(page, page_num: int) -> str:
+    """Extract text from a single PyPDF2 page, falling back to form annotations."""
+    try:
+        # Try direct text extraction
+        page_text = page.extract_text() or ""
+
+        # If no text found, try extracting from form annotations
+        if not page_text.strip() and '/Annots' in page:
+            annotations = []
+            for annot in page['/Annots']:
+                obj = annot.get_object()
+                if '/Contents' in obj:
+                    annotations.append(obj['/Contents'] + "\n")
+            page_text += "".join(annotations)
+
+        if page_text.strip():
+            logger.info(f"Extracted text from page {page_num + 1} using PyPDF2")
+        else:
+            logger.info(f"No text found on page {page_num + 1}, will try OCR")
+        return page_text
+
+    except Exception as e:
+        logger.warning(f"Failed to extract text from page {page_num + 1} using PyPDF2: {str(e)}")
+        return ""
+
+def _extract_page_range(pdf_bytes: bytes, start: int, end: int) -> List[str]:
+    """Process-pool worker: open the PDF and extract pages [start, end)."""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    return [_extract_page_text(pdf_reader.pages[i], i) for i in range(start, end)]
+
+OCR_CONFIG = '--psm 6'  # Assume uniform text block
+
+def _adaptive_threshold(gray: np.ndarray, offset: int = 10) -> np.ndarray:
+    """Binarize against the local mean so uneven lighting and faint scans survive.
+
+    Local sums come from separable running sums over an edge-padded copy;
+    intermediate results are updated in place instead of allocating a new
+    full-page array per step.
+    """
+    height, width = gray.shape
+    window = max(15, (min(height, width) // 40) | 1)
+    radius = window // 2
+    area = window * window
+    padded = np.pad(gray, radius, mode='edge')
+
+    # Vertical window sums, then horizontal window sums of those
+    column_sums = np.zeros((padded.shape[0] + 1, padded.shape[1]), dtype=np.int32)
+    np.cumsum(padded, axis=0, dtype=np.int32, out=column_sums[1:])
+    vertical = column_sums[window:] - column_sums[:-window]
+    row_sums = np.zeros((height, padded.shape[1] + 1), dtype=np.int32)
+    np.cumsum(vertical, axis=1, dtype=np.int32, out=row_sums[:, 1:])
+    box = row_sums[:, window:] - row_sums[:, :-window]
+
+    # Ink where the pixel is darker than the local mean by more than offset
+    box -= offset * area
+    scaled = gray.astype(np.int32)
+    scaled *= area
+    out = np.full((height, width), 255, dtype=np.uint8)
+    out[scaled < box] = 0
+    return out
+
+def _estimate_skew(binary: np.ndarray, max_angle: float = 5.0, step: float = 0.5) -> float:
+    """Estimate page rotation from horizontal projection sharpness on a thumbnail."""
+    stride = max(1, max(binary.shape) // 400)
+    ink = Image.fromarray(np.where(binary[::stride, ::stride] < 128, 255, 0).astype(np.uint8))
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-max_angle, max_angle + step, step):
+        rotated = np.asarray(ink.rotate(float(angle), resample=Image.NEAREST, fillcolor=0))
+        score = float(np.var(rotated.sum(axis=1, dtype=np.int64)))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+def _enhance_image_for_ocr(image: Image, deskew: bool = True) -> Image:
+    """Enhance image quality for better OCR results: grayscale, adaptive threshold, deskew."""
+    try:
+        # Convert to grayscale
+        enhanced = image.convert('L')
+        binary = _adaptive_threshold(np.asarray(enhanced))
+
+        if deskew:
+            angle = _estimate_skew(binary)
+            if abs(angle) >= 0.5:
+                logger.debug(f"Deskewing page by {angle:.1f} degrees")
+                return Image.fromarray(binary).rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+        return Image.fromarray(binary)
+    except Exception as e:
+        logger.warning(f"Image enhancement failed: {str(e)}")
+        return image
+
+def _ocr_image(image: Image, page_number: int) -> Tuple[Optional[str], float]:
+    """Enhance a rasterized page and run tesseract on it.
+
+    Returns the text (None if OCR failed) and tesseract's mean word confidence.
+    """
+    try:
+        # Enhance image for better OCR
+        enhanced_image = _enhance_image_for_ocr(image)
+
+        # One tesseract pass yields both the words and their confidences
+        data = pytesseract.image_to_data(
+            enhanced_image, config=OCR_CONFIG, output_type=pytesseract.Output.DICT
+        )
+        lines: Dict[Tuple[int, int, int], List[str]] = {}
+        confidences = []
+        for i, word in enumerate(data["text"]):
+            confidence = float(data["conf"][i])
+            if confidence < 0 or not word.strip():
+                continue
+            confidences.append(confidence)
+            key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            lines.setdefault(key, []).append(word)
+
+        page_text = "\n".join(" ".join(words) for words in lines.values())
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        if page_text.strip():
+            logger.info(f"Extracted text from page {page_number} using OCR (confidence {mean_confidence:.0f})")
+        return page_text, mean_confidence
+
+    except Exception as e:
+        logger.warning(f"Failed to perform OCR on page {page_number}: {str(e)}")
+        return None, 0.0
+
+def _ocr_page_from_file(pdf_path: str, page_number: int, dpi_ladder: Tuple[int, ...],
+                        min_confidence: float) -> Tuple[int, Optional[str], Dict]:
+    """Process-pool worker: rasterize and OCR one page, escalating DPI on low confidence.
+
+    Returns (page_number, text, metrics); text is None if every attempt failed.
+    """
+    metrics = {"page": page_number, "attempts": 0, "rasterize_s": 0.0, "ocr_s": 0.0}
+    best_text, best_confidence = None, -1.0
+
+    for dpi in dpi_ladder:
+        metrics["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+        except Exception as e:
+            logger.warning(f"Failed to rasterize page {page_number} at {dpi} DPI: {str(e)}")
+            continue
+        finally:
+            metrics["rasterize_s"] += time.perf_counter() - started
+        if not images:
+            continue
+
+        started = time.perf_counter()
+        text, confidence = _ocr_image(images[0], page_number)
+        metrics["ocr_s"] += time.perf_counter() - started
+        del images
+
+        if text is not None and confidence > best_confidence:
+            best_text, best_confidence = text, confidence
+            metrics["dpi"] = dpi
+            metrics["confidence"] = confidence
+        if best_confidence >= min_confidence:
+            break
+        if dpi != dpi_ladder[-1]:
+            logger.info(f"Low OCR confidence on page {page_number} at {dpi} DPI, escalating")
+
+    return page_number, best_text, metrics
+
 class PDFProcessor:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = PDF_EXTRACTION_WORKERS,
+                 parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+                 ocr_workers: Optional[int] = OCR_WORKERS, ocr_policy: str = OCR_POLICY,
+                 extraction_cache: Optional[ExtractionCache] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.parallel_min_pages = parallel_min_pages
+        self.ocr_workers = ocr_workers or os.cpu_count() or 1
+        if ocr_policy not in OCR_POLICIES:
+            raise ValueError(f"Unknown OCR policy '{ocr_policy}', expected one of {sorted(OCR_POLICIES)}")
+        self.ocr_policy = ocr_policy
+        self.ocr_dpi_ladder = OCR_POLICIES[ocr_policy]
+        self.ocr_min_confidence = OCR_MIN_CONFIDENCE
+        self.extraction_cache = extraction_cache or ExtractionCache()
         self.extraction_methods = [
             self._extract_with_pypdf,
             self._extract_with_ocr
         ]
 
-    def _extract_with_pypdf(self, pdf_bytes: bytes) -> Optional[str]:
-        """Extract text using PyPDF2."""
-        try:
-            text = ""
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    def _extract_pages_with_pypdf(self, pdf_bytes: bytes) -> List[str]:
+        """Extract per-page text with PyPDF2, in page order ('' for pages without text).
 
-            for page_num, page in enumerate(pdf_reader.pages):
-                try:
-                    # Try direct text extraction
-                    page_text = page.extract_text()
-
-                    # If no text found, try extracting from form annotations
-                    if not page_text.strip() and '/Annots' in page:
-                        for annot in page['/Annots']:
-                            obj = annot.get_object()
-                            if '/Contents' in obj:
-                                page_text += obj['/Contents'] + "\n"
-
-                    # Add page text without slide formatting
-                    if page_text.strip():
-                        text += page_text + "\n"
-                        logger.info(f"Extracted text from page {page_num + 1} using PyPDF2")
-                    else:
-                        logger.info(f"No text found on page {page_num + 1}, will try OCR")
+        Documents with at least parallel_min_pages pages are split into one
+        contiguous page range per worker and extracted in a process pool;
+        below that, process startup and re-parsing the PDF cost more than
+        they save.
+        """
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+        num_pages = len(pdf_reader.pages)
 
-                except Exception as e:
-                    logger.warning(f"Failed to extract text from page {page_num + 1} using PyPDF2: {str(e)}")
-                    continue
+        if num_pages < self.parallel_min_pages or self.max_workers <= 1:
+            return [_extract_page_text(page, i) for i, page in enumerate(pdf_reader.pages)]
+
+        workers = min(self.max_workers, num_pages)
+        range_size = -(-num_pages // workers)
+        ranges = [(start, min(start + range_size, num_pages)) for start in range(0, num_pages, range_size)]
+        logger.info(f"Extracting {num_pages} pages with {len(ranges)} worker processes")
 
+        pages: List[str] = []
+        executor = shared_process_pool(self.max_workers)
+        futures = [executor.submit(_extract_page_range, pdf_bytes, start, end) for start, end in ranges]
+        try:
+            for future in futures:
+                pages.extend(future.result())
+        except BrokenProcessPool:
+            _discard_process_pool(self.max_workers, executor)
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+        return pages
+
+    def _extract_with_pypdf(self, pdf_bytes: bytes) -> Optional[str]:
+        """Extract text using PyPDF2."""
+        try:
+            pages = self._extract_pages_with_pypdf(pdf_bytes)
+            # Join once instead of growing a string page by page
+            text = "\n".join(page for page in pages if page.strip())
             return text.strip() if text.strip() else None
 
         except Exception as e:
             logger.error(f"PyPDF2 extraction failed: {str(e)}")
             return None
 
-    def _extract_with_ocr(self, pdf_bytes: bytes) -> Optional[str]:
-        """Extract text using OCR."""
-        try:
-            # Convert PDF to images with higher DPI for better OCR
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-            text = ""
+    def _iter_ocr_pages(self, pdf_bytes: bytes, page_numbers: List[int],
+                        metrics: Optional[List[Dict]] = None) -> Iterator[Tuple[int, Optional[str]]]:
+        """OCR the given 1-based pages, yielding (page_number, text) in page order.
 
-            for i, image in enumerate(images):
-                try:
-                    # Enhance image for better OCR
-                    enhanced_image = self._enhance_image_for_ocr(image)
+        text is None for pages where rasterization or OCR failed. Per-page
+        timing and confidence are appended to metrics when a list is given.
 
-                    # Perform OCR on each page with improved configuration
-                    page_text = pytesseract.image_to_string(
-                        enhanced_image,
-                        config='--psm 6'  # Assume uniform text block
+        Each task rasterizes a single page from a temporary copy of the PDF, so
+        at most ocr_workers * OCR_QUEUE_DEPTH page images exist at once no
+        matter how long the document is.
+        """
+        page_numbers = sorted(page_numbers)
+        if not page_numbers:
+            return
+
+        fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(pdf_bytes)
+
+            if self.ocr_workers <= 1 or len(page_numbers) == 1:
+                for page_number in page_numbers:
+                    yield self._record_ocr_result(
+                        _ocr_page_from_file(pdf_path, page_number, self.ocr_dpi_ladder, self.ocr_min_confidence),
+                        metrics
                     )
+                return
 
-                    # Add page text if not empty
-                    if page_text.strip():
-                        text += page_text + "\n"
-                        logger.info(f"Extracted text from page {i + 1} using OCR")
+            # The pool is shared with other ingests; this window bounds only our own queued pages
+            max_in_flight = self.ocr_workers * OCR_QUEUE_DEPTH
+            executor = shared_process_pool(self.ocr_workers)
+            pending = deque()
+            try:
+                remaining = iter(page_numbers)
+                for page_number in remaining:
+                    pending.append(executor.submit(
+                        _ocr_page_from_file, pdf_path, page_number, self.ocr_dpi_ladder, self.ocr_min_confidence
+                    ))
+                    if len(pending) >= max_in_flight:
+                        break
+                while pending:
+                    result = pending.popleft().result()
+                    next_page = next(remaining, None)
+                    if next_page is not None:
+                        pending.append(executor.submit(
+                            _ocr_page_from_file, pdf_path, next_page, self.ocr_dpi_ladder, self.ocr_min_confidence
+                        ))
+                    yield self._record_ocr_result(result, metrics)
+            except BrokenProcessPool:
+                _discard_process_pool(self.ocr_workers, executor)
+                raise
+            finally:
+                # Abandoned or failed runs must not leave their pages queued on the shared pool
+                for future in pending:
+                    future.cancel()
+        finally:
+            os.remove(pdf_path)
 
-                except Exception as e:
-                    logger.warning(f"Failed to perform OCR on page {i + 1}: {str(e)}")
-                    continue
+    @staticmethod
+    def _record_ocr_result(result: Tuple[int, Optional[str], Dict],
+                           metrics: Optional[List[Dict]]) -> Tuple[int, Optional[str]]:
+        page_number, text, page_metrics = result
+        if metrics is not None:
+            metrics.append(page_metrics)
+        # OCR runs in worker processes; their timings are recorded here in the parent
+        STAGE_SECONDS.observe(page_metrics.get("rasterize_s", 0.0), component="pdf_processor", stage="rasterize")
+        STAGE_SECONDS.observe(page_metrics.get("ocr_s", 0.0), component="pdf_processor", stage="ocr")
+        if text is None:
+            OCR_PAGES.inc(outcome="failed")
+        else:
+            OCR_PAGES.inc(outcome="escalated" if page_metrics.get("attempts", 1) > 1 else "ok")
+        return page_number, text
 
+    def _extract_with_ocr(self, pdf_bytes: bytes) -> Optional[str]:
+        """Extract text using OCR on every page."""
+        try:
+            num_pages = pdfinfo_from_bytes(pdf_bytes)["Pages"]
+            pages = [text for _, text in self._iter_ocr_pages(pdf_bytes, list(range(1, num_pages + 1)))]
+            text = "\n".join(page for page in pages if page and page.strip())
             return text.strip() if text.strip() else None
 
         except Exception as e:
@@ -87,36 +374,97 @@ class PDFProcessor:
 
     def _enhance_image_for_ocr(self, image: Image) -> Image:
         """Enhance image quality for better OCR results."""
-        try:
-            # Convert to grayscale
-            enhanced = image.convert('L')
+        return _enhance_image_for_ocr(image)
 
-            # Increase contrast using numpy array operations
-            enhanced_array = np.array(enhanced)
-            enhanced_array = 255 * (enhanced_array > 128).astype('uint8')
-            enhanced = Image.fromarray(enhanced_array)
+    def _extraction_settings(self) -> Dict:
+        """Settings that change extracted text; part of the extraction cache key."""
+        return {
+            "pypdf": PyPDF2.__version__,
+            "ocr_policy": self.ocr_policy,
+            "ocr_dpi_ladder": list(self.ocr_dpi_ladder),
+            "ocr_min_confidence": self.ocr_min_confidence,
+            "ocr_config": OCR_CONFIG,
+            "ocr_preprocessing": "adaptive-threshold+deskew"
+        }
 
-            return enhanced
-        except Exception as e:
-            logger.warning(f"Image enhancement failed: {str(e)}")
-            return image
+    def extract_text(self, pdf_bytes: bytes, ocr_metrics: Optional[List[Dict]] = None) -> str:
+        """Extract text from PDF, deciding per page between PyPDF2 and OCR.
 
-    def extract_text(self, pdf_bytes: bytes) -> str:
-        """Extract text from PDF using multiple methods."""
+        Pages with an embedded text layer keep their PyPDF2 text; only pages
+        without one are rasterized and OCRed. Results are cached per page by
+        content digest, so re-uploads skip extraction and an interrupted OCR
+        run resumes where it stopped. If PyPDF2 cannot read the file at all,
+        each extraction method is tried on the whole document. Per-page OCR
+        metrics (DPI used, confidence, timings) are appended to ocr_metrics.
+        """
+        ocr_metrics = ocr_metrics if ocr_metrics is not None else []
         extracted_text = None
+        cache_key = self.extraction_cache.make_key(pdf_bytes, self._extraction_settings())
+        cached = self.extraction_cache.load(cache_key)
+        CACHE_REQUESTS.inc(
+            cache="extraction", namespace="pdf",
+            result="hit" if cached and cached["complete"] else "partial" if cached else "miss"
+        )
+        if cached and cached["complete"]:
+            logger.info("Using cached PDF extraction")
+            pages = [cached["pages"].get(n, "") for n in range(1, cached["num_pages"] + 1)]
+            extracted_text = "\n".join(page for page in pages if page.strip()).strip()
+            if not extracted_text:
+                raise ValueError("Failed to extract text from PDF using any available method")
+            return extracted_text
 
-        # Try each extraction method until one succeeds
-        for method in self.extraction_methods:
-            try:
-                extracted_text = method(pdf_bytes)
-                if extracted_text:
-                    logger.info(f"Successfully extracted text using {method.__name__}")
-                    break
-            except Exception as e:
-                logger.error(f"Error in {method.__name__}: {str(e)}")
-                continue
+        try:
+            with stage_timer("pdf_processor", "text_layer"):
+                pages = self._extract_pages_with_pypdf(pdf_bytes)
+        except Exception as e:
+            logger.error(f"PyPDF2 could not read PDF: {str(e)}")
+            pages = None
+
+        if pages is not None:
+            if cached is None:
+                self.extraction_cache.start(
+                    cache_key, len(pages), {i + 1: page for i, page in enumerate(pages) if page.strip()}
+                )
+            else:
+                # Resume: reuse pages OCRed before an earlier run was interrupted
+                for page_number, page_text in cached["pages"].items():
+                    if not pages[page_number - 1].strip():
+                        pages[page_number - 1] = page_text
+
+            missing = [i + 1 for i, page in enumerate(pages)
+                       if not page.strip() and (cached is None or i + 1 not in cached["pages"])]
+            failed = False
+            if missing:
+                logger.info(f"Running OCR on {len(missing)} of {len(pages)} pages without a text layer")
+                for page_number, page_text in self._iter_ocr_pages(pdf_bytes, missing, ocr_metrics):
+                    if page_text is None:
+                        failed = True
+                        continue
+                    pages[page_number - 1] = page_text
+                    self.extraction_cache.add_page(cache_key, page_number, page_text)
+                if ocr_metrics:
+                    ocr_time = sum(m["rasterize_s"] + m["ocr_s"] for m in ocr_metrics)
+                    escalated = sum(1 for m in ocr_metrics if m["attempts"] > 1)
+                    logger.info(
+                        f"OCR ({self.ocr_policy}) took {ocr_time:.1f}s over {len(ocr_metrics)} pages, "
+                        f"{escalated} escalated to higher DPI"
+                    )
+            if not failed:
+                self.extraction_cache.mark_complete(cache_key)
+            extracted_text = "\n".join(page for page in pages if page.strip()).strip()
+        else:
+            # Try each extraction method until one succeeds
+            for method in self.extraction_methods:
+                try:
+                    extracted_text = method(pdf_bytes)
+                    if extracted_text:
+                        logger.info(f"Successfully extracted text using {method.__name__}")
+                        break
+                except Exception as e:
+                    logger.error(f"Error in {method.__name__}: {str(e)}")
+                    continue
 
         if not extracted_text:
             raise ValueError("Failed to extract text from PDF using any available method")
 
-        return extracted_text
\ No newline at end of file
+        return extracted_text
@@ -0,0 +1,195 @@
+"""Sampling profiler for the live API service.
+
+A sampler reads every thread's stack with sys._current_frames() at a fixed
+interval and counts each stack in collapsed ("folded") form, the input
+format of flamegraph.pl and speedscope. Every sample counts toward the
+wall-clock profile; samples from threads that used CPU since the previous
+sample (per-thread CPU clocks, where the platform has them) also count
+toward the CPU profile.
+Render a flamegraph with:
+
+    flamegraph.pl .profiles/profile-<time>.cpu.collapsed > cpu.svg
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional
+from backend.config import PROFILE_INTERVAL
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_KINDS = ("wall", "cpu")
+MAX_STACK_DEPTH = 128  # Deeper stacks are truncated at the root end
+
+# Leaf frames of threads blocked in C calls; used as the idle test without thread CPU clocks
+_IDLE_FUNCTIONS = {"wait", "sleep", "select", "poll", "accept", "recv", "recv_into", "readinto", "_recv_bytes", "get"}
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another is being captured."""
+
+_capture_lock = threading.Lock()
+
+@lru_cache(maxsize=8192)
+def _frame_label(code) -> str:
+    path = code.co_filename.replace("\\", "/").split("/")
+    return f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+
+def _collapse(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+def _thread_cpu_ns(ident: int) -> Optional[int]:
+    """CPU time consumed by a thread, or None where per-thread clocks are unavailable."""
+    try:
+        return time.clock_gettime_ns(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+class Profile:
+    """Collapsed stack counts from one capture."""
+
+    def __init__(self, wall: Counter, cpu: Counter, interval: float, duration: float, overhead: float):
+        self.wall = wall
+        self.cpu = cpu
+        self.interval = interval
+        self.duration = duration
+        self.overhead = overhead
+
+    def collapsed(self, kind: str = "wall") -> str:
+        stacks = self.wall if kind == "wall" else self.cpu
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+    def top(self, kind: str = "wall", n: int = 10) -> List[Dict]:
+        """Functions with the most samples on top of the stack (self time)."""
+        stacks = self.wall if kind == "wall" else self.cpu
+        total = sum(stacks.values())
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        return [
+            {"frame": frame, "samples": count, "fraction": count / total}
+            for frame, count in leaves.most_common(n)
+        ]
+
+    def summary(self, n: int = 10) -> Dict:
+        return {
+            "duration": self.duration,
+            "interval": self.interval,
+            "samples": {kind: sum(getattr(self, kind).values()) for kind in PROFILE_KINDS},
+            "overhead": self.overhead,
+            "top": {kind: self.top(kind, n) for kind in PROFILE_KINDS}
+        }
+
+    def write(self, directory: str, name: Optional[str] = None) -> Dict[str, str]:
+        """Write <name>.wall.collapsed and <name>.cpu.collapsed; returns their paths by kind."""
+        os.makedirs(directory, exist_ok=True)
+        name = name or time.strftime("profile-%Y%m%d-%H%M%S")
+        paths = {}
+        for kind in PROFILE_KINDS:
+            paths[kind] = os.path.join(directory, f"{name}.{kind}.collapsed")
+            with open(paths[kind], "w") as f:
+                f.write(self.collapsed(kind))
+        return paths
+
+class SamplingProfiler:
+    """Samples all threads' stacks every interval seconds, from a background thread or the caller's."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self._wall = Counter()
+        self._cpu = Counter()
+        self._cpu_ns: Dict[int, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+        self._sampler_cpu = 0.0
+        self.profile: Optional[Profile] = None
+
+    def _sample(self, own_ident: int):
+        threads = {t.ident: t for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread = threads.get(ident)
+            # Pool workers differ only by a numeric suffix; merge them into one root
+            root = re.sub(r"_\d+$", "", thread.name) if thread else f"thread-{ident}"
+            stack = f"{root};{_collapse(frame)}"
+            self._wall[stack] += 1
+            if self._on_cpu(ident, frame):
+                self._cpu[stack] += 1
+
+    def _on_cpu(self, ident: int, frame) -> bool:
+        cpu_ns = _thread_cpu_ns(ident)
+        if cpu_ns is None:
+            return frame.f_code.co_name not in _IDLE_FUNCTIONS
+        previous = self._cpu_ns.get(ident)
+        self._cpu_ns[ident] = cpu_ns
+        # Waking up to check a condition costs microseconds; count real work only
+        return previous is not None and cpu_ns - previous > self.interval * 1e9 * 0.1
+
+    def _run(self, deadline: Optional[float] = None):
+        own_ident = threading.get_ident()
+        cpu_start = time.thread_time()
+        next_sample = time.perf_counter()
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            if deadline is not None and now >= deadline:
+                break
+            self._sample(own_ident)
+            # Fall behind rather than burst when sampling takes longer than the interval
+            next_sample = max(next_sample + self.interval, time.perf_counter())
+            self._stop.wait(max(0.0, next_sample - time.perf_counter()))
+        self._sampler_cpu = time.thread_time() - cpu_start
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self._profile()
+
+    def run(self, seconds: float) -> Profile:
+        """Sample in the calling thread for seconds and return the profile."""
+        self._started = time.perf_counter()
+        self._stop.clear()
+        self._run(deadline=self._started + seconds)
+        return self._profile()
+
+    def _profile(self) -> Profile:
+        duration = time.perf_counter() - self._started
+        return Profile(Counter(self._wall), Counter(self._cpu), self.interval, duration,
+                       self._sampler_cpu / duration if duration else 0.0)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile = self.stop()
+
+def capture_profile(seconds: float, interval: float = PROFILE_INTERVAL) -> Profile:
+    """Profile this process's threads for seconds; only one capture may run at a time.
+
+    Child processes, such as the shared PDF extraction and OCR pool, are not sampled.
+    """
+    if not _capture_lock.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already being captured")
+    try:
+        logger.info(f"Capturing a {seconds:.1f}s sampling profile at {interval * 1000:.1f}ms intervals")
+        return SamplingProfiler(interval).run(seconds)
+    finally:
+        _capture_lock.release()
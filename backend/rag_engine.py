@@ -1,38 +1,69 @@
-from typing import Dict, List
-import numpy as np
-from mistralai.client import MistralClient
-from backend.config import MISTRAL_API_KEY, LLM_MODEL, SYSTEM_PROMPT
+import hashlib
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from backend.config import MISTRAL_API_KEY, LLM_MODEL, SYSTEM_PROMPT, RERANK_ENABLED, RERANK_CANDIDATES, CONTEXT_TOKEN_BUDGET
+from backend.context_builder import build_context
+from backend.processors.document_processor import get_mistral_client
 from backend.storage.cache_manager import CacheManager
+from backend.storage.semantic_cache import SemanticCache
+from backend.rerank import CrossEncoderReranker, get_reranker
+from backend.metrics import QUERIES, STAGE_SECONDS, stage_timer
+from backend.tracing import Span, end_span, span, start_span
 import logging
 
 logger = logging.getLogger(__name__)
 
 class RAGEngine:
-    def __init__(self, document_processor, vector_store):
+    def __init__(self, document_processor, vector_store, cache_manager: Optional[CacheManager] = None,
+                 reranker: Optional[CrossEncoderReranker] = None):
         self.document_processor = document_processor
         self.vector_store = vector_store
-        self.cache_manager = CacheManager()
+        self.cache_manager = cache_manager or CacheManager()
+        self.semantic_cache = SemanticCache()
+        self.reranker = reranker if reranker is not None else (get_reranker() if RERANK_ENABLED else None)
 
         # Validate API key
         if not MISTRAL_API_KEY:
             raise ValueError("Mistral API key is not set. Please set the MISTRAL_API_KEY environment variable.")
 
-        try:
-            self.client = MistralClient(api_key=MISTRAL_API_KEY)
-        except Exception as e:
-            raise ValueError(f"Failed to initialize Mistral client: {str(e)}")
+        self._client = None
 
-    def process_query(self, query: str, k: int = 3) -> Dict:
-        """Process a query and generate a response using RAG with caching."""
-        try:
-            # Check cache first
-            cached_result = self.cache_manager.get_query_cache(query)
-            if cached_result:
-                logger.info("Using cached query result")
-                return cached_result
+    @property
+    def client(self):
+        """Mistral client, created on first use rather than at startup."""
+        if self._client is None:
+            try:
+                self._client = get_mistral_client()
+            except Exception as e:
+                raise ValueError(f"Failed to initialize Mistral client: {str(e)}")
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @staticmethod
+    def _chunk_signature(chunks: List[Dict]) -> str:
+        """Fingerprint the retrieved chunks so answers are only reused over identical context."""
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk["source"].encode("utf-8"))
+            digest.update(b"\0")
+            digest.update(chunk["text"].encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
 
-            # Generate query embedding using Mistral
+    @staticmethod
+    def _source_versions(chunks: List[Dict]) -> Dict[str, int]:
+        """Versions of the sources an answer was generated from."""
+        return {chunk["source"]: chunk.get("version", 0) for chunk in chunks}
+
+    def _retrieve_context(self, query: str, k: int) -> Tuple[List[float], List[Dict], str]:
+        """Embed the query, retrieve relevant chunks and build the prompt context."""
+        # Generate query embedding using Mistral
+        with span("rag.query_embedding") as embedding_span, stage_timer("rag_engine", "query_embedding"):
             cached_embedding = self.cache_manager.get_embedding_cache(query)
+            embedding_span.set_attribute("cached", bool(cached_embedding))
             if cached_embedding:
                 logger.info("Using cached query embedding")
                 query_embedding = cached_embedding
@@ -40,53 +71,143 @@ class RAGEngine:
                 query_embedding = self.document_processor.create_embeddings([query])[0]
                 self.cache_manager.cache_embedding(query, query_embedding.tolist())
 
-            # Retrieve relevant chunks
-            relevant_chunks = self.vector_store.search(query_embedding, k)
+        # Retrieve relevant chunks; a reranker rescores a wider, cheap candidate set down to k
+        candidates = max(k, RERANK_CANDIDATES) if self.reranker else k
+        with span("rag.search", k=candidates), stage_timer("rag_engine", "retrieve"):
+            relevant_chunks = self.vector_store.search(query_embedding, candidates)
+        if self.reranker:
+            with stage_timer("rag_engine", "rerank"):
+                relevant_chunks = self.reranker.rerank(query, relevant_chunks, k)
 
-            # Prepare context with source information and token limit
-            context_parts = []
-            total_tokens = 0
-            max_tokens = 60000  # Keep total context well under model's limit
+        # Pack the most relevant chunks per token into the budget, merging adjacent ones
+        with span("rag.build_context") as context_span:
+            packed = build_context(relevant_chunks, CONTEXT_TOKEN_BUDGET)
+            context_span.set_attribute("tokens", packed["tokens"])
 
-            for chunk in relevant_chunks:
-                chunk_text = f"From document '{chunk['source']}':\n{chunk['text']}"
-                # Approximate token count (roughly 4 chars per token)
-                estimated_tokens = len(chunk_text) // 4
+        return query_embedding, packed["chunks"], packed["context"]
 
-                if total_tokens + estimated_tokens > max_tokens:
-                    break
+    def process_query(self, query: str, k: int = 3) -> Dict:
+        """Process a query and generate a response using RAG with caching."""
+        try:
+            with span("rag.process_query", k=k) as query_span:
+                # Check cache first; answers whose sources changed are invalidated
+                versions = self.vector_store.get_versions()
+                cached_result = self.cache_manager.get_query_cache(query, versions)
+                if cached_result:
+                    logger.info("Using cached query result")
+                    QUERIES.inc(path="query_cache")
+                    query_span.set_attribute("path", "query_cache")
+                    return cached_result
 
-                context_parts.append(chunk_text)
-                total_tokens += estimated_tokens
+                query_embedding, relevant_chunks, context = self._retrieve_context(query, k)
 
-            context = "\n\n".join(context_parts)
+                # Reuse an answer to a near-identical question over the same chunks
+                signature = self._chunk_signature(relevant_chunks)
+                semantic_result = self.semantic_cache.lookup(query_embedding, signature)
+                if semantic_result:
+                    QUERIES.inc(path="semantic_cache")
+                    query_span.set_attribute("path", "semantic_cache")
+                    return semantic_result
 
-            # Generate response
-            response = self.generate_response(query, context)
+                # Generate response
+                with stage_timer("rag_engine", "generate"):
+                    response = self.generate_response(query, context)
+                QUERIES.inc(path="generated")
+                query_span.set_attribute("path", "generated")
 
-            result = {
-                "response": response,
-                "context": relevant_chunks
-            }
+                result = {
+                    "response": response,
+                    "context": relevant_chunks
+                }
 
-            # Cache the result
-            self.cache_manager.cache_query(query, result)
+                # Cache the result
+                self.cache_manager.cache_query(
+                    query, result, self._source_versions(relevant_chunks), versions["generation"]
+                )
+                self.semantic_cache.add(query_embedding, signature, result)
 
-            return result
+                return result
         except Exception as e:
             logger.error(f"Failed to process query: {str(e)}")
             raise Exception(f"Failed to process query: {e}")
 
+    def stream_query(self, query: str, k: int = 3,
+                     on_context: Optional[Callable[[List[Dict]], None]] = None) -> Iterator[str]:
+        """Process a query like process_query, yielding the response as it is generated.
+
+        The retrieved chunks are passed to on_context before the first token is
+        yielded. The full response is cached once the stream completes.
+        """
+        # Spans are never current across a yield, so tracing cannot leak into the consumer
+        query_span = start_span("rag.stream_query", k=k)
+        error = None
+        try:
+            with span("rag.prepare", trace_id=query_span.trace_id, parent_id=query_span.span_id):
+                versions = self.vector_store.get_versions()
+                cached_result = self.cache_manager.get_query_cache(query, versions)
+                if not cached_result:
+                    query_embedding, relevant_chunks, context = self._retrieve_context(query, k)
+                    signature = self._chunk_signature(relevant_chunks)
+                    semantic_result = self.semantic_cache.lookup(query_embedding, signature)
+
+            if cached_result:
+                logger.info("Using cached query result")
+                if on_context:
+                    on_context(cached_result["context"])
+                QUERIES.inc(path="query_cache")
+                query_span.set_attribute("path", "query_cache")
+                yield cached_result["response"]
+                return
+
+            if on_context:
+                on_context(relevant_chunks)
+
+            if semantic_result:
+                QUERIES.inc(path="semantic_cache")
+                query_span.set_attribute("path", "semantic_cache")
+                yield semantic_result["response"]
+                return
+
+            response_parts = []
+            start = time.perf_counter()
+            for token in self.generate_response_stream(query, context, parent_span=query_span):
+                if not response_parts:
+                    STAGE_SECONDS.observe(time.perf_counter() - start, component="rag_engine", stage="first_token")
+                response_parts.append(token)
+                yield token
+            STAGE_SECONDS.observe(time.perf_counter() - start, component="rag_engine", stage="generate")
+            QUERIES.inc(path="generated")
+            query_span.set_attribute("path", "generated")
+
+            result = {
+                "response": "".join(response_parts),
+                "context": relevant_chunks
+            }
+            self.cache_manager.cache_query(
+                query, result, self._source_versions(relevant_chunks), versions["generation"]
+            )
+            self.semantic_cache.add(query_embedding, signature, result)
+        except Exception as e:
+            error = e
+            logger.error(f"Failed to stream query: {str(e)}")
+            raise Exception(f"Failed to process query: {e}")
+        finally:
+            end_span(query_span, error)
+
+    def _build_messages(self, query: str, context: str) -> List[Dict]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
+        ]
+
     def generate_response(self, query: str, context: str) -> str:
         """Generate a response using Mistral's model."""
         try:
-            response = self.client.chat(
-                model=LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": f"Context:\n{context}\n\nQuestion: {query}"}
-                ]
-            )
+            with span("mistral.chat", model=LLM_MODEL):
+                response = self.client.chat(
+                    model=LLM_MODEL,
+                    messages=self._build_messages(query, context)
+                )
 
             return response.choices[0].message.content
         except Exception as e:
@@ -94,9 +215,41 @@ class RAGEngine:
                 raise Exception("Invalid Mistral API key. Please check your API key and try again.")
             raise Exception(f"Failed to generate response: {e}")
 
+    def generate_response_stream(self, query: str, context: str, parent_span: Optional[Span] = None) -> Iterator[str]:
+        """Generate a response using Mistral's streaming chat API, yielding text deltas."""
+        chat_span = start_span("mistral.chat_stream", parent=parent_span, model=LLM_MODEL)
+        error = None
+        tokens = 0
+        try:
+            for chunk in self.client.chat_stream(
+                model=LLM_MODEL,
+                messages=self._build_messages(query, context)
+            ):
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    if not tokens:
+                        chat_span.set_attribute("first_token_ms", (time.time_ns() - chat_span.start_ns) / 1e6)
+                    tokens += 1
+                    yield content
+        except Exception as e:
+            error = e
+            if 'invalid_api_key' in str(e).lower():
+                raise Exception("Invalid Mistral API key. Please check your API key and try again.")
+            raise Exception(f"Failed to generate response: {e}")
+        finally:
+            chat_span.set_attribute("tokens", tokens)
+            end_span(chat_span, error)
+
+    def get_cache_stats(self) -> Dict:
+        """Return semantic cache hit-rate metrics."""
+        return self.semantic_cache.stats()
+
     def clear_cache(self):
         """Clear all cached data."""
         self.cache_manager.clear_cache()
+        self.semantic_cache.clear()
 
     def clean_expired_cache(self):
         """Remove expired cache entries."""
@@ -0,0 +1,117 @@
+import hashlib
+import importlib.util
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from backend.config import (
+    RERANK_MODEL,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_BYTES
+)
+from backend.storage.memory_cache import MemoryCache
+from backend.metrics import CACHE_REQUESTS, stage_timer
+from backend.tracing import span
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Scores (query, chunk text) pairs; higher means more relevant
+Scorer = Callable[[List[Tuple[str, str]]], Sequence[float]]
+
+def reranking_available() -> bool:
+    """Whether sentence-transformers is installed for the default cross-encoder."""
+    return importlib.util.find_spec("sentence_transformers") is not None
+
+class CrossEncoderReranker:
+    """Rescores vector-search candidates with a cross-encoder, caching scores per (query, chunk).
+
+    The model is loaded on first use. Pass scorer to use another model,
+    for example an LLM relevance prompt, in place of the cross-encoder.
+    Reranking is an optional quality stage: if the model cannot be loaded
+    or fails to score, candidates are returned in vector-search order.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, batch_size: int = RERANK_BATCH_SIZE,
+                 cache_bytes: int = RERANK_CACHE_BYTES, scorer: Optional[Scorer] = None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = MemoryCache(cache_bytes)
+        self._scorer = scorer
+        self._load_lock = threading.Lock()
+        # A model that failed to load (offline host, missing weights) is not retried per query
+        self._load_error: Optional[Exception] = None
+        self._failure_logged = False
+
+    def _get_scorer(self) -> Scorer:
+        with self._load_lock:
+            if self._load_error is not None:
+                raise self._load_error
+            if self._scorer is None:
+                try:
+                    from sentence_transformers import CrossEncoder
+                    with stage_timer("reranker", "load"):
+                        model = CrossEncoder(self.model_name)
+                except Exception as e:
+                    logger.error(f"Failed to load reranker model {self.model_name}: {str(e)}")
+                    self._load_error = Exception(f"Failed to load reranker model: {e}")
+                    raise self._load_error
+                logger.info(f"Loaded reranker model {self.model_name}")
+                self._scorer = lambda pairs: model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            return self._scorer
+
+    def _cache_key(self, query: str, text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.model_name, query, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def score(self, query: str, texts: List[str]) -> List[float]:
+        """Relevance of each text to the query; only uncached pairs reach the model."""
+        keys = [self._cache_key(query, text) for text in texts]
+        scores: List[Optional[float]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, cached in enumerate(scores) if cached is None]
+        CACHE_REQUESTS.inc(len(texts) - len(missing), cache="rerank", namespace="score", result="hit")
+        CACHE_REQUESTS.inc(len(missing), cache="rerank", namespace="score", result="miss")
+
+        if missing:
+            scorer = self._get_scorer()
+            with stage_timer("reranker", "score"):
+                for start in range(0, len(missing), self.batch_size):
+                    batch = missing[start:start + self.batch_size]
+                    batch_scores = scorer([(query, texts[i]) for i in batch])
+                    for i, value in zip(batch, batch_scores):
+                        scores[i] = float(value)
+                        self.cache.set(keys[i], scores[i], size=len(keys[i]) + 64)
+        return scores
+
+    def rerank(self, query: str, candidates: List[Dict], k: int) -> List[Dict]:
+        """The k candidates the cross-encoder scores highest, each with its rerank_score added."""
+        if not candidates:
+            return []
+        with span("rag.rerank", candidates=len(candidates), k=k):
+            try:
+                scores = self.score(query, [candidate["text"] for candidate in candidates])
+            except Exception as e:
+                if not self._failure_logged:
+                    self._failure_logged = True
+                    logger.warning(f"Reranking failed, keeping vector-search order: {str(e)}")
+                return candidates[:k]
+        ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: pair[0], reverse=True)
+        return [{**candidates[i], "rerank_score": score} for score, i in ranked[:k]]
+
+    def stats(self) -> Dict:
+        return {"model": self.model_name, "loaded": self._scorer is not None, **self.cache.stats()}
+
+_reranker: Optional[CrossEncoderReranker] = None
+_reranker_lock = threading.Lock()
+
+def get_reranker() -> Optional[CrossEncoderReranker]:
+    """Process-wide reranker, or None when sentence-transformers is not installed."""
+    global _reranker
+    with _reranker_lock:
+        if _reranker is None:
+            if not reranking_available():
+                logger.warning("Reranking is enabled but sentence-transformers is not installed; skipping it")
+                return None
+            _reranker = CrossEncoderReranker()
+        return _reranker
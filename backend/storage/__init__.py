@@ -1,3 +1,19 @@
 # Initialize backend.storage package
-from .cache_manager import CacheManager
-from .vector_store import VectorStore
\ No newline at end of file
+# Exports are imported on first access (PEP 562) to keep startup cheap
+import importlib
+
+_EXPORTS = {
+    "CacheManager": ".cache_manager",
+    "VectorStore": ".vector_store",
+    "RemoteVectorStore": ".remote_vector_store",
+    "SemanticCache": ".semantic_cache",
+    "MemoryCache": ".memory_cache",
+    "ExtractionCache": ".extraction_cache"
+}
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+__all__ = list(_EXPORTS)
@@ -1,54 +1,190 @@
 import os
 import json
 import time
+import hashlib
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-import numpy as np
+import threading
+import weakref
+import tempfile
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime, timedelta
+from backend.config import CACHE_DIR, CACHE_MEMORY_BYTES, CACHE_MAX_DISK_ENTRIES, CACHE_SWEEP_INTERVAL
+from backend.storage.memory_cache import MemoryCache, estimate_size
+from backend.metrics import CACHE_REQUESTS, stage_timer
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows; fall back to in-process locking only
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# One daemon thread sweeps expired entries for every live CacheManager
+_sweeper_managers: "weakref.WeakSet[CacheManager]" = weakref.WeakSet()
+_sweeper_lock = threading.Lock()
+_sweeper_thread: Optional[threading.Thread] = None
+
+def _sweep_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        for manager in list(_sweeper_managers):
+            manager.clean_expired_entries()
+
+def _register_for_sweeping(manager: "CacheManager", interval: float):
+    global _sweeper_thread
+    with _sweeper_lock:
+        _sweeper_managers.add(manager)
+        if _sweeper_thread is None:
+            _sweeper_thread = threading.Thread(
+                target=_sweep_loop, args=(interval,), name="cache-sweeper", daemon=True
+            )
+            _sweeper_thread.start()
+
 class CacheManager:
-    def __init__(self, cache_dir: str = ".cache"):
-        """Initialize cache manager with directory path."""
+    """Two-tier cache: a bounded in-memory LRU in front of size-capped JSON files.
+
+    The memory tier is per process while the files are shared, so each file's
+    inode and mtime are remembered after this process last wrote or read it;
+    when another process has replaced the file since, that namespace's memory
+    entries are dropped before they can be served.
+    """
+
+    def __init__(self, cache_dir: str = CACHE_DIR, memory_bytes: int = CACHE_MEMORY_BYTES,
+                 max_disk_entries: int = CACHE_MAX_DISK_ENTRIES,
+                 sweep_interval: Optional[float] = CACHE_SWEEP_INTERVAL):
+        """Initialize cache manager with directory path and tier limits."""
         self.cache_dir = cache_dir
         self.embedding_cache_file = os.path.join(cache_dir, "embeddings_cache.json")
         self.query_cache_file = os.path.join(cache_dir, "query_cache.json")
+        self._namespaces = {self.embedding_cache_file: "embedding", self.query_cache_file: "query"}
+        self._disk_state: Dict[str, Optional[tuple]] = {}
         self.cache_ttl = timedelta(hours=24)  # Cache TTL of 24 hours
+        self.memory_cache = MemoryCache(memory_bytes)
+        self.max_disk_entries = max_disk_entries
+        self.disk_hits = 0
+        self.disk_misses = 0
+        self.disk_evictions = 0
+        self.expired_removed = 0
+        self._thread_lock = threading.RLock()
         self._init_cache()
+        if sweep_interval:
+            _register_for_sweeping(self, sweep_interval)
 
     def _init_cache(self):
         """Initialize cache directory and files."""
         try:
             os.makedirs(self.cache_dir, exist_ok=True)
-            # Initialize embedding cache if not exists
-            if not os.path.exists(self.embedding_cache_file):
-                self._save_cache({}, self.embedding_cache_file)
-            # Initialize query cache if not exists
-            if not os.path.exists(self.query_cache_file):
-                self._save_cache({}, self.query_cache_file)
+            # Initialize cache files if not exists; another process may race us
+            for cache_file in (self.embedding_cache_file, self.query_cache_file):
+                if not os.path.exists(cache_file):
+                    with self._locked(cache_file):
+                        if not os.path.exists(cache_file):
+                            self._save_cache({}, cache_file)
         except Exception as e:
             logger.error(f"Failed to initialize cache: {e}")
             raise
 
+    @staticmethod
+    def _make_key(text: str) -> str:
+        """Stable cache key; unlike hash() it is the same in every process."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _locked(self, cache_file: str):
+        """Hold an exclusive lock on a cache file across threads and processes."""
+        with self._thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(cache_file + ".lock", 'a') as lock_file:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    @staticmethod
+    def _file_state(cache_file: str) -> Optional[tuple]:
+        """Inode and mtime of a cache file; every save replaces it with a new inode."""
+        try:
+            stat = os.stat(cache_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _sync_memory(self, cache_file: str):
+        """Drop a namespace's memory entries if another process replaced its file."""
+        with self._thread_lock:
+            state = self._file_state(cache_file)
+            if state != self._disk_state.get(cache_file, state):
+                logger.debug(f"{cache_file} changed on disk; dropping its memory entries")
+                self.memory_cache.delete_prefix(f"{self._namespaces[cache_file]}:")
+            self._disk_state[cache_file] = state
+
+    def _mark_synced(self, cache_file: str):
+        """Record a file this process just wrote so it does not invalidate its own entries."""
+        self._disk_state[cache_file] = self._file_state(cache_file)
+
     def _load_cache(self, cache_file: str) -> Dict:
-        """Load cache from file."""
+        """Load cache from file.
+
+        Writes are atomic renames, so readers never need the lock. A file that
+        still fails to parse is moved aside instead of being silently treated
+        as empty and overwritten by the next write.
+        """
         try:
             if os.path.exists(cache_file):
-                with open(cache_file, 'r') as f:
+                with stage_timer("cache_manager", "load"), open(cache_file, 'r') as f:
                     return json.load(f)
             return {}
+        except json.JSONDecodeError as e:
+            corrupt_file = f"{cache_file}.corrupt-{int(time.time())}"
+            logger.error(f"Corrupt cache file {cache_file} ({e}); moving it to {corrupt_file}")
+            try:
+                os.replace(cache_file, corrupt_file)
+            except OSError:
+                pass
+            return {}
         except Exception as e:
             logger.error(f"Failed to load cache from {cache_file}: {e}")
             return {}
 
     def _save_cache(self, cache_data: Dict, cache_file: str):
-        """Save cache to file."""
+        """Save cache to file atomically via a temporary file and rename."""
+        tmp_path = None
         try:
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
+            with stage_timer("cache_manager", "save"):
+                fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file) or ".", suffix=".tmp")
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(cache_data, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, cache_file)
         except Exception as e:
             logger.error(f"Failed to save cache to {cache_file}: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _update_cache(self, cache_file: str, update: Callable[[Dict], None]):
+        """Read-modify-write a cache file under the cross-process lock."""
+        with self._locked(cache_file):
+            self._sync_memory(cache_file)
+            cache = self._load_cache(cache_file)
+            update(cache)
+            self._save_cache(cache, cache_file)
+            self._mark_synced(cache_file)
+
+    def _enforce_disk_limit(self, cache: Dict):
+        """Evict the oldest entries once a cache file exceeds its entry limit."""
+        if len(cache) <= self.max_disk_entries:
+            return
+        # Evict down to 90% of the limit so the sort is not repeated on every write
+        target = int(self.max_disk_entries * 0.9)
+        oldest = sorted(cache, key=lambda k: cache[k]["timestamp"])
+        for key in oldest[:len(cache) - target]:
+            del cache[key]
+            self.disk_evictions += 1
 
     def _is_cache_valid(self, timestamp: str) -> bool:
         """Check if cache entry is still valid based on TTL."""
@@ -58,15 +194,30 @@ class CacheManager:
         except Exception:
             return False
 
+    def _get_entry(self, namespace: str, cache_file: str, key: str) -> Optional[Dict]:
+        """Look up an entry in the memory tier, falling back to (and promoting from) disk."""
+        memory_key = f"{namespace}:{key}"
+        self._sync_memory(cache_file)
+        entry = self.memory_cache.get(memory_key)
+        if entry is not None:
+            CACHE_REQUESTS.inc(cache="cache_manager", namespace=namespace, result="memory_hit")
+            return entry
+        entry = self._load_cache(cache_file).get(key)
+        if entry is None:
+            self.disk_misses += 1
+            CACHE_REQUESTS.inc(cache="cache_manager", namespace=namespace, result="miss")
+            return None
+        self.disk_hits += 1
+        CACHE_REQUESTS.inc(cache="cache_manager", namespace=namespace, result="disk_hit")
+        self.memory_cache.set(memory_key, entry)
+        return entry
+
     def get_embedding_cache(self, text: str) -> Optional[List[float]]:
         """Get cached embedding for text if available."""
         try:
-            cache = self._load_cache(self.embedding_cache_file)
-            cache_key = hash(text)
-            if str(cache_key) in cache:
-                entry = cache[str(cache_key)]
-                if self._is_cache_valid(entry["timestamp"]):
-                    return entry["embedding"]
+            entry = self._get_entry("embedding", self.embedding_cache_file, self._make_key(text))
+            if entry and self._is_cache_valid(entry["timestamp"]):
+                return entry["embedding"]
             return None
         except Exception as e:
             logger.error(f"Error retrieving from embedding cache: {e}")
@@ -74,49 +225,99 @@ class CacheManager:
 
     def cache_embedding(self, text: str, embedding: List[float]):
         """Cache embedding for text."""
+        self.cache_embeddings({text: embedding})
+
+    def cache_embeddings(self, embeddings: Dict[str, List[float]]):
+        """Cache several embeddings with a single read-modify-write of the file."""
+        if not embeddings:
+            return
         try:
-            cache = self._load_cache(self.embedding_cache_file)
-            cache_key = hash(text)
-            cache[str(cache_key)] = {
-                "embedding": embedding,
-                "timestamp": datetime.now().isoformat()
+            timestamp = datetime.now().isoformat()
+            entries = {
+                self._make_key(text): {"embedding": embedding, "timestamp": timestamp}
+                for text, embedding in embeddings.items()
             }
-            self._save_cache(cache, self.embedding_cache_file)
+
+            def update(cache: Dict):
+                cache.update(entries)
+                self._enforce_disk_limit(cache)
+
+            with self._thread_lock:
+                self._update_cache(self.embedding_cache_file, update)
+                for cache_key, entry in entries.items():
+                    self.memory_cache.set(f"embedding:{cache_key}", entry, estimate_size(entry["embedding"]) + 128)
         except Exception as e:
             logger.error(f"Error saving to embedding cache: {e}")
 
-    def get_query_cache(self, query: str) -> Optional[Dict[str, Any]]:
-        """Get cached query result if available."""
+    def _is_corpus_current(self, entry: Dict, current_versions: Optional[Dict]) -> bool:
+        """Check that the sources a cached answer used have not changed since."""
+        if current_versions is None:
+            return True
+        if "sources" not in entry:
+            # Untagged entries predate versioning; their sources are unknown
+            return False
+        if entry.get("generation") == current_versions["generation"]:
+            return True
+        current_sources = current_versions["sources"]
+        return all(
+            current_sources.get(source) == version
+            for source, version in entry["sources"].items()
+        )
+
+    def get_query_cache(self, query: str, current_versions: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
+        """Get cached query result if available and its sources are unchanged.
+
+        current_versions is the store's get_versions() snapshot; entries whose
+        sources changed are removed so answers over other sources stay warm.
+        """
         try:
-            cache = self._load_cache(self.query_cache_file)
-            cache_key = hash(query)
-            if str(cache_key) in cache:
-                entry = cache[str(cache_key)]
-                if self._is_cache_valid(entry["timestamp"]):
-                    return entry["result"]
+            cache_key = self._make_key(query)
+            entry = self._get_entry("query", self.query_cache_file, cache_key)
+            if entry is None:
+                return None
+            if not self._is_corpus_current(entry, current_versions):
+                logger.info("Invalidating cached query result: sources changed")
+                self.memory_cache.delete(f"query:{cache_key}")
+                self._update_cache(self.query_cache_file, lambda cache: cache.pop(cache_key, None))
+                return None
+            if self._is_cache_valid(entry["timestamp"]):
+                return entry["result"]
             return None
         except Exception as e:
             logger.error(f"Error retrieving from query cache: {e}")
             return None
 
-    def cache_query(self, query: str, result: Dict[str, Any]):
-        """Cache query result."""
+    def cache_query(self, query: str, result: Dict[str, Any],
+                    source_versions: Optional[Dict[str, int]] = None, generation: Optional[int] = None):
+        """Cache query result, tagged with the versions of the sources it used."""
         try:
-            cache = self._load_cache(self.query_cache_file)
-            cache_key = hash(query)
-            cache[str(cache_key)] = {
+            cache_key = self._make_key(query)
+            entry = {
                 "result": result,
                 "timestamp": datetime.now().isoformat()
             }
-            self._save_cache(cache, self.query_cache_file)
+            if source_versions is not None:
+                entry["sources"] = source_versions
+                entry["generation"] = generation
+
+            def update(cache: Dict):
+                cache[cache_key] = entry
+                self._enforce_disk_limit(cache)
+
+            with self._thread_lock:
+                self._update_cache(self.query_cache_file, update)
+                self.memory_cache.set(f"query:{cache_key}", entry)
         except Exception as e:
             logger.error(f"Error saving to query cache: {e}")
 
     def clear_cache(self):
         """Clear all cache files."""
         try:
-            self._save_cache({}, self.embedding_cache_file)
-            self._save_cache({}, self.query_cache_file)
+            for cache_file in (self.embedding_cache_file, self.query_cache_file):
+                with self._locked(cache_file):
+                    self._save_cache({}, cache_file)
+                    self._mark_synced(cache_file)
+            self.memory_cache.clear()
             logger.info("Cache cleared successfully")
         except Exception as e:
             logger.error(f"Error clearing cache: {e}")
@@ -124,22 +325,36 @@ class CacheManager:
     def clean_expired_entries(self):
         """Remove expired entries from cache files."""
         try:
-            # Clean embedding cache
-            embedding_cache = self._load_cache(self.embedding_cache_file)
-            embedding_cache = {
-                k: v for k, v in embedding_cache.items()
-                if self._is_cache_valid(v["timestamp"])
-            }
-            self._save_cache(embedding_cache, self.embedding_cache_file)
+            removed = 0
+            for namespace, cache_file in (("embedding", self.embedding_cache_file),
+                                          ("query", self.query_cache_file)):
+                with self._locked(cache_file):
+                    self._sync_memory(cache_file)
+                    cache = self._load_cache(cache_file)
+                    expired = [k for k, v in cache.items() if not self._is_cache_valid(v["timestamp"])]
+                    if not expired:
+                        continue
+                    for key in expired:
+                        del cache[key]
+                        self.memory_cache.delete(f"{namespace}:{key}")
+                    self._save_cache(cache, cache_file)
+                    self._mark_synced(cache_file)
+                removed += len(expired)
 
-            # Clean query cache
-            query_cache = self._load_cache(self.query_cache_file)
-            query_cache = {
-                k: v for k, v in query_cache.items()
-                if self._is_cache_valid(v["timestamp"])
-            }
-            self._save_cache(query_cache, self.query_cache_file)
-
-            logger.info("Cleaned expired cache entries")
+            self.expired_removed += removed
+            logger.info(f"Cleaned {removed} expired cache entries")
         except Exception as e:
             logger.error(f"Error cleaning expired cache entries: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return hit/miss/eviction counters for both tiers."""
+        return {
+            "memory": self.memory_cache.stats(),
+            "disk": {
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+                "evictions": self.disk_evictions,
+                "expired_removed": self.expired_removed,
+                "max_entries": self.max_disk_entries
+            }
+        }
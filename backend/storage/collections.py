@@ -0,0 +1,184 @@
+import os
+import re
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from backend.config import (
+    VECTOR_DIMENSION,
+    VECTOR_STORE_DIR,
+    CACHE_DIR,
+    MAX_LOADED_COLLECTIONS,
+    COLLECTION_MAX_ROWS,
+    COLLECTION_MAX_BYTES
+)
+from backend.storage.vector_store import VectorStore
+from backend.storage.cache_manager import CacheManager
+import logging
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def validate_collection_name(name: str) -> str:
+    """Return name if it is a safe collection name, else raise ValueError."""
+    if not COLLECTION_NAME_PATTERN.match(name or ""):
+        raise ValueError(
+            f"Invalid collection name '{name}': use 1-64 letters, digits, '_' or '-'"
+        )
+    return name
+
+class Collection:
+    """A named, independently loadable vector store with its own cache namespace."""
+
+    def __init__(self, name: str, vector_store: VectorStore, cache_manager: CacheManager):
+        self.name = name
+        self.vector_store = vector_store
+        self.cache_manager = cache_manager
+        self.last_used = time.time()
+        self.active_users = 0
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "loaded": True,
+            "rows": len(self.vector_store),
+            "memory_bytes": self.vector_store.memory_bytes(),
+            "max_rows": self.vector_store.max_rows,
+            "max_bytes": self.vector_store.max_bytes,
+            "last_used": self.last_used
+        }
+
+class CollectionManager:
+    """Loads collections on demand and evicts the least recently used idle ones.
+
+    Loading reads a store from disk outside the manager lock, so a large
+    collection being loaded does not hold up requests for the others;
+    concurrent requests for the same collection wait on one load.
+    """
+
+    def __init__(
+        self,
+        base_dir: str = VECTOR_STORE_DIR,
+        cache_dir: str = CACHE_DIR,
+        dimension: Optional[int] = VECTOR_DIMENSION,
+        max_loaded: int = MAX_LOADED_COLLECTIONS,
+        max_rows: Optional[int] = COLLECTION_MAX_ROWS,
+        max_bytes: Optional[int] = COLLECTION_MAX_BYTES
+    ):
+        self.base_dir = base_dir
+        self.cache_dir = cache_dir
+        self.dimension = dimension
+        self.max_loaded = max_loaded
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._loaded: "OrderedDict[str, Collection]" = OrderedDict()
+        self._loading: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _load(self, name: str) -> Collection:
+        vector_store = VectorStore(
+            self.dimension,
+            persist_dir=os.path.join(self.base_dir, name),
+            max_rows=self.max_rows,
+            max_bytes=self.max_bytes
+        )
+        cache_manager = CacheManager(os.path.join(self.cache_dir, name))
+        logger.info(f"Loaded collection '{name}' with {len(vector_store)} chunks")
+        return Collection(name, vector_store, cache_manager)
+
+    def _evict_idle(self, keep: str):
+        """Evict LRU idle collections, except keep, until under the limit. Caller must hold the lock."""
+        for name in list(self._loaded.keys()):
+            if len(self._loaded) <= self.max_loaded:
+                break
+            if name != keep and self._loaded[name].active_users == 0:
+                # Stores persist on every write, so dropping the reference is enough
+                del self._loaded[name]
+                logger.info(f"Evicted idle collection '{name}'")
+
+    def _acquire(self, name: str, hold: bool) -> Collection:
+        """Return the named collection, loading it if needed; hold counts it as in use."""
+        validate_collection_name(name)
+        while True:
+            with self._lock:
+                collection = self._loaded.get(name)
+                if collection is not None:
+                    self._loaded.move_to_end(name)
+                    collection.last_used = time.time()
+                    if hold:
+                        collection.active_users += 1
+                    self._evict_idle(keep=name)
+                    return collection
+                loading = self._loading.get(name)
+                if loading is None:
+                    loading = self._loading[name] = Future()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                # Another request is loading it; wait, then take it from _loaded
+                loading.result()
+                continue
+
+            try:
+                collection = self._load(name)
+            except BaseException as e:
+                with self._lock:
+                    del self._loading[name]
+                loading.set_exception(e)
+                raise
+            with self._lock:
+                del self._loading[name]
+                self._loaded[name] = collection
+            loading.set_result(collection)
+
+    def get(self, name: str) -> Collection:
+        """Return the named collection, loading it if needed."""
+        return self._acquire(name, hold=False)
+
+    @contextmanager
+    def use(self, name: str):
+        """Hold a collection for the duration of a request so it is not evicted."""
+        collection = self._acquire(name, hold=True)
+        try:
+            yield collection
+        finally:
+            with self._lock:
+                collection.active_users -= 1
+                collection.last_used = time.time()
+
+    def evict(self, name: str) -> bool:
+        """Unload a collection from memory if it is idle."""
+        with self._lock:
+            collection = self._loaded.get(name)
+            if collection is None or collection.active_users:
+                return False
+            del self._loaded[name]
+            logger.info(f"Evicted collection '{name}'")
+            return True
+
+    def drop(self, name: str):
+        """Delete a collection's data and cache."""
+        validate_collection_name(name)
+        with self._lock:
+            self._loaded.pop(name, None)
+            shutil.rmtree(os.path.join(self.base_dir, name), ignore_errors=True)
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+        logger.info(f"Dropped collection '{name}'")
+
+    def list_collections(self) -> List[Dict]:
+        """List collections on disk and in memory with their stats."""
+        with self._lock:
+            loaded = {name: collection.stats() for name, collection in self._loaded.items()}
+        names = set(loaded)
+        if os.path.isdir(self.base_dir):
+            names.update(
+                entry for entry in os.listdir(self.base_dir)
+                if COLLECTION_NAME_PATTERN.match(entry) and os.path.isdir(os.path.join(self.base_dir, entry))
+            )
+        return [loaded.get(name, {"name": name, "loaded": False}) for name in sorted(names)]
@@ -0,0 +1,114 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, Optional, Any
+from backend.config import EXTRACTION_CACHE_DIR
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ExtractionCache:
+    """Persistent per-page text cache for PDFs, keyed by content digest and settings.
+
+    Each document is an append-only JSON-lines file: a header with the page
+    count, one line per extracted page and a final completion marker. Pages
+    are appended as soon as they are extracted, so OCR work done before a
+    crash is reused on the next attempt. A line torn by a crash is skipped on
+    load and trimmed before the next append, so later records stay readable.
+    """
+
+    def __init__(self, cache_dir: str = EXTRACTION_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(pdf_bytes: bytes, settings: Dict[str, Any]) -> str:
+        """Digest of the PDF bytes plus the extractor settings that shape its text."""
+        digest = hashlib.sha256(pdf_bytes)
+        digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.jsonl")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return {"num_pages", "pages": {page_number: text}, "complete"} or None."""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        entry = {"num_pages": None, "pages": {}, "complete": False}
+        try:
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Ignoring torn record in extraction cache {path}")
+                        continue
+                    if "num_pages" in record:
+                        entry["num_pages"] = record["num_pages"]
+                    elif "page" in record:
+                        entry["pages"][record["page"]] = record["text"]
+                    elif record.get("complete"):
+                        entry["complete"] = True
+        except Exception as e:
+            logger.error(f"Failed to load extraction cache {path}: {e}")
+            return None
+        return entry if entry["num_pages"] is not None else None
+
+    @staticmethod
+    def _trim_torn_tail(f):
+        """Truncate a partial last line left by a crash so the next record starts on its own line."""
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+        f.seek(position)
+
+    def _append(self, key: str, records):
+        with self._lock:
+            with open(self._path(key), 'a+b') as f:
+                self._trim_torn_tail(f)
+                f.write("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+
+    def start(self, key: str, num_pages: int, pages: Dict[int, str]):
+        """Record the page count and any pages extracted without OCR."""
+        try:
+            records = [{"num_pages": num_pages}]
+            records.extend({"page": n, "text": text} for n, text in pages.items())
+            self._append(key, records)
+        except Exception as e:
+            logger.error(f"Error writing extraction cache: {e}")
+
+    def add_page(self, key: str, page_number: int, text: str):
+        """Persist a single page as soon as it has been extracted."""
+        try:
+            self._append(key, [{"page": page_number, "text": text}])
+        except Exception as e:
+            logger.error(f"Error writing extraction cache: {e}")
+
+    def mark_complete(self, key: str):
+        try:
+            self._append(key, [{"complete": True}])
+        except Exception as e:
+            logger.error(f"Error writing extraction cache: {e}")
+
+    def clear(self):
+        """Remove every cached extraction."""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".jsonl"):
+                    os.remove(os.path.join(self.cache_dir, name))
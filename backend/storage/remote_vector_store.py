@@ -0,0 +1,75 @@
+import numpy as np
+from typing import List, Dict, Optional, Union
+from backend.api.client import ServiceClient, get_service_client
+from backend.config import API_URL, DEFAULT_COLLECTION
+import logging
+
+logger = logging.getLogger(__name__)
+
+class RemoteVectorStore:
+    """VectorStore-compatible client for the shared store owned by the API service."""
+
+    def __init__(self, api_url: str = API_URL, collection: str = DEFAULT_COLLECTION, timeout: float = 30,
+                 client: Optional[ServiceClient] = None):
+        self.api_url = api_url
+        self.collection = collection
+        self.timeout = timeout
+        # Shared with every other store and upload in this process
+        self.client = client or get_service_client(api_url)
+
+    def _request(self, method: str, path: str, **kwargs) -> Dict:
+        response = self.client.request(method, path, timeout=self.timeout, **kwargs)
+        if response.status_code != 200:
+            raise Exception(f"API Error: {response.text}")
+        return response.json()
+
+    def __len__(self) -> int:
+        return sum(doc["chunks"] for doc in self.list_documents())
+
+    def add_documents(self, chunks: List[str], embeddings: Union[List, np.ndarray], source: str,
+                      stats: Optional[List[Dict[str, Optional[int]]]] = None):
+        """Add document chunks and their embeddings to the shared store."""
+        try:
+            if isinstance(embeddings, np.ndarray):
+                embeddings = embeddings.tolist()
+            self._request("POST", "/documents", json={
+                "source_name": source,
+                "chunks": chunks,
+                "embeddings": embeddings,
+                "stats": stats,
+                "collection": self.collection
+            })
+        except Exception as e:
+            logger.error(f"Error adding documents to shared vector store: {str(e)}")
+            raise Exception(f"Failed to add documents to vector store: {str(e)}")
+
+    def search(self, query_embedding: Union[List, np.ndarray], k: int = 3) -> List[Dict]:
+        """Search the shared store for the most similar chunks."""
+        try:
+            if isinstance(query_embedding, np.ndarray):
+                query_embedding = query_embedding.tolist()
+            return self._request("POST", "/search", json={
+                "embedding": query_embedding,
+                "k": k,
+                "collection": self.collection
+            })["results"]
+        except Exception as e:
+            logger.error(f"Error performing remote vector search: {str(e)}")
+            raise Exception(f"Failed to perform vector search: {str(e)}")
+
+    def list_documents(self) -> List[Dict]:
+        """List stored sources with their chunk counts."""
+        return self._request("GET", "/documents", params={"collection": self.collection})["documents"]
+
+    def get_versions(self) -> Dict:
+        """Return the corpus generation and the current version of each source."""
+        data = self._request("GET", "/documents", params={"collection": self.collection})
+        return {
+            "generation": data["generation"],
+            "sources": {doc["source"]: doc["version"] for doc in data["documents"]}
+        }
+
+    def clear(self):
+        """Clear the shared vector store."""
+        self._request("DELETE", "/documents", params={"collection": self.collection})
+        logger.info(f"Shared collection '{self.collection}' cleared")
@@ -0,0 +1,87 @@
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Union
+from backend.config import SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES
+from backend.metrics import CACHE_REQUESTS
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """In-memory answer cache matched by query-embedding cosine similarity.
+
+    An entry is only reused when the new query is within the similarity
+    threshold and the chunks retrieved for it carry the same signature, so a
+    paraphrase answered from different context is never served stale.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._embeddings: Optional[np.ndarray] = None
+        self._signatures: List[Optional[str]] = [None] * max_entries
+        self._results: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_embedding: Union[List[float], np.ndarray], signature: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result for a similar query over the same chunks, if any."""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if self._size and self._embeddings.shape[1] == query.shape[0]:
+                similarities = self._embeddings[:self._size] @ query
+                for idx in np.argsort(similarities)[::-1]:
+                    if similarities[idx] < self.threshold:
+                        break
+                    if self._signatures[idx] == signature:
+                        self.hits += 1
+                        CACHE_REQUESTS.inc(cache="semantic", namespace="query", result="hit")
+                        logger.info(f"Semantic cache hit (similarity {similarities[idx]:.3f})")
+                        return self._results[idx]
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="semantic", namespace="query", result="miss")
+            return None
+
+    def add(self, query_embedding: Union[List[float], np.ndarray], signature: str, result: Dict[str, Any]):
+        """Store a result, overwriting the oldest entry when full."""
+        query = self._normalize(query_embedding)
+        with self._lock:
+            if self._embeddings is None or self._embeddings.shape[1] != query.shape[0]:
+                self._embeddings = np.zeros((self.max_entries, query.shape[0]), dtype=np.float32)
+                self._size = 0
+                self._next = 0
+            self._embeddings[self._next] = query
+            self._signatures[self._next] = signature
+            self._results[self._next] = result
+            self._next = (self._next + 1) % self.max_entries
+            self._size = min(self._size + 1, self.max_entries)
+
+    def clear(self):
+        """Drop all entries; counters are kept."""
+        with self._lock:
+            self._embeddings = None
+            self._signatures = [None] * self.max_entries
+            self._results = [None] * self.max_entries
+            self._size = 0
+            self._next = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": self._size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
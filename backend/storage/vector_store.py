@@ -1,24 +1,368 @@
+import os
+import json
+import threading
+from contextlib import nullcontext
 import numpy as np
 from typing import List, Tuple, Dict, Union, Optional
-from sklearn.metrics.pairwise import cosine_similarity
+from backend.storage.locks import FileLock, ReadWriteLock
+from backend.metrics import STORE_ROWS, stage_timer
+from backend.tokenizer import CHUNK_STAT_FIELDS, chunk_stats
 import logging
 
 logger = logging.getLogger(__name__)
 
+class QuotaExceededError(ValueError):
+    """Raised when adding documents would exceed a store's row or memory quota."""
+
 class VectorStore:
-    def __init__(self, dimension: Optional[int] = None):
-        """Initialize vector store with optional dimension."""
+    def __init__(self, dimension: Optional[int] = None, persist_dir: Optional[str] = None,
+                 max_rows: Optional[int] = None, max_bytes: Optional[int] = None):
+        """Initialize vector store with optional dimension, persistence directory and quotas."""
         self.dimension = dimension
         self.embeddings: Optional[np.ndarray] = None
-        self.chunks: List[str] = []
-        self.sources: List[str] = []
+        # Chunk texts live in one UTF-8 buffer, row i spanning
+        # _text[_offsets[i]:_offsets[i + 1]], and sources are indices into
+        # _source_names. Persisted columns are memory-mapped on load, and
+        # search decodes only the rows it returns.
+        self._text = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._source_ids = np.zeros(0, dtype=np.int32)
+        self._source_names: List[str] = []
+        self._source_index: Dict[str, int] = {}
+        # Per-chunk counts and offsets (CHUNK_STAT_FIELDS), one column per field,
+        # taken once at chunking time; None until counted for older stores
+        self.stats: Dict[str, List[Optional[int]]] = self._empty_stats()
+        # Corpus generation counter, bumped on every write, and the generation
+        # at which each source last changed. Cached answers are tagged with the
+        # source versions they used so only stale ones are invalidated.
+        self.generation = 0
+        self.source_versions: Dict[str, int] = {}
+        self.persist_dir = persist_dir
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self._lock = ReadWriteLock()
+        # Searches share the read lock, so counts filled in lazily by
+        # _chunk_stats are written under this lock instead
+        self._stats_lock = threading.Lock()
+        # API workers in other processes write the same files: writers hold the
+        # file lock, and the chunk file's identity at our last load or save
+        # tells readers when their copy is stale
+        self._file_lock = FileLock(os.path.join(persist_dir, ".lock")) if persist_dir else None
+        self._disk_state: Optional[Tuple[int, int]] = None
+        # Row counts and embedding dtype of the append-only column files, as
+        # committed in chunks.json; None until the store is in that layout
+        self._layout: Optional[Dict] = None
+
+        if self.persist_dir:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def chunks(self) -> List[str]:
+        """All chunk texts, decoded; search and stats read single rows instead."""
+        buffer = self._text.tobytes()
+        bounds = self._offsets.tolist()
+        return [buffer[start:end].decode("utf-8") for start, end in zip(bounds, bounds[1:])]
+
+    @property
+    def sources(self) -> List[str]:
+        """The source of every chunk, in row order."""
+        return [self._source_names[i] for i in self._source_ids.tolist()]
+
+    def _text_at(self, idx: int) -> str:
+        return self._text[self._offsets[idx]:self._offsets[idx + 1]].tobytes().decode("utf-8")
+
+    def _source_at(self, idx: int) -> str:
+        return self._source_names[self._source_ids[idx]]
+
+    def _reset_rows(self):
+        self.embeddings = None
+        self._text = np.zeros(0, dtype=np.uint8)
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._source_ids = np.zeros(0, dtype=np.int32)
+        self._source_names = []
+        self._source_index = {}
+        self.stats = self._empty_stats()
+
+    def _set_rows(self, chunks: List[str], sources: List[str]):
+        """Build the text and source columns from per-row lists."""
+        self._source_names = list(dict.fromkeys(sources))
+        self._source_index = {name: i for i, name in enumerate(self._source_names)}
+        self._source_ids = np.array([self._source_index[source] for source in sources], dtype=np.int32)
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        self._text = np.frombuffer(b"".join(encoded), dtype=np.uint8).copy()
+        self._offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=self._offsets[1:])
+
+    def _new_rows(self, chunks: List[str], source: str, embeddings: np.ndarray,
+                  stats: List[Dict[str, Optional[int]]]) -> Dict[str, np.ndarray]:
+        """Column arrays for rows to append after the current ones. Caller must hold the write lock."""
+        encoded = [chunk.encode("utf-8") for chunk in chunks]
+        lengths = np.fromiter((len(text) for text in encoded), dtype=np.int64, count=len(encoded))
+        if source not in self._source_index:
+            self._source_index[source] = len(self._source_names)
+            self._source_names.append(source)
+        return {
+            "embeddings": embeddings,
+            "texts": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "text_offsets": self._offsets[-1] + np.cumsum(lengths),
+            "source_ids": np.full(len(chunks), self._source_index[source], dtype=np.int32),
+            "chunk_stats": _stats_column([[chunk.get(field) for field in CHUNK_STAT_FIELDS] for chunk in stats])
+        }
+
+    def _extend_columns(self, rows: Dict[str, np.ndarray]):
+        """Append new rows to the in-memory columns. Caller must hold the write lock."""
+        # Concatenating copies, so a memory-mapped column is never written through
+        if self.embeddings is None:
+            self.embeddings = rows["embeddings"]
+        else:
+            self.embeddings = np.vstack([self.embeddings, rows["embeddings"]])
+        self._text = np.concatenate([self._text, rows["texts"]])
+        self._offsets = np.concatenate([self._offsets, rows["text_offsets"]])
+        self._source_ids = np.concatenate([self._source_ids, rows["source_ids"]])
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, List[Optional[int]]]:
+        return {field: [] for field in CHUNK_STAT_FIELDS}
+
+    def _load_stats(self, data: Dict) -> Dict[str, List[Optional[int]]]:
+        """Stat columns from persisted data; stores saved before they existed get None or token counts."""
+        stats = data.get("stats") or {}
+        if "token_counts" in data and "tokens" not in stats:
+            stats["tokens"] = data["token_counts"]
+        return {field: stats.get(field) or [None] * len(self) for field in CHUNK_STAT_FIELDS}
+
+    def _chunk_stats(self, idx: int) -> Dict[str, Optional[int]]:
+        """Counts and offsets of one row, counting rows from older stores on first use.
+
+        Caller must hold the read lock; writers replace self.stats under the write lock.
+        """
+        with self._stats_lock:
+            if self.stats["tokens"][idx] is not None:
+                return {field: self.stats[field][idx] for field in CHUNK_STAT_FIELDS}
+        # Count outside the lock; racing searches count the same row to the same values
+        counted = chunk_stats(self._text_at(idx))
+        with self._stats_lock:
+            for field in ("words", "tokens", "chars"):
+                self.stats[field][idx] = counted[field]
+            return {field: self.stats[field][idx] for field in CHUNK_STAT_FIELDS}
+
+    @property
+    def _metrics_name(self) -> str:
+        """Label for this store's metrics: its collection directory, or "memory"."""
+        return os.path.basename(os.path.normpath(self.persist_dir)) if self.persist_dir else "memory"
+
+    def memory_bytes(self) -> int:
+        """Bytes held by embeddings and the chunk text, offset and source columns."""
+        embeddings_bytes = self.embeddings.nbytes if self.embeddings is not None else 0
+        return embeddings_bytes + self._text.nbytes + self._offsets.nbytes + self._source_ids.nbytes
+
+    def _check_quota(self, chunks: List[str], embeddings_array: np.ndarray):
+        """Raise QuotaExceededError if the new rows do not fit. Caller must hold the write lock."""
+        if self.max_rows is not None and len(self) + len(chunks) > self.max_rows:
+            raise QuotaExceededError(
+                f"Row quota exceeded: {len(self)} + {len(chunks)} > {self.max_rows}"
+            )
+        if self.max_bytes is not None:
+            new_bytes = embeddings_array.nbytes + sum(len(chunk.encode("utf-8")) + 12 for chunk in chunks)
+            if self.memory_bytes() + new_bytes > self.max_bytes:
+                raise QuotaExceededError(
+                    f"Memory quota exceeded: {self.memory_bytes() + new_bytes} > {self.max_bytes} bytes"
+                )
+
+    def _chunks_file(self) -> str:
+        return os.path.join(self.persist_dir, "chunks.json")
+
+    def _column_file(self, name: str) -> str:
+        return os.path.join(self.persist_dir, f"{name}.bin")
+
+    def _column_layout(self, layout: Dict) -> Dict[str, Tuple[np.dtype, Tuple[int, ...]]]:
+        """Dtype and shape of each column file for the row counts recorded in chunks.json."""
+        rows = layout["rows"]
+        return {
+            "embeddings": (np.dtype(layout["embeddings_dtype"]), (rows, layout["dimension"])),
+            "texts": (np.dtype(np.uint8), (layout["text_bytes"],)),
+            "text_offsets": (np.dtype(np.int64), (rows + 1,)),
+            "source_ids": (np.dtype(np.int32), (rows,)),
+            "chunk_stats": (np.dtype(np.int64), (rows, len(CHUNK_STAT_FIELDS)))
+        }
+
+    def load(self):
+        """Load persisted embeddings and chunks, if any."""
+        if not self.persist_dir:
+            return
+        try:
+            if not os.path.exists(self._chunks_file()):
+                return
+            with self._lock.write_locked(), self._file_lock.locked():
+                self._read_files()
+            logger.info(f"Loaded {len(self)} chunks from {self.persist_dir}")
+        except Exception as e:
+            logger.error(f"Failed to load vector store from {self.persist_dir}: {e}")
+            raise
+
+    def _disk_signature(self) -> Optional[Tuple[int, int]]:
+        """Inode and mtime of the chunk file; every save replaces it with a new inode."""
+        try:
+            stat = os.stat(self._chunks_file())
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _read_files(self):
+        """Replace the in-memory store with the persisted one. Caller must hold both locks."""
+        self._disk_state = self._disk_signature()
+        self._layout = None
+        if self._disk_state is None:
+            # Dropped by another process
+            self._reset_rows()
+            self.source_versions = {}
+        else:
+            with open(self._chunks_file(), 'r') as f:
+                data = json.load(f)
+            if "chunks" in data:
+                # Stores saved before the columnar layout keep every text in the JSON file
+                embeddings = np.load(os.path.join(self.persist_dir, "embeddings.npy"))
+                self.embeddings = embeddings if embeddings.size else None
+                self._set_rows(data["chunks"], data["sources"])
+                self.stats = self._load_stats(data)
+            else:
+                self._layout = data["layout"]
+                self._map_columns()
+                columns = self._column_layout(self._layout)
+                self.stats = _stats_lists(_map_column(self._column_file("chunk_stats"), *columns["chunk_stats"]))
+                self._source_names = data["source_names"]
+                self._source_index = {name: i for i, name in enumerate(self._source_names)}
+            self.generation = data.get("generation", 0)
+            self.source_versions = data.get("source_versions", {})
+            if self.dimension is None and self.embeddings is not None:
+                self.dimension = self.embeddings.shape[1]
+        STORE_ROWS.set(len(self), store=self._metrics_name)
+
+    def _map_columns(self):
+        """Memory-map the committed part of the embedding, text, offset and source columns.
+
+        Mapped columns live in the page cache, so API workers serving the same
+        collection share one copy, and picking up another worker's append is a
+        remap rather than a re-read. The cost is that searches touching pages
+        the kernel has dropped under memory pressure read them back from disk.
+        """
+        columns = self._column_layout(self._layout)
+        embeddings = _map_column(self._column_file("embeddings"), *columns["embeddings"])
+        self.embeddings = embeddings if embeddings.size else None
+        self._text = _map_column(self._column_file("texts"), *columns["texts"])
+        self._offsets = _map_column(self._column_file("text_offsets"), *columns["text_offsets"])
+        self._source_ids = _map_column(self._column_file("source_ids"), *columns["source_ids"])
+
+    def _refresh_locked(self):
+        """Reload if another process saved since our last load or save. Caller must hold both locks."""
+        if self.persist_dir and self._disk_signature() != self._disk_state:
+            self._read_files()
+
+    def refresh(self) -> bool:
+        """Pick up writes made by other processes; returns whether the store was reloaded."""
+        if not self.persist_dir or self._disk_signature() == self._disk_state:
+            return False
+        with self._lock.write_locked(), self._file_lock.locked():
+            if self._disk_signature() == self._disk_state:
+                return False
+            self._read_files()
+        logger.info(f"Reloaded {len(self)} chunks written to {self.persist_dir} by another process")
+        return True
+
+    def _locked_on_disk(self):
+        return self._file_lock.locked() if self._file_lock else nullcontext()
+
+    def _save(self, rows: Optional[Dict[str, np.ndarray]] = None):
+        """Persist the store. Caller must hold both locks.
+
+        rows are the columns of rows just added. When the files are already in
+        the append-only layout with the same embedding dtype only those rows
+        are written; otherwise, and on clear, every column is rewritten.
+        """
+        with stage_timer("vector_store", "save"):
+            if (rows is not None and self._layout is not None and self._layout["rows"]
+                    and self._layout["embeddings_dtype"] == rows["embeddings"].dtype.str):
+                self._append_files(rows)
+            else:
+                if rows is not None:
+                    self._extend_columns(rows)
+                self._write_files()
+            self._disk_state = self._disk_signature()
+            # Serve the columns from the page cache instead of keeping a private copy
+            self._map_columns()
+
+    def _write_chunks_file(self):
+        """Atomically replace chunks.json; readers treat its replacement as the new version."""
+        tmp_chunks = self._chunks_file() + ".tmp"
+        with open(tmp_chunks, 'w') as f:
+            json.dump({
+                "layout": self._layout,
+                "source_names": self._source_names,
+                "generation": self.generation,
+                "source_versions": self.source_versions
+            }, f)
+        os.replace(tmp_chunks, self._chunks_file())
+
+    def _append_files(self, rows: Dict[str, np.ndarray]):
+        """Append new rows to the column files, then commit their lengths in chunks.json."""
+        columns = self._column_layout(self._layout)
+        for name, (dtype, shape) in columns.items():
+            committed = int(np.prod(shape)) * dtype.itemsize
+            with open(self._column_file(name), 'r+b') as f:
+                # Bytes past the committed length were left by a writer that died before committing
+                f.truncate(committed)
+                f.seek(committed)
+                f.write(np.ascontiguousarray(rows[name], dtype=dtype).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        self._layout = {
+            **self._layout,
+            "rows": self._layout["rows"] + len(rows["source_ids"]),
+            "text_bytes": self._layout["text_bytes"] + len(rows["texts"])
+        }
+        self._write_chunks_file()
+
+    def _write_files(self):
+        """Rewrite every column under a new inode, so maps held by other processes stay valid."""
+        os.makedirs(self.persist_dir, exist_ok=True)
+
+        embeddings = self.embeddings if self.embeddings is not None else np.zeros((0, self.dimension or 0))
+        columns = {
+            "embeddings": embeddings,
+            "texts": self._text,
+            "text_offsets": self._offsets,
+            "source_ids": self._source_ids,
+            "chunk_stats": _stats_column([list(row) for row in zip(*self.stats.values())])
+        }
+        for name, column in columns.items():
+            with open(self._column_file(name) + ".tmp", 'wb') as f:
+                f.write(np.ascontiguousarray(column).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        for name in columns:
+            os.replace(self._column_file(name) + ".tmp", self._column_file(name))
+
+        self._layout = {
+            "rows": len(self),
+            "text_bytes": len(self._text),
+            "dimension": embeddings.shape[1],
+            "embeddings_dtype": embeddings.dtype.str
+        }
+        # The chunk file goes last
+        self._write_chunks_file()
+        legacy_embeddings = os.path.join(self.persist_dir, "embeddings.npy")
+        if os.path.exists(legacy_embeddings):
+            os.remove(legacy_embeddings)
 
     def _validate_and_convert_embeddings(self, embeddings: Union[List, np.ndarray]) -> np.ndarray:
         """Validate and convert embeddings to proper numpy array format."""
         try:
-            # Convert to numpy array if not already
-            if not isinstance(embeddings, np.ndarray):
-                embeddings = np.array(embeddings)
+            # One float dtype throughout: appends are written in the column's dtype,
+            # so integer rows must not fix it for the float rows that follow
+            embeddings = np.asarray(embeddings, dtype=np.float64)
 
             # Ensure 2D array
             if len(embeddings.shape) == 1:
@@ -31,8 +375,13 @@ class VectorStore:
             logger.error(f"Error converting embeddings: {str(e)}")
             raise ValueError(f"Failed to process embeddings: {str(e)}")
 
-    def add_documents(self, chunks: List[str], embeddings: Union[List, np.ndarray], source: str):
-        """Add document chunks and their embeddings to the store."""
+    def add_documents(self, chunks: List[str], embeddings: Union[List, np.ndarray], source: str,
+                      stats: Optional[List[Dict[str, Optional[int]]]] = None):
+        """Add document chunks and their embeddings to the store.
+
+        stats holds each chunk's counts and offsets from chunking; they are
+        counted here, without offsets, when not given.
+        """
         try:
             if not chunks:
                 raise ValueError("No chunks provided")
@@ -46,6 +395,11 @@ class VectorStore:
                     f"number of embeddings ({embeddings_array.shape[0]})"
                 )
 
+            if stats is None:
+                stats = [chunk_stats(chunk) for chunk in chunks]
+            elif len(stats) != len(chunks):
+                raise ValueError(f"Got stats for {len(stats)} chunks, expected {len(chunks)}")
+
             # Set or validate dimension
             if self.dimension is None:
                 self.dimension = embeddings_array.shape[1]
@@ -63,21 +417,29 @@ class VectorStore:
                     # Truncate to match dimension
                     embeddings_array = embeddings_array[:, :self.dimension]
 
-            # Add embeddings
-            if self.embeddings is None:
-                self.embeddings = embeddings_array
-            else:
-                self.embeddings = np.vstack([self.embeddings, embeddings_array])
+            with self._lock.write_locked(), self._locked_on_disk(), stage_timer("vector_store", "add"):
+                self._refresh_locked()
+                self._check_quota(chunks, embeddings_array)
 
-            # Add chunks and sources
-            self.chunks.extend(chunks)
-            self.sources.extend([source] * len(chunks))
+                rows = self._new_rows(chunks, source, embeddings_array, stats)
+                for field in CHUNK_STAT_FIELDS:
+                    self.stats[field].extend(chunk.get(field) for chunk in stats)
+                self.generation += 1
+                self.source_versions[source] = self.generation
+                if self.persist_dir:
+                    self._save(rows)
+                else:
+                    self._extend_columns(rows)
+                STORE_ROWS.set(len(self), store=self._metrics_name)
 
             logger.info(
                 f"Successfully added {len(chunks)} chunks from {source}. "
-                f"Total chunks: {len(self.chunks)}"
+                f"Total chunks: {len(self)}"
             )
 
+        except QuotaExceededError as e:
+            logger.warning(f"Rejected documents from {source}: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {str(e)}")
             raise Exception(f"Failed to add documents to vector store: {str(e)}")
@@ -85,47 +447,100 @@ class VectorStore:
     def search(self, query_embedding: Union[List, np.ndarray], k: int = 3) -> List[Dict]:
         """Search for most similar chunks to the query."""
         try:
-            if self.embeddings is None or len(self.chunks) == 0:
-                return []
+            self.refresh()
+            with self._lock.read_locked(), stage_timer("vector_store", "search"):
+                return self._search(query_embedding, k)
+        except Exception as e:
+            logger.error(f"Error performing vector search: {str(e)}")
+            raise Exception(f"Failed to perform vector search: {str(e)}")
 
-            # Convert and validate query embedding
-            query_array = self._validate_and_convert_embeddings(query_embedding)
+    def _search(self, query_embedding: Union[List, np.ndarray], k: int) -> List[Dict]:
+        """Search implementation. Caller must hold the read lock."""
+        # k <= 0 would slice argsort from the start and return every row
+        if self.embeddings is None or len(self) == 0 or k <= 0:
+            return []
 
-            # Handle dimension mismatch
-            if query_array.shape[1] != self.dimension:
-                if query_array.shape[1] < self.dimension:
-                    # Pad with zeros
-                    padding = np.zeros((1, self.dimension - query_array.shape[1]))
-                    query_array = np.hstack([query_array, padding])
-                else:
-                    # Truncate to match dimension
-                    query_array = query_array[:, :self.dimension]
+        # Convert and validate query embedding
+        query_array = self._validate_and_convert_embeddings(query_embedding)
 
-            # Calculate cosine similarity
-            similarities = cosine_similarity(query_array, self.embeddings)[0]
+        # Handle dimension mismatch
+        if query_array.shape[1] != self.dimension:
+            if query_array.shape[1] < self.dimension:
+                # Pad with zeros
+                padding = np.zeros((1, self.dimension - query_array.shape[1]))
+                query_array = np.hstack([query_array, padding])
+            else:
+                # Truncate to match dimension
+                query_array = query_array[:, :self.dimension]
 
-            # Get top k most similar chunks
-            top_indices = np.argsort(similarities)[-k:][::-1]
+        # Calculate cosine similarity; sklearn is imported on first search, not at startup
+        from sklearn.metrics.pairwise import cosine_similarity
+        similarities = cosine_similarity(query_array, self.embeddings)[0]
 
-            # Combine results with sources
-            results = []
-            for idx in top_indices:
-                if idx < len(self.chunks):
-                    results.append({
-                        "text": self.chunks[idx],
-                        "score": float(similarities[idx]),
-                        "source": self.sources[idx]
-                    })
+        # Get top k most similar chunks
+        top_indices = np.argsort(similarities)[-k:][::-1]
 
-            return results
+        # Combine results with sources
+        results = []
+        for idx in top_indices:
+            if idx < len(self):
+                # Only the returned rows are decoded
+                source = self._source_at(idx)
+                results.append({
+                    "text": self._text_at(idx),
+                    "score": float(similarities[idx]),
+                    "source": source,
+                    "version": self.source_versions.get(source, 0),
+                    **self._chunk_stats(idx),
+                    # Row order: consecutive positions of one source are adjacent chunks
+                    "position": int(idx)
+                })
 
-        except Exception as e:
-            logger.error(f"Error performing vector search: {str(e)}")
-            raise Exception(f"Failed to perform vector search: {str(e)}")
+        return results
+
+    def list_documents(self) -> List[Dict]:
+        """List stored sources with their chunk counts."""
+        self.refresh()
+        with self._lock.read_locked():
+            counts = np.bincount(self._source_ids, minlength=len(self._source_names))
+            return [
+                {"source": source, "chunks": int(count), "version": self.source_versions.get(source, 0)}
+                for source, count in zip(self._source_names, counts) if count
+            ]
+
+    def get_versions(self) -> Dict:
+        """Return the corpus generation and the current version of each source."""
+        self.refresh()
+        with self._lock.read_locked():
+            return {"generation": self.generation, "sources": dict(self.source_versions)}
 
     def clear(self):
         """Clear the vector store."""
-        self.embeddings = None
-        self.chunks = []
-        self.sources = []
-        logger.info("Vector store cleared")
\ No newline at end of file
+        with self._lock.write_locked(), self._locked_on_disk():
+            self._refresh_locked()
+            self._reset_rows()
+            self.generation += 1
+            self.source_versions = {}
+            if self.persist_dir:
+                self._save()
+            STORE_ROWS.set(0, store=self._metrics_name)
+        logger.info("Vector store cleared")
+
+def _map_column(path: str, dtype: np.dtype, shape: Tuple[int, ...]) -> np.ndarray:
+    """Memory-map the first rows of a column file; empty columns cannot be mapped."""
+    if not np.prod(shape):
+        return np.zeros(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+def _stats_column(rows: List[List[Optional[int]]]) -> np.ndarray:
+    """Stat rows as an int64 column, with -1 for values not known."""
+    return np.array(
+        [[-1 if value is None else value for value in row] for row in rows], dtype=np.int64
+    ).reshape(-1, len(CHUNK_STAT_FIELDS))
+
+def _stats_lists(column: np.ndarray) -> Dict[str, List[Optional[int]]]:
+    """Inverse of _stats_column: one list per field, None where the value is -1."""
+    return {
+        field: [None if value < 0 else value for value in column[:, i].tolist()]
+        for i, field in enumerate(CHUNK_STAT_FIELDS)
+    }
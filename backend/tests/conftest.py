@@ -0,0 +1,61 @@
+import hashlib
+import re
+import time
+from types import SimpleNamespace
+import numpy as np
+import pytest
+from backend.rag_engine import RAGEngine
+from backend.processors.document_processor import DocumentProcessor
+from backend.storage.vector_store import VectorStore
+from backend.storage.cache_manager import CacheManager
+
+class FakeMistralClient:
+    """Local stand-in for MistralClient with deterministic embeddings and chat."""
+
+    def __init__(self, dimension: int = 8, response: str = "The answer is forty two.", token_delay: float = 0.0):
+        self.dimension = dimension
+        self.response = response
+        self.token_delay = token_delay
+        self.embedding_calls = 0
+        self.chat_calls = 0
+
+    def _embed(self, text: str):
+        seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embeddings(self, model, input):
+        self.embedding_calls += 1
+        texts = [input] if isinstance(input, str) else input
+        return SimpleNamespace(data=[SimpleNamespace(embedding=self._embed(t)) for t in texts])
+
+    def chat(self, model, messages, **kwargs):
+        self.chat_calls += 1
+        message = SimpleNamespace(content=self.response)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    def chat_stream(self, model, messages, **kwargs):
+        self.chat_calls += 1
+        for token in re.findall(r"\S+\s*", self.response):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            delta = SimpleNamespace(content=token)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+@pytest.fixture
+def fake_client():
+    return FakeMistralClient()
+
+@pytest.fixture
+def rag_engine(fake_client, tmp_path):
+    processor = DocumentProcessor()
+    processor.client = fake_client
+    processor.cache_manager = CacheManager(str(tmp_path / "processor_cache"))
+
+    chunks = ["Refunds are issued within 30 days.", "Shipping takes five days."]
+    vector_store = VectorStore()
+    vector_store.add_documents(chunks, processor.create_embeddings(chunks), "policy.txt")
+
+    engine = RAGEngine(processor, vector_store, CacheManager(str(tmp_path / "engine_cache")))
+    engine.client = fake_client
+    return engine
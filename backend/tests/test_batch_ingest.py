@@ -0,0 +1,56 @@
+import asyncio
+import time
+from aiohttp import web
+from backend.api.batch_ingest import ingest_files
+
+async def run_with_server(handler, coro_fn):
+    """Serve a fake /ingest endpoint on a free port while coro_fn(api_url) runs."""
+    app = web.Application()
+    app.router.add_get("/health", lambda request: web.json_response({"status": "healthy"}))
+    app.router.add_post("/ingest", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await coro_fn(f"http://127.0.0.1:{port}")
+    finally:
+        await runner.cleanup()
+
+def test_batch_uploads_run_concurrently_with_a_limit():
+    """Test that uploads overlap, never exceed the limit, and report as they finish."""
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request):
+        form = await request.post()
+        upload = form["file"]
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.1)
+        state["active"] -= 1
+        if upload.filename == "broken.pdf":
+            return web.Response(status=422, text="No text could be extracted")
+        return web.json_response({
+            "source_name": upload.filename,
+            "collection": form["collection"],
+            "processing_stats": {"total_chunks": len(upload.file.read())}
+        })
+
+    items = [(f"doc{i}.txt", b"x" * i, "text/plain") for i in range(1, 8)]
+    items.append(("broken.pdf", b"%PDF", "application/pdf"))
+    done = []
+
+    start = time.time()
+    results = asyncio.run(run_with_server(handler, lambda url: ingest_files(
+        items, "team_a", api_url=url, concurrency=4,
+        on_done=lambda name, result, error: done.append((name, error is None))
+    )))
+    elapsed = time.time() - start
+
+    assert state["peak"] == 4
+    assert elapsed < 0.8  # two waves of 0.1s, not eight
+    assert sorted(done) == sorted([(f"doc{i}.txt", True) for i in range(1, 8)] + [("broken.pdf", False)])
+    assert results["doc3.txt"]["processing_stats"]["total_chunks"] == 3
+    assert results["doc3.txt"]["collection"] == "team_a"
+    assert isinstance(results["broken.pdf"], Exception)
@@ -0,0 +1,62 @@
+import httpx
+import pytest
+from mistralai.client import MistralClient
+from benchmarks.fake_mistral import FakeMistralServer, fake_embedding
+import numpy as np
+from benchmarks.corpus import generate_paraphrases, generate_queries
+from benchmarks.scenarios import import_time, search_latency, startup_time
+
+@pytest.fixture
+def server():
+    with FakeMistralServer(dimension=16, response="Forty two.") as server:
+        yield server
+
+def test_fake_server_speaks_the_mistral_protocol(server):
+    """Test that the real MistralClient works unchanged against the fake server."""
+    client = MistralClient(api_key="benchmark", endpoint=server.url, max_retries=1)
+
+    response = client.embeddings(model="mistral-embed", input=["alpha", "beta"])
+    assert [d.embedding for d in response.data] == [fake_embedding("alpha", 16), fake_embedding("beta", 16)]
+
+    chat = client.chat(model="mistral-large-latest", messages=[{"role": "user", "content": "hi"}])
+    assert chat.choices[0].message.content == "Forty two."
+
+    tokens = [chunk.choices[0].delta.content
+              for chunk in client.chat_stream(model="mistral-large-latest", messages=[{"role": "user", "content": "hi"}])]
+    assert "".join(tokens) == "Forty two."
+    assert server.stats()["chat_requests"] == 2
+
+def test_fake_server_rate_limits(server):
+    """Test that the configured fraction of requests is rejected with 429."""
+    server.rate_limit_rate = 1.0
+    response = httpx.post(f"{server.url}/v1/embeddings", json={"model": "mistral-embed", "input": ["alpha"]})
+    assert response.status_code == 429
+    assert server.stats()["rate_limited"] == 1
+
+def test_paraphrases_keep_topics_but_not_text():
+    """Test that paraphrased queries differ from the originals while reordered ones embed the same."""
+    queries = generate_queries(3)
+    reordered, reworded = generate_paraphrases(3, "reordered"), generate_paraphrases(3, "reworded")
+    assert not set(queries) & (set(reordered) | set(reworded))
+    for query, same, other in zip(queries, reordered, reworded):
+        assert np.dot(fake_embedding(query, 64), fake_embedding(same, 64)) == pytest.approx(1.0)
+        assert np.dot(fake_embedding(query, 64), fake_embedding(other, 64)) < 0.99
+
+def test_search_scenario_reports_percentiles():
+    """Test that the search scenario emits latency percentiles per corpus size."""
+    result = search_latency(sizes=(50, 100), dimension=8, num_queries=5)
+    assert set(result["sizes"]) == {"50", "100"}
+    assert result["sizes"]["100"]["search"]["count"] == 5
+    assert result["sizes"]["100"]["search"]["p50_ms"] <= result["sizes"]["100"]["search"]["p99_ms"]
+
+def test_client_modules_import_without_heavy_dependencies():
+    """Test that the modules the frontend imports defer sklearn, the PDF stack, aiohttp and mistralai."""
+    for module in ("backend.rag_engine", "backend.storage.remote_vector_store", "backend.api.batch_ingest"):
+        assert import_time(module)["loaded"] == []
+
+def test_startup_scenario_reports_budgets():
+    """Test that the startup scenario times each module against its budget."""
+    result = startup_time({"backend.config": 5.0}, repeats=1)
+    assert result["modules"]["backend.config"]["seconds"] < 5.0
+    assert result["over_budget"] == []
+    assert startup_time({"backend.config": 0.0}, repeats=1)["over_budget"] == ["backend.config"]
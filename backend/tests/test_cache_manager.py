@@ -0,0 +1,122 @@
+import os
+import multiprocessing
+import threading
+import pytest
+from datetime import datetime, timedelta
+from backend.storage.cache_manager import CacheManager
+from backend.storage.memory_cache import MemoryCache
+
+@pytest.fixture
+def cache_manager(tmp_path):
+    return CacheManager(str(tmp_path / "cache"), memory_bytes=1024 * 1024, max_disk_entries=10, sweep_interval=None)
+
+def test_memory_tier_serves_repeat_reads(cache_manager, mocker):
+    """Test that hot entries are served from memory without reading the file."""
+    cache_manager.cache_embedding("hello", [0.1, 0.2])
+    load = mocker.spy(cache_manager, "_load_cache")
+
+    assert cache_manager.get_embedding_cache("hello") == [0.1, 0.2]
+    assert load.call_count == 0
+    assert cache_manager.get_stats()["memory"]["hits"] == 1
+
+def test_disk_tier_shared_across_instances(cache_manager):
+    """Test that keys are stable so a fresh manager hits the disk tier and promotes."""
+    cache_manager.cache_query("what?", {"response": "that"})
+    other = CacheManager(cache_manager.cache_dir, sweep_interval=None)
+
+    assert other.get_query_cache("what?") == {"response": "that"}
+    assert other.get_stats()["disk"]["hits"] == 1
+    assert other.get_query_cache("what?") == {"response": "that"}
+    assert other.get_stats()["memory"]["hits"] == 1
+
+def test_memory_tier_sees_clear_from_another_process(cache_manager):
+    """Test that a clear through another manager is not hidden by this one's memory tier."""
+    cache_manager.cache_embedding("hello", [0.1, 0.2])
+    cache_manager.cache_query("what?", {"response": "that"})
+    assert cache_manager.get_query_cache("what?") == {"response": "that"}
+
+    other = CacheManager(cache_manager.cache_dir, sweep_interval=None)
+    other.clear_cache()
+
+    assert cache_manager.get_embedding_cache("hello") is None
+    assert cache_manager.get_query_cache("what?") is None
+
+def test_own_writes_keep_memory_tier_warm(cache_manager, mocker):
+    """Test that this manager's writes do not invalidate the entries it already holds."""
+    cache_manager.cache_embedding("hello", [0.1, 0.2])
+    cache_manager.cache_embedding("world", [0.3])
+    load = mocker.spy(cache_manager, "_load_cache")
+
+    assert cache_manager.get_embedding_cache("hello") == [0.1, 0.2]
+    assert load.call_count == 0
+
+def test_disk_tier_evicts_oldest(cache_manager):
+    """Test that the disk tier stays within its entry limit, oldest first."""
+    for i in range(12):
+        cache_manager.cache_embedding(f"text {i}", [float(i)])
+
+    disk = cache_manager._load_cache(cache_manager.embedding_cache_file)
+    assert len(disk) <= 10
+    assert cache_manager._make_key("text 11") in disk
+    assert cache_manager._make_key("text 0") not in disk
+    assert cache_manager.get_stats()["disk"]["evictions"] > 0
+
+def test_clean_expired_entries(cache_manager):
+    """Test that expired entries are removed from both tiers."""
+    cache_manager.cache_embedding("old", [1.0])
+    cache_manager.cache_embedding("new", [2.0])
+    cache = cache_manager._load_cache(cache_manager.embedding_cache_file)
+    cache[cache_manager._make_key("old")]["timestamp"] = (datetime.now() - timedelta(days=2)).isoformat()
+    cache_manager._save_cache(cache, cache_manager.embedding_cache_file)
+    cache_manager.memory_cache.clear()
+
+    cache_manager.clean_expired_entries()
+
+    assert cache_manager.get_embedding_cache("old") is None
+    assert cache_manager.get_embedding_cache("new") == [2.0]
+    assert cache_manager.get_stats()["disk"]["expired_removed"] == 1
+
+def test_memory_cache_byte_budget():
+    """Test that the LRU evicts least recently used entries to stay within budget."""
+    cache = MemoryCache(max_bytes=100)
+    cache.set("a", "x", size=40)
+    cache.set("b", "y", size=40)
+    cache.get("a")
+    cache.set("c", "z", size=40)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "x"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 80
+
+def _write_embeddings(cache_dir, worker, count):
+    manager = CacheManager(cache_dir, sweep_interval=None)
+    for i in range(count):
+        manager.cache_embedding(f"worker {worker} text {i}", [float(worker), float(i)])
+
+def test_concurrent_writers_lose_nothing(tmp_path):
+    """Stress test: many threads and processes writing the same cache file."""
+    cache_dir = str(tmp_path / "cache")
+    CacheManager(cache_dir, sweep_interval=None)
+    context = multiprocessing.get_context("fork")
+
+    processes = [context.Process(target=_write_embeddings, args=(cache_dir, w, 20)) for w in range(4)]
+    threads = [threading.Thread(target=_write_embeddings, args=(cache_dir, w, 20)) for w in range(4, 12)]
+    for worker in processes + threads:
+        worker.start()
+    for worker in processes + threads:
+        worker.join()
+
+    assert all(p.exitcode == 0 for p in processes)
+    reader = CacheManager(cache_dir, sweep_interval=None)
+    assert len(reader._load_cache(reader.embedding_cache_file)) == 12 * 20
+    for w in range(12):
+        assert reader.get_embedding_cache(f"worker {w} text 19") == [float(w), 19.0]
+
+def test_corrupt_file_is_moved_aside(cache_manager):
+    """Test that a truncated cache file is preserved rather than silently overwritten."""
+    with open(cache_manager.query_cache_file, 'w') as f:
+        f.write('{"truncated": ')
+
+    assert cache_manager.get_query_cache("anything") is None
+    assert any(name.startswith("query_cache.json.corrupt") for name in os.listdir(cache_manager.cache_dir))
@@ -0,0 +1,119 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import numpy as np
+import os
+from backend.config import EXTRACTION_CACHE_DIR, INGEST_UPLOAD_DIR
+from backend.storage.collections import CollectionManager, validate_collection_name
+from backend.storage.vector_store import QuotaExceededError
+
+@pytest.fixture
+def manager(tmp_path):
+    return CollectionManager(
+        base_dir=str(tmp_path / "collections"),
+        cache_dir=str(tmp_path / "cache"),
+        dimension=4,
+        max_loaded=2,
+        max_rows=3,
+        max_bytes=None
+    )
+
+def test_collections_are_isolated(manager):
+    """Test that documents added to one collection are invisible to another."""
+    manager.get("team_a").vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc")
+
+    assert len(manager.get("team_a").vector_store) == 1
+    assert len(manager.get("team_b").vector_store) == 0
+    assert manager.get("team_a").cache_manager.cache_dir != manager.get("team_b").cache_manager.cache_dir
+
+def test_row_quota(manager):
+    """Test that a collection rejects rows beyond its quota."""
+    store = manager.get("team_a").vector_store
+    store.add_documents(["a", "b"], np.eye(4)[:2], "doc1")
+    with pytest.raises(QuotaExceededError):
+        store.add_documents(["c", "d"], np.eye(4)[2:], "doc2")
+    assert len(store) == 2
+
+def test_memory_quota(tmp_path):
+    """Test that a collection rejects rows beyond its memory quota."""
+    manager = CollectionManager(
+        base_dir=str(tmp_path / "collections"),
+        cache_dir=str(tmp_path / "cache"),
+        dimension=4,
+        max_rows=None,
+        max_bytes=30
+    )
+    store = manager.get("team_a").vector_store
+    with pytest.raises(QuotaExceededError):
+        store.add_documents(["alpha"], [[1.0, 0.0, 0.0, 0.0]], "doc")
+
+def test_lru_eviction_and_reload(manager):
+    """Test that idle collections are evicted LRU-first and reload from disk."""
+    manager.get("a").vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc")
+    manager.get("b")
+    manager.get("c")
+
+    loaded = {c["name"] for c in manager.list_collections() if c["loaded"]}
+    assert loaded == {"b", "c"}
+    assert len(manager.get("a").vector_store) == 1
+
+def test_in_use_collection_is_not_evicted(manager):
+    """Test that a collection held by a request survives eviction pressure."""
+    with manager.use("a"):
+        manager.get("b")
+        manager.get("c")
+        loaded = {c["name"] for c in manager.list_collections() if c["loaded"]}
+        assert "a" in loaded
+
+def test_invalid_name(manager):
+    """Test that path-like collection names are rejected."""
+    with pytest.raises(ValueError):
+        manager.get("../etc")
+
+def test_drop(manager):
+    """Test dropping a collection removes its data."""
+    manager.get("a").vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc")
+    manager.drop("a")
+    assert [c["name"] for c in manager.list_collections()] == []
+
+def test_shared_cache_dirs_cannot_be_collection_caches():
+    """Test that no collection name maps onto a cache directory shared by every collection."""
+    for shared_dir in (EXTRACTION_CACHE_DIR, INGEST_UPLOAD_DIR):
+        with pytest.raises(ValueError):
+            validate_collection_name(os.path.basename(shared_dir))
+
+def test_requested_collection_is_never_evicted(tmp_path):
+    """Test that a load past the limit keeps the requested collection tracked."""
+    manager = CollectionManager(
+        base_dir=str(tmp_path / "collections"), cache_dir=str(tmp_path / "cache"), dimension=4, max_loaded=1
+    )
+    with manager.use("a"):
+        assert manager.get("b") is manager.get("b")
+        loaded = {c["name"] for c in manager.list_collections() if c["loaded"]}
+        assert loaded == {"a", "b"}
+    manager.get("c")
+    assert {c["name"] for c in manager.list_collections() if c["loaded"]} == {"c"}
+
+def test_loading_does_not_block_other_collections(manager, mocker):
+    """Test that a slow load runs outside the lock and is shared by concurrent requests."""
+    manager.get("a")
+    started, release = threading.Event(), threading.Event()
+    load = manager._load
+    calls = []
+
+    def slow_load(name):
+        calls.append(name)
+        started.set()
+        release.wait(5)
+        return load(name)
+
+    mocker.patch.object(manager, "_load", side_effect=slow_load)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        first = executor.submit(manager.get, "big")
+        assert started.wait(5)
+        second = executor.submit(manager.get, "big")
+        with manager.use("a") as collection:
+            assert collection.active_users == 1
+        release.set()
+        assert first.result(5) is second.result(5)
+    assert calls == ["big"]
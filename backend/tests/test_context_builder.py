@@ -0,0 +1,71 @@
+import backend.tokenizer as tokenizer
+from backend.context_builder import build_context, _overlap_words
+from backend.tokenizer import count_tokens
+
+def chunk(text, score, source="doc.txt", position=None, start=None):
+    return {
+        "text": text, "score": score, "source": source, "position": position, "tokens": count_tokens(text),
+        "start": start, "end": start + len(text) if start is not None else None
+    }
+
+def test_packing_skips_chunks_that_do_not_fit():
+    """Test that an oversized chunk is skipped while smaller, later ones still fill the budget."""
+    chunks = [
+        chunk("short relevant answer", 0.9, "a.txt"),
+        chunk(" ".join(["filler"] * 200), 0.8, "b.txt"),
+        chunk("another short note", 0.7, "c.txt")
+    ]
+    packed = build_context(chunks, budget=40)
+    assert [c["source"] for c in packed["chunks"]] == ["a.txt", "c.txt"]
+    assert packed["tokens"] <= 40
+    assert packed["context"] == (
+        "From document 'a.txt':\nshort relevant answer\n\nFrom document 'c.txt':\nanother short note"
+    )
+
+def test_single_best_chunk_beats_weak_greedy_pick():
+    """Test that one large, far more relevant chunk wins over a dense but weak one."""
+    chunks = [chunk("tiny", 0.2, "a.txt"), chunk(" ".join(["key"] * 30), 0.9, "b.txt"), chunk("base", 0.0, "c.txt")]
+    packed = build_context(chunks, budget=45)
+    assert [c["source"] for c in packed["chunks"]] == ["b.txt"]
+
+def test_adjacent_chunks_merge_without_overlap():
+    """Test that neighbouring chunks of one source share a header and drop repeated words."""
+    chunks = [
+        chunk("the cat sat on the mat", 0.9, position=4, start=100),
+        chunk("on the mat it slept", 0.5, position=5, start=112),
+        chunk("unrelated text", 0.7, "other.txt", position=0)
+    ]
+    packed = build_context(chunks, budget=1000)
+    assert packed["context"] == (
+        "From document 'doc.txt':\nthe cat sat on the mat it slept\n\nFrom document 'other.txt':\nunrelated text"
+    )
+    assert [c["position"] for c in packed["chunks"]] == [4, 5, 0]
+    assert packed["tokens"] == count_tokens(packed["context"])
+
+def test_consecutive_rows_merge_only_when_their_offsets_continue():
+    """Test that rows with a gap between them, or without offsets, keep separate blocks."""
+    gap = [chunk("the cat sat on the mat", 0.9, position=4, start=0), chunk("on the mat it slept", 0.5, position=5, start=500)]
+    unknown = [chunk("the cat sat on the mat", 0.9, position=4), chunk("on the mat it slept", 0.5, position=5)]
+    for chunks in (gap, unknown):
+        packed = build_context(chunks, budget=1000)
+        assert packed["context"] == (
+            "From document 'doc.txt':\nthe cat sat on the mat\n\nFrom document 'doc.txt':\non the mat it slept"
+        )
+
+def test_overlap_words():
+    """Test detecting words repeated at the boundary of consecutive chunks."""
+    assert _overlap_words("a b c d", "c d e") == 2
+    assert _overlap_words("a b c", "x y") == 0
+    assert build_context([], budget=10) == {"context": "", "chunks": [], "tokens": 0}
+
+def test_missing_tokenizer_falls_back_with_one_warning(monkeypatch, mocker):
+    """Test that without mistral_common the counter warns once and uses the estimate."""
+    monkeypatch.setattr(tokenizer, "_encoder", None)
+    monkeypatch.setattr(tokenizer, "_encoder_name", None)
+    monkeypatch.setattr(tokenizer.importlib.util, "find_spec", lambda name: None)
+    warning = mocker.patch.object(tokenizer.logger, "warning")
+
+    assert count_tokens("refund policy") == tokenizer.heuristic_token_count("refund policy")
+    count_tokens("shipping")
+    assert tokenizer.tokenizer_name() == "heuristic"
+    assert warning.call_count == 1
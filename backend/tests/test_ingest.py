@@ -0,0 +1,141 @@
+import io
+import pytest
+from PyPDF2 import PdfWriter
+from backend.processors.document_processor import DocumentProcessor
+from backend.processors.ingest import IngestPipeline
+from backend.processors.pdf_processor import PDFProcessor
+from backend.storage.cache_manager import CacheManager
+from backend.storage.collections import CollectionManager
+from backend.storage.extraction_cache import ExtractionCache
+
+@pytest.fixture
+def pipeline(fake_client, tmp_path):
+    processor = DocumentProcessor()
+    processor.client = fake_client
+    processor.cache_manager = CacheManager(str(tmp_path / "processor_cache"))
+    collections = CollectionManager(
+        base_dir=str(tmp_path / "collections"),
+        cache_dir=str(tmp_path / "cache"),
+        dimension=fake_client.dimension
+    )
+    pdf_processor = PDFProcessor(extraction_cache=ExtractionCache(str(tmp_path / "extractions")))
+    pipeline = IngestPipeline(processor, collections, pdf_processor, workers=2)
+    yield pipeline
+    pipeline.shutdown()
+
+def write_upload(tmp_path, name, data: bytes) -> str:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_ingest_text_file(pipeline, tmp_path):
+    """Test that a text upload is chunked, embedded and stored, and its spool file removed."""
+    path = write_upload(tmp_path, "upload.txt", b"Refunds are issued within 30 days.")
+
+    result = pipeline.submit_file(path, "policy.txt", "team_a").result()
+
+    assert result["stats"]["total_chunks"] == 1
+    assert "extraction_time" in result["stats"]
+    store = pipeline.collections.get("team_a").vector_store
+    assert store.list_documents() == [{"source": "policy.txt", "chunks": 1, "version": 1}]
+    assert not (tmp_path / "upload.txt").exists()
+
+def test_ingest_pdf_extracts_server_side(pipeline, tmp_path, mocker):
+    """Test that PDF uploads go through the service's PDFProcessor."""
+    writer = PdfWriter()
+    writer.add_blank_page(width=100, height=100)
+    output = io.BytesIO()
+    writer.write(output)
+    path = write_upload(tmp_path, "upload.pdf", output.getvalue())
+    extract = mocker.patch.object(pipeline.pdf_processor, "extract_text", return_value="Shipping takes five days.")
+
+    pipeline.ingest_file(path, "shipping.pdf", "default")
+
+    extract.assert_called_once_with(output.getvalue())
+    assert pipeline.collections.get("default").vector_store.chunks == ["Shipping takes five days."]
+
+def test_ingest_rejects_empty_and_unsupported_files(pipeline, tmp_path):
+    """Test that files without text are rejected and still cleaned up."""
+    empty = write_upload(tmp_path, "empty.txt", b"   ")
+    with pytest.raises(ValueError, match="No text"):
+        pipeline.ingest_file(empty, "empty.txt", "default")
+    assert not (tmp_path / "empty.txt").exists()
+
+    docx = write_upload(tmp_path, "notes.docx", b"PK")
+    with pytest.raises(ValueError, match="Unsupported"):
+        pipeline.ingest_file(docx, "notes.docx", "default")
+    assert len(pipeline.collections.get("default").vector_store) == 0
+
+def test_ingest_endpoint_streams_upload(pipeline, tmp_path, monkeypatch):
+    """Test the multipart /ingest endpoint end to end, including the upload size limit."""
+    from fastapi.testclient import TestClient
+    from backend.api import document_processor_service as service
+
+    monkeypatch.setattr(service, "pipeline", pipeline)
+    monkeypatch.setattr(service, "INGEST_UPLOAD_DIR", str(tmp_path / "uploads"))
+    client = TestClient(service.app)
+
+    response = client.post(
+        "/ingest",
+        files={"file": ("policy.txt", b"Refunds are issued within 30 days.", "text/plain")},
+        data={"collection": "team_a"}
+    )
+    assert response.status_code == 200
+    assert response.json()["processing_stats"]["total_chunks"] == 1
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+    monkeypatch.setattr(service, "INGEST_MAX_UPLOAD_BYTES", 10)
+    response = client.post("/ingest", files={"file": ("big.txt", b"x" * 100, "text/plain")})
+    assert response.status_code == 413
+    assert list((tmp_path / "uploads").iterdir()) == []
+
+    response = client.post("/ingest", files={"file": ("notes.docx", b"PK", "application/octet-stream")})
+    assert response.status_code == 415
+
+def test_chunk_records_carry_counts_and_offsets(pipeline):
+    """Test that chunking records each chunk's counts and its offsets into the text."""
+    text = " ".join(f"w{i}" for i in range(2100))
+    records = pipeline.processor.chunk_records(text)
+
+    assert [record["words"] for record in records] == [2000, 500]
+    for record in records:
+        assert text[record["start"]:record["end"]] == record["text"]
+        assert record["chars"] == len(record["text"])
+    assert records[1]["text"].startswith("w1600 ")
+
+def test_embeddings_keep_chunk_order_with_partial_cache(pipeline, fake_client):
+    """Test that embeddings line up with their chunks when some come from the cache."""
+    chunks = [f"chunk number {i}" for i in range(12)]
+    cache = pipeline.processor.cache_manager
+    cache.cache_embedding(chunks[1], fake_client._embed(chunks[1]))
+    cache.cache_embedding(chunks[7], fake_client._embed(chunks[7]))
+
+    embeddings = pipeline.processor.create_embeddings(chunks, token_counts=[3] * 12)
+
+    assert embeddings.tolist() == [fake_client._embed(chunk) for chunk in chunks]
+
+def test_ingest_stores_chunk_stats(pipeline):
+    """Test that counts taken at chunking time are stored and returned with search results."""
+    result = pipeline.process_text("Refunds are issued within 30 days.", "policy.txt", "default")
+
+    assert result["stats"]["total_words"] == 6
+    assert result["records"][0]["start"] == 0
+    store = pipeline.collections.get("default").vector_store
+    hit = store.search(result["embeddings"][0], k=1)[0]
+    assert (hit["words"], hit["chars"], hit["start"], hit["end"]) == (6, 34, 0, 34)
+    assert hit["tokens"] == result["records"][0]["tokens"]
+
+def test_search_endpoint_bounds_k(pipeline, monkeypatch):
+    """Test that /search rejects k outside 1..SEARCH_MAX_K instead of returning the whole store."""
+    from fastapi.testclient import TestClient
+    from backend.api import document_processor_service as service
+
+    monkeypatch.setattr(service, "collections", pipeline.collections)
+    pipeline.process_text("Refunds are issued within 30 days. Shipping takes five days.", "policy.txt", "default")
+    client = TestClient(service.app)
+    embedding = [1.0] * 8
+
+    assert client.post("/search", json={"embedding": embedding, "k": 0}).status_code == 422
+    assert client.post("/search", json={"embedding": embedding, "k": service.SEARCH_MAX_K + 1}).status_code == 422
+    response = client.post("/search", json={"embedding": embedding, "k": 1})
+    assert response.status_code == 200 and len(response.json()["results"]) == 1
@@ -0,0 +1,77 @@
+import threading
+import time
+import httpx
+import pytest
+from launch import Supervisor
+
+@pytest.fixture
+def supervisor(tmp_path):
+    supervisor = Supervisor(
+        workers=2,
+        port=0,
+        host="127.0.0.1",
+        ready_timeout=60,
+        drain_timeout=10,
+        env={
+            "VECTOR_STORE_DIR": str(tmp_path / "vector_store"),
+            "CACHE_DIR": str(tmp_path / "cache"),
+            "PROFILING_ENABLED": "1",
+            "PROFILE_DIR": str(tmp_path / "profiles")
+        }
+    )
+    supervisor.start()
+    yield supervisor
+    supervisor.shutdown()
+
+def wait_until(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.1)
+    return False
+
+def test_workers_share_port_and_restart(supervisor):
+    """Test that workers report ready, serve one port and are restarted after a crash."""
+    assert supervisor.wait_ready()
+    assert wait_until(lambda: (supervisor.poll_ready(0.1), all(w.ready for w in supervisor.workers.values()))[1])
+    url = f"http://127.0.0.1:{supervisor.port}"
+    assert httpx.get(f"{url}/health").status_code == 200
+
+    # Stores written by one worker are visible to the other
+    for n in range(4):
+        response = httpx.post(f"{url}/documents", json={
+            "source_name": f"doc{n}.txt", "chunks": [f"chunk {n}"], "embeddings": [[1.0, float(n), 0.0, 0.0]]
+        })
+        assert response.status_code == 200
+    for _ in range(4):
+        assert httpx.get(f"{url}/documents").json()["total_chunks"] == 4
+
+    # Each worker labels its own metrics, so scrapes landing on either stay distinct series
+    scraped = {httpx.get(f"{url}/metrics").text.split('worker="', 1)[1][0] for _ in range(20)}
+    assert scraped <= {"0", "1"} and scraped
+
+    crashed = supervisor.workers[0].process
+    crashed.kill()
+    crashed.wait()
+    assert wait_until(lambda: (supervisor.check_workers(), supervisor.workers[0].process is not crashed)[1])
+    assert supervisor.restarts == 1
+    assert wait_until(lambda: (supervisor.poll_ready(0.1), supervisor.workers[0].ready)[1])
+
+def test_shutdown_drains_in_flight_requests(supervisor):
+    """Test that a request already being served completes during shutdown."""
+    assert supervisor.wait_ready()
+    url = f"http://127.0.0.1:{supervisor.port}"
+    responses = []
+    slow = threading.Thread(target=lambda: responses.append(
+        httpx.post(f"{url}/debug/profile", params={"seconds": 1.5}, timeout=30)
+    ))
+    slow.start()
+    time.sleep(0.5)
+    supervisor.shutdown()
+    slow.join()
+
+    assert responses[0].status_code == 200
+    assert all(w.process.poll() is not None for w in supervisor.workers.values())
+    with pytest.raises(httpx.ConnectError):
+        httpx.get(f"{url}/health")
@@ -0,0 +1,85 @@
+import pytest
+from backend.metrics import MetricsRegistry, STAGE_SECONDS, QUERIES
+from backend.storage.vector_store import VectorStore
+
+def stage_count(component, stage):
+    for series in STAGE_SECONDS.snapshot():
+        if series["labels"] == {"component": component, "stage": stage}:
+            return series["count"]
+    return 0
+
+def test_histogram_buckets_and_quantiles():
+    """Test that observations land in cumulative buckets and quantiles are estimated from them."""
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.05, 0.5, 2.0):
+        histogram.observe(value, op="search")
+
+    text = registry.render_prometheus()
+    assert 'latency_seconds_bucket{op="search",le="0.1"} 2' in text
+    assert 'latency_seconds_bucket{op="search",le="1.0"} 3' in text
+    assert 'latency_seconds_bucket{op="search",le="+Inf"} 4' in text
+    assert 'latency_seconds_count{op="search"} 4' in text
+
+    [series] = histogram.snapshot()
+    assert series["count"] == 4 and series["sum"] == pytest.approx(2.6)
+    assert series["p50"] == pytest.approx(0.1)
+
+def test_counter_labels_and_type_conflicts():
+    """Test counters per label set, and that a name cannot change metric type."""
+    registry = MetricsRegistry()
+    counter = registry.counter("hits_total", "Hits")
+    counter.inc(cache="memory")
+    counter.inc(2, cache="disk")
+    assert counter.value(cache="disk") == 2
+    assert registry.counter("hits_total") is counter
+    with pytest.raises(ValueError):
+        registry.histogram("hits_total")
+
+def test_vector_store_records_stage_timings():
+    """Test that store writes and searches are timed."""
+    adds, searches = stage_count("vector_store", "add"), stage_count("vector_store", "search")
+    store = VectorStore(4)
+    store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc")
+    store.search([1, 0, 0, 0], k=1)
+    assert stage_count("vector_store", "add") == adds + 1
+    assert stage_count("vector_store", "search") == searches + 1
+
+def test_rag_engine_counts_answer_paths(fake_client, tmp_path):
+    """Test that generated answers and cache hits are counted separately."""
+    from backend.processors.document_processor import DocumentProcessor
+    from backend.rag_engine import RAGEngine
+    from backend.storage.cache_manager import CacheManager
+
+    processor = DocumentProcessor()
+    processor.client = fake_client
+    processor.cache_manager = CacheManager(str(tmp_path / "processor_cache"))
+    store = VectorStore()
+    store.add_documents(["Refunds take 30 days."], processor.create_embeddings(["Refunds take 30 days."]), "doc")
+    engine = RAGEngine(processor, store, CacheManager(str(tmp_path / "engine_cache")))
+    engine.client = fake_client
+
+    generated, cached = QUERIES.value(path="generated"), QUERIES.value(path="query_cache")
+    generations = stage_count("rag_engine", "generate")
+    engine.process_query("How long do refunds take?")
+    engine.process_query("How long do refunds take?")
+
+    assert QUERIES.value(path="generated") == generated + 1
+    assert QUERIES.value(path="query_cache") == cached + 1
+    assert stage_count("rag_engine", "generate") == generations + 1
+
+def test_metrics_endpoint():
+    """Test the /metrics endpoint in Prometheus text and JSON form."""
+    from fastapi.testclient import TestClient
+    from backend.api.document_processor_service import app
+
+    client = TestClient(app)
+    client.get("/health")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "# TYPE rag_stage_duration_seconds histogram" in response.text
+    assert 'rag_http_request_duration_seconds_count{worker="0",method="GET",route="/health",status="200"}' in response.text
+
+    snapshot = client.get("/metrics", params={"format": "json"}).json()
+    assert "rag_stage_duration_seconds" in snapshot
+    assert all(series["labels"]["worker"] == "0" for series in snapshot["rag_http_request_duration_seconds"])
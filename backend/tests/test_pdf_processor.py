@@ -1,13 +1,19 @@
 import pytest
 from backend.processors.pdf_processor import PDFProcessor
+from backend.storage.extraction_cache import ExtractionCache
 import io
-from PyPDF2 import PdfWriter, PdfReader
+from PyPDF2 import PdfWriter
 from PIL import Image
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
 @pytest.fixture
-def pdf_processor():
-    return PDFProcessor()
+def extraction_cache(tmp_path):
+    return ExtractionCache(str(tmp_path / "extractions"))
+
+@pytest.fixture
+def pdf_processor(extraction_cache):
+    return PDFProcessor(extraction_cache=extraction_cache)
 
 def create_test_pdf_bytes():
     """Create a simple PDF file for testing."""
@@ -17,6 +23,21 @@ def create_test_pdf_bytes():
     writer.write(output)
     return output.getvalue()
 
+def tesseract_data(text, confidence):
+    """Build a pytesseract.image_to_data dict with every word on one line."""
+    words = text.split()
+    return {
+        "text": words,
+        "conf": [confidence] * len(words),
+        "block_num": [1] * len(words),
+        "par_num": [1] * len(words),
+        "line_num": [1] * len(words)
+    }
+
+def ocr_metrics(page_number):
+    """Per-page metrics as returned by a single-attempt OCR worker."""
+    return {"page": page_number, "attempts": 1, "rasterize_s": 0.0, "ocr_s": 0.0, "dpi": 150, "confidence": 90.0}
+
 def test_init():
     """Test PDFProcessor initialization."""
     processor = PDFProcessor()
@@ -56,4 +77,209 @@ def test_extract_text_with_ocr(pdf_processor):
     """Test OCR text extraction."""
     # This test would require actual PDF with images
     # Marked as skip for now
-    pass
\ No newline at end of file
+    pass
+
+def create_text_pdf_bytes(page_texts):
+    """Create a PDF whose pages contain the given text ('' for a blank page)."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for text in page_texts:
+        content = f"BT /F1 12 Tf 10 50 Td ({text}) Tj ET".encode() if text else b""
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 200 100] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref_offset = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return output.getvalue()
+
+def test_parallel_extraction_preserves_page_order():
+    """Test that process-pool extraction returns pages in document order."""
+    page_texts = [f"Page number {i}" for i in range(12)]
+    pdf_bytes = create_text_pdf_bytes(page_texts)
+
+    sequential = PDFProcessor(max_workers=1)._extract_pages_with_pypdf(pdf_bytes)
+    parallel = PDFProcessor(max_workers=3, parallel_min_pages=4)._extract_pages_with_pypdf(pdf_bytes)
+
+    assert [page.strip() for page in parallel] == page_texts
+    assert parallel == sequential
+
+def test_ocr_only_pages_without_text(extraction_cache, mocker):
+    """Test that only pages lacking a text layer are rasterized and OCRed."""
+    pdf_processor = PDFProcessor(ocr_workers=1, extraction_cache=extraction_cache)
+    pdf_bytes = create_text_pdf_bytes(["First page", "", "Third page", "", ""])
+    convert = mocker.patch(
+        'backend.processors.pdf_processor.convert_from_path',
+        return_value=[Image.new('RGB', (10, 10), color='white')]
+    )
+    mocker.patch('pytesseract.image_to_data', return_value=tesseract_data("Scanned text", 95))
+
+    text = pdf_processor.extract_text(pdf_bytes)
+
+    pages_requested = [(c.kwargs["first_page"], c.kwargs["last_page"]) for c in convert.call_args_list]
+    assert pages_requested == [(2, 2), (4, 4), (5, 5)]
+    assert text.split("\n") == ["First page", "Scanned text", "Third page", "Scanned text", "Scanned text"]
+
+def test_parallel_ocr_yields_pages_in_order(extraction_cache, mocker):
+    """Test that the windowed OCR pool yields every page in order and cleans up."""
+    pdf_processor = PDFProcessor(ocr_workers=2, extraction_cache=extraction_cache)
+    mocker.patch(
+        'backend.processors.pdf_processor._ocr_page_from_file',
+        side_effect=lambda path, page_number, ladder, confidence: (page_number, f"text {page_number}", ocr_metrics(page_number))
+    )
+    mocker.patch('backend.processors.pdf_processor.shared_process_pool', return_value=ThreadPoolExecutor(2))
+
+    results = list(pdf_processor._iter_ocr_pages(b"%PDF", [5, 1, 3, 2, 4, 6, 7]))
+
+    assert results == [(n, f"text {n}") for n in range(1, 8)]
+
+def test_repeat_upload_skips_extraction(pdf_processor, mocker):
+    """Test that a second extraction of the same bytes is served from the cache."""
+    pdf_bytes = create_text_pdf_bytes(["Cached page"])
+    assert pdf_processor.extract_text(pdf_bytes) == "Cached page"
+
+    extract = mocker.spy(pdf_processor, "_extract_pages_with_pypdf")
+    assert pdf_processor.extract_text(pdf_bytes) == "Cached page"
+    assert extract.call_count == 0
+
+def test_interrupted_ocr_resumes(extraction_cache, mocker):
+    """Test that pages OCRed before a crash are not OCRed again."""
+    pdf_bytes = create_text_pdf_bytes(["Text page", "", "", ""])
+    ocr_calls = []
+
+    def crashing_ocr(path, page_number, ladder, confidence):
+        ocr_calls.append(page_number)
+        if page_number == 3:
+            raise RuntimeError("worker killed")
+        return page_number, f"OCR {page_number}", ocr_metrics(page_number)
+
+    mocker.patch('backend.processors.pdf_processor._ocr_page_from_file', side_effect=crashing_ocr)
+    pdf_processor = PDFProcessor(ocr_workers=1, extraction_cache=extraction_cache)
+    with pytest.raises(RuntimeError):
+        pdf_processor.extract_text(pdf_bytes)
+    assert ocr_calls == [2, 3]
+
+    ocr_calls.clear()
+    mocker.patch(
+        'backend.processors.pdf_processor._ocr_page_from_file',
+        side_effect=lambda path, page_number, ladder, confidence: (
+            ocr_calls.append(page_number), (page_number, f"OCR {page_number}", ocr_metrics(page_number))
+        )[1]
+    )
+    text = pdf_processor.extract_text(pdf_bytes)
+
+    assert ocr_calls == [3, 4]
+    assert text.split("\n") == ["Text page", "OCR 2", "OCR 3", "OCR 4"]
+
+def test_failed_ocr_is_not_cached_as_complete(pdf_processor, mocker):
+    """Test that pages whose OCR failed are retried on the next upload."""
+    pdf_bytes = create_text_pdf_bytes(["Text page", ""])
+    mocker.patch('backend.processors.pdf_processor._ocr_page_from_file', return_value=(2, None, ocr_metrics(2)))
+    pdf_processor.extract_text(pdf_bytes)
+
+    mocker.patch('backend.processors.pdf_processor._ocr_page_from_file', return_value=(2, "Recovered", ocr_metrics(2)))
+    assert pdf_processor.extract_text(pdf_bytes).split("\n") == ["Text page", "Recovered"]
+
+def test_low_confidence_escalates_dpi(mocker):
+    """Test that the balanced policy retries at higher DPI only when confidence is low."""
+    from backend.processors.pdf_processor import _ocr_page_from_file
+    convert = mocker.patch(
+        'backend.processors.pdf_processor.convert_from_path',
+        return_value=[Image.new('L', (60, 60), color=255)]
+    )
+    mocker.patch('pytesseract.image_to_data', side_effect=[
+        tesseract_data("blurry txt", 40),
+        tesseract_data("clear text", 92)
+    ])
+
+    page_number, text, metrics = _ocr_page_from_file("doc.pdf", 1, (150, 300), 70)
+
+    assert [c.kwargs["dpi"] for c in convert.call_args_list] == [150, 300]
+    assert text == "clear text"
+    assert metrics["dpi"] == 300 and metrics["attempts"] == 2
+
+def test_confident_page_is_not_escalated(mocker):
+    """Test that a confident low-DPI result is accepted without a second pass."""
+    from backend.processors.pdf_processor import _ocr_page_from_file
+    convert = mocker.patch(
+        'backend.processors.pdf_processor.convert_from_path',
+        return_value=[Image.new('L', (60, 60), color=255)]
+    )
+    mocker.patch('pytesseract.image_to_data', return_value=tesseract_data("clear text", 90))
+
+    _, text, metrics = _ocr_page_from_file("doc.pdf", 1, (150, 300), 70)
+
+    assert convert.call_count == 1
+    assert metrics["attempts"] == 1 and metrics["dpi"] == 150
+
+def test_adaptive_threshold_handles_uneven_lighting():
+    """Test that dark text is kept on both a bright and a shaded half of the page."""
+    from backend.processors.pdf_processor import _adaptive_threshold
+    page = np.full((100, 200), 230, dtype=np.uint8)
+    page[:, 100:] = 110  # shaded half, darker than a global 128 threshold
+    page[45:55, 20:80] = 150  # faint text on the bright half
+    page[45:55, 120:180] = 40  # text on the shaded half
+
+    binary = _adaptive_threshold(page)
+
+    assert binary[50, 50] == 0 and binary[50, 150] == 0
+    assert binary[10, 50] == 255 and binary[10, 150] == 255
+
+def test_unknown_ocr_policy_is_rejected(extraction_cache):
+    """Test that an unknown OCR policy fails fast."""
+    with pytest.raises(ValueError):
+        PDFProcessor(ocr_policy="best", extraction_cache=extraction_cache)
+
+def test_torn_write_is_trimmed_on_resume(extraction_cache):
+    """Test that records appended after a crash mid-write are read back."""
+    key = "torn"
+    extraction_cache.start(key, 3, {1: "page one"})
+    with open(extraction_cache._path(key), "a") as f:
+        f.write('{"page": 2, "te')  # crash in the middle of a record
+
+    assert extraction_cache.load(key)["pages"] == {1: "page one"}
+
+    extraction_cache.add_page(key, 2, "page two")
+    extraction_cache.add_page(key, 3, "page three")
+    extraction_cache.mark_complete(key)
+
+    entry = extraction_cache.load(key)
+    assert entry["complete"] is True
+    assert entry["pages"] == {1: "page one", 2: "page two", 3: "page three"}
+    with open(extraction_cache._path(key)) as f:
+        assert all(line.endswith("}\n") for line in f)
+
+def test_corrupt_line_does_not_hide_later_records(extraction_cache):
+    """Test that one unreadable line in the middle is skipped, not treated as the end."""
+    key = "corrupt"
+    extraction_cache.start(key, 2, {1: "page one"})
+    with open(extraction_cache._path(key), "a") as f:
+        f.write("not json\n")
+    extraction_cache.add_page(key, 2, "page two")
+    extraction_cache.mark_complete(key)
+
+    entry = extraction_cache.load(key)
+    assert entry["complete"] and entry["pages"] == {1: "page one", 2: "page two"}
+
+def test_ingests_share_one_process_pool():
+    """Test that every processor with the same worker count reuses one pool not started by fork."""
+    from backend.processors.pdf_processor import shared_process_pool
+    pool = shared_process_pool(2)
+    assert shared_process_pool(2) is pool
+    assert pool._mp_context.get_start_method() in ("forkserver", "spawn")
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+import pytest
+from backend.profiler import ProfilerBusyError, SamplingProfiler, _capture_lock, capture_profile
+
+def busy_worker(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+def idle_worker(stop):
+    while not stop.is_set():
+        time.sleep(0.005)
+
+@pytest.fixture
+def workers():
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=busy_worker, args=(stop,), name="busy"),
+        threading.Thread(target=idle_worker, args=(stop,), name="idle")
+    ]
+    for t in threads:
+        t.start()
+    yield
+    stop.set()
+    for t in threads:
+        t.join()
+
+def test_profile_separates_wall_and_cpu(workers, tmp_path):
+    """Test that sleeping threads appear in the wall profile but not the CPU profile."""
+    with SamplingProfiler(interval=0.005) as profiler:
+        time.sleep(0.5)
+    profile = profiler.profile
+
+    wall = profile.collapsed("wall")
+    assert any(line.startswith("busy;") and "busy_worker" in line for line in wall.splitlines())
+    assert "idle_worker" in wall
+    assert "busy_worker" in profile.collapsed("cpu")
+    if hasattr(time, "pthread_getcpuclockid"):
+        assert "idle_worker" not in profile.collapsed("cpu")
+
+    summary = profile.summary()
+    assert summary["samples"]["wall"] > summary["samples"]["cpu"] > 0
+    assert summary["overhead"] < 0.5
+
+    paths = profile.write(str(tmp_path), "run")
+    assert open(paths["cpu"]).read() == profile.collapsed("cpu")
+    stack, count = open(paths["wall"]).readline().rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+
+def test_capture_profile_allows_one_capture():
+    """Test that a second capture is refused while one is running."""
+    with _capture_lock:
+        with pytest.raises(ProfilerBusyError):
+            capture_profile(0.01)
+    assert capture_profile(0.05, interval=0.01).duration >= 0.05
+
+def test_profile_endpoint(workers, tmp_path, monkeypatch):
+    """Test that the endpoint is opt-in and writes flamegraph-ready files."""
+    from fastapi.testclient import TestClient
+    from backend.api import document_processor_service as service
+
+    client = TestClient(service.app)
+    assert client.post("/debug/profile", params={"seconds": 0.1}).status_code == 404
+
+    monkeypatch.setattr(service, "PROFILING_ENABLED", True)
+    monkeypatch.setattr(service, "PROFILE_DIR", str(tmp_path))
+    response = client.post("/debug/profile", params={"seconds": 0.3, "interval": 0.005})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["files"]) == {"wall", "cpu"}
+    assert body["worker"] == "0" and body["pid"] == os.getpid()
+    assert all(path.endswith(f"-worker0.{kind}.collapsed") for kind, path in body["files"].items())
+    assert all(os.path.dirname(path) == str(tmp_path) for path in body["files"].values())
+    assert body["top"]["cpu"]
+
+    response = client.post("/debug/profile", params={"seconds": 0.2, "format": "collapsed", "kind": "wall"})
+    assert "busy_worker" in response.text
+    assert client.post("/debug/profile", params={"seconds": 0.1, "kind": "heap"}).status_code == 400
@@ -0,0 +1,60 @@
+def test_stream_query_yields_tokens(rag_engine, fake_client):
+    """Test that streaming yields the response incrementally and reports context first."""
+    contexts = []
+    stream = rag_engine.stream_query("What is the refund policy?", k=1, on_context=contexts.extend)
+
+    first_token = next(stream)
+    assert contexts and contexts[0]["source"] == "policy.txt"
+    tokens = [first_token] + list(stream)
+
+    assert len(tokens) > 1
+    assert "".join(tokens) == fake_client.response
+
+def test_stream_query_caches_full_response(rag_engine, fake_client):
+    """Test that a completed stream is cached and replayed without calling the model."""
+    list(rag_engine.stream_query("What is the refund policy?"))
+    calls = fake_client.chat_calls
+
+    replay = list(rag_engine.stream_query("What is the refund policy?"))
+    assert replay == [fake_client.response]
+    assert fake_client.chat_calls == calls
+    assert rag_engine.process_query("What is the refund policy?")["response"] == fake_client.response
+
+def test_process_query(rag_engine, fake_client):
+    """Test the blocking query path against the fake model."""
+    result = rag_engine.process_query("How long does shipping take?", k=2)
+    assert result["response"] == fake_client.response
+    assert len(result["context"]) == 2
+
+def test_semantic_cache_reuses_paraphrase(rag_engine, fake_client):
+    """Test that a paraphrased query with the same retrieved chunks skips the model."""
+    embed = fake_client._embed
+    fake_client._embed = lambda text: embed(text.lower().rstrip("?").replace("what's", "what is"))
+
+    first = rag_engine.process_query("What is the refund policy?", k=1)
+    calls = fake_client.chat_calls
+    second = rag_engine.process_query("what's the refund policy", k=1)
+
+    assert second["response"] == first["response"]
+    assert fake_client.chat_calls == calls
+    assert rag_engine.get_cache_stats()["hits"] == 1
+
+def test_query_cache_survives_unrelated_ingest(rag_engine, fake_client):
+    """Test that adding a different source keeps cached answers warm."""
+    rag_engine.process_query("What is the refund policy?", k=1)
+    rag_engine.semantic_cache.clear()
+    calls = fake_client.chat_calls
+
+    rag_engine.vector_store.add_documents(["Unrelated text."], [fake_client._embed("x")], "other.txt")
+    rag_engine.process_query("What is the refund policy?", k=1)
+    assert fake_client.chat_calls == calls
+
+def test_query_cache_invalidated_when_source_changes(rag_engine, fake_client):
+    """Test that re-ingesting a source invalidates answers built from it."""
+    rag_engine.process_query("What is the refund policy?", k=1)
+    rag_engine.semantic_cache.clear()
+    calls = fake_client.chat_calls
+
+    rag_engine.vector_store.add_documents(["Refunds now take 60 days."], [fake_client._embed("y")], "policy.txt")
+    rag_engine.process_query("What is the refund policy?", k=1)
+    assert fake_client.chat_calls == calls + 1
@@ -0,0 +1,60 @@
+import pytest
+from backend.rerank import CrossEncoderReranker
+
+class KeywordScorer:
+    """Stand-in cross-encoder: scores a chunk by how many query words it contains."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, pairs):
+        self.batches.append(len(pairs))
+        return [sum(word in text.lower() for word in query.lower().split()) for query, text in pairs]
+
+@pytest.fixture
+def scorer():
+    return KeywordScorer()
+
+def test_rerank_orders_by_score_and_caches(scorer):
+    """Test that candidates are reordered by the scorer in batches and scores are cached."""
+    reranker = CrossEncoderReranker(batch_size=2, scorer=scorer)
+    candidates = [
+        {"text": "Shipping takes five days.", "score": 0.9, "source": "a.txt"},
+        {"text": "Refunds are issued within 30 days.", "score": 0.8, "source": "b.txt"},
+        {"text": "Refund requests need the refund form.", "score": 0.7, "source": "c.txt"}
+    ]
+
+    top = reranker.rerank("refund form", candidates, k=2)
+    assert [chunk["source"] for chunk in top] == ["c.txt", "b.txt"]
+    assert top[0]["rerank_score"] == 2 and top[0]["score"] == 0.7
+    assert scorer.batches == [2, 1]
+
+    reranker.rerank("refund form", candidates, k=2)
+    assert scorer.batches == [2, 1]
+    assert reranker.stats()["hits"] == 3
+
+def test_rerank_failure_keeps_vector_order(mocker):
+    """Test that a reranker whose model cannot load falls back to the top k in vector order."""
+    reranker = CrossEncoderReranker(model_name="missing/model")
+    load = mocker.patch.object(reranker, "_get_scorer", side_effect=Exception("Failed to load reranker model"))
+    warning = mocker.patch("backend.rerank.logger.warning")
+    candidates = [{"text": f"chunk {i}", "score": 1 - i / 10} for i in range(4)]
+
+    assert reranker.rerank("query", candidates, k=2) == candidates[:2]
+    assert reranker.rerank("query", candidates, k=3) == candidates[:3]
+    assert load.call_count == 2 and warning.call_count == 1
+
+def test_rag_engine_reranks_wider_candidate_set(rag_engine, scorer, mocker):
+    """Test that the engine searches a wider pool and keeps the reranker's top k."""
+    rag_engine.reranker = CrossEncoderReranker(scorer=scorer)
+    search = mocker.spy(rag_engine.vector_store, "search")
+
+    result = rag_engine.process_query("shipping days", k=1)
+
+    assert search.call_args.args[1] > 1
+    assert [chunk["text"] for chunk in result["context"]] == ["Shipping takes five days."]
+    assert "rerank_score" in result["context"][0]
+
+def test_reranking_is_opt_in(rag_engine):
+    """Test that engines skip reranking unless enabled."""
+    assert rag_engine.reranker is None
@@ -0,0 +1,36 @@
+import numpy as np
+from backend.storage.semantic_cache import SemanticCache
+
+def test_hit_within_threshold():
+    """Test that a nearby query over the same chunks hits."""
+    cache = SemanticCache(threshold=0.95, max_entries=10)
+    cache.add([1.0, 0.0, 0.0], "sig", {"response": "cached"})
+
+    assert cache.lookup([0.99, 0.05, 0.0], "sig") == {"response": "cached"}
+    assert cache.stats()["hits"] == 1
+
+def test_miss_below_threshold():
+    """Test that a dissimilar query misses."""
+    cache = SemanticCache(threshold=0.95, max_entries=10)
+    cache.add([1.0, 0.0, 0.0], "sig", {"response": "cached"})
+
+    assert cache.lookup([0.5, 0.5, 0.0], "sig") is None
+    assert cache.stats()["misses"] == 1
+
+def test_miss_when_chunks_changed():
+    """Test that an identical query over different chunks misses."""
+    cache = SemanticCache(threshold=0.95, max_entries=10)
+    cache.add([1.0, 0.0, 0.0], "old", {"response": "cached"})
+
+    assert cache.lookup([1.0, 0.0, 0.0], "new") is None
+
+def test_oldest_entry_overwritten():
+    """Test that the cache is bounded and overwrites its oldest entry."""
+    cache = SemanticCache(threshold=0.99, max_entries=2)
+    for i, vector in enumerate(np.eye(3)):
+        cache.add(vector, "sig", {"response": i})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup([1.0, 0.0, 0.0], "sig") is None
+    assert cache.lookup([0.0, 0.0, 1.0], "sig") == {"response": 2}
+    assert cache.stats()["hit_rate"] == 0.5
@@ -0,0 +1,114 @@
+import threading
+import time
+import httpx
+import pytest
+from backend.api.client import ServiceClient, ServiceUnavailableError, get_service_client
+
+class FlakyService:
+    """httpx transport handler that fails while `down` is set and counts calls."""
+
+    def __init__(self):
+        self.down = False
+        self.status = 200
+        self.calls = 0
+        self.gate = None
+
+    def __call__(self, request):
+        self.calls += 1
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.down:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(self.status, json={"status": "healthy", "path": request.url.path})
+
+@pytest.fixture
+def service():
+    return FlakyService()
+
+@pytest.fixture
+def client(service):
+    client = ServiceClient(
+        "http://service", health_interval=None, failure_threshold=2, reset_timeout=0.05,
+        transport=httpx.MockTransport(service)
+    )
+    yield client
+    client.close()
+
+def test_requests_do_not_probe_health(client, service):
+    """Test that a request is a single round trip, with no health check before it."""
+    assert client.request("GET", "/documents").json()["path"] == "/documents"
+    assert service.calls == 1
+
+def test_circuit_opens_and_fails_fast(client, service):
+    """Test that repeated failures open the circuit and later calls skip the network."""
+    service.down = True
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.request("GET", "/documents")
+    assert client.state == ServiceClient.OPEN
+
+    calls = service.calls
+    with pytest.raises(ServiceUnavailableError):
+        client.request("GET", "/documents")
+    assert service.calls == calls
+
+def test_circuit_half_opens_after_reset_timeout(client, service):
+    """Test that a trial request after the reset timeout closes the circuit again."""
+    service.down = True
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.request("GET", "/documents")
+
+    service.down = False
+    time.sleep(0.06)
+    assert client.request("GET", "/documents").status_code == 200
+    assert client.state == ServiceClient.CLOSED
+
+def test_half_open_lets_one_trial_through(client, service):
+    """Test that concurrent requests fail fast while the single trial request is in flight."""
+    service.down = True
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            client.request("GET", "/documents")
+
+    service.down = False
+    service.gate = threading.Event()
+    time.sleep(0.06)
+    trial = threading.Thread(target=client.request, args=("GET", "/documents"))
+    trial.start()
+    while service.calls < 3:
+        time.sleep(0.001)
+    with pytest.raises(ServiceUnavailableError):
+        client.request("GET", "/documents")
+    service.gate.set()
+    trial.join()
+    assert client.state == ServiceClient.CLOSED
+    assert service.calls == 3
+
+def test_only_gateway_errors_trip_the_circuit(client, service):
+    """Test that 500s from failed documents leave the circuit closed while 503s open it."""
+    service.status = 500
+    for _ in range(3):
+        assert client.request("POST", "/ingest").status_code == 500
+    assert client.state == ServiceClient.CLOSED
+
+    service.status = 503
+    for _ in range(2):
+        client.request("POST", "/ingest")
+    assert client.state == ServiceClient.OPEN
+
+def test_health_probe_updates_state(client, service):
+    """Test that the background probe drives the cached health state and the circuit."""
+    service.down = True
+    assert client.check_health() is False
+    assert client.check_health() is False
+    assert client.healthy is False and client.state == ServiceClient.OPEN
+
+    service.down = False
+    assert client.check_health() is True
+    assert client.state == ServiceClient.CLOSED
+
+def test_service_client_is_shared():
+    """Test that every caller in the process shares one pooled client per URL."""
+    client = get_service_client("http://127.0.0.1:1")
+    assert get_service_client("http://127.0.0.1:1") is client
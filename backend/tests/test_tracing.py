@@ -0,0 +1,97 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend import tracing
+from backend.tracing import (
+    configure_tracing, extract_context, format_trace, inject_headers, load_spans, propagate, span, summarize
+)
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    configure_tracing("test", path=str(path))
+    yield path
+    configure_tracing("test", path="")
+
+def spans_by_name(path):
+    return {record["name"]: record for record in load_spans(str(path))}
+
+def test_spans_nest_and_export(trace_file):
+    """Test that nested spans share a trace, link to their parent and are exported as JSON lines."""
+    with span("outer", k=3) as outer:
+        with span("inner"):
+            pass
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+
+    records = spans_by_name(trace_file)
+    assert records["inner"]["traceId"] == outer.trace_id
+    assert records["inner"]["parentSpanId"] == outer.span_id
+    assert records["outer"]["attributes"] == [{"key": "k", "value": {"intValue": 3}}]
+    assert records["failing"]["status"] == {"code": 2, "message": "ValueError: boom"}
+    assert records["failing"]["traceId"] != outer.trace_id
+
+    summary = summarize(load_spans(str(trace_file)), top=2)
+    assert len(summary["slowest"]) == 2
+    assert {row["name"] for row in summary["by_name"]} == {"outer", "inner", "failing"}
+    tree = format_trace(load_spans(str(trace_file)), outer.trace_id).splitlines()
+    assert tree[0].startswith("outer [test]") and tree[1].startswith("  inner [test]")
+
+def test_headers_roundtrip():
+    """Test that injected headers continue the trace on the receiving side."""
+    assert inject_headers() == {}
+    with span("client") as client_span:
+        headers = inject_headers({"Accept": "application/json"})
+    assert headers["X-Request-ID"] == client_span.trace_id
+    assert extract_context(headers) == {"trace_id": client_span.trace_id, "parent_id": client_span.span_id}
+
+    request_id = "123E4567-E89B-12D3-A456-426614174000"
+    assert extract_context({"X-Request-ID": request_id})["trace_id"] == request_id.replace("-", "").lower()
+    assert extract_context({"X-Request-ID": "not-a-trace"}) == {"trace_id": None, "parent_id": None}
+
+def test_propagate_into_executor_threads(trace_file):
+    """Test that work submitted to a thread pool joins the submitting trace."""
+    def work(i):
+        with span("work", index=i):
+            return tracing.current_trace_id()
+
+    with span("submit") as parent, ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(propagate(work), i) for i in range(4)]
+        assert {f.result() for f in futures} == {parent.trace_id}
+
+    children = [r for r in load_spans(str(trace_file)) if r["name"] == "work"]
+    assert len(children) == 4
+    assert {r["parentSpanId"] for r in children} == {parent.span_id}
+
+def test_service_continues_incoming_trace(trace_file):
+    """Test that the API service joins a traceparent and echoes the request id."""
+    from fastapi.testclient import TestClient
+    from backend.api import document_processor_service as service
+
+    with span("frontend.request") as caller:
+        headers = inject_headers()
+    response = TestClient(service.app).get("/health", headers=headers)
+
+    assert response.headers["X-Request-ID"] == caller.trace_id
+    server_span = spans_by_name(trace_file)["GET /health"]
+    assert server_span["traceId"] == caller.trace_id
+    assert server_span["parentSpanId"] == caller.span_id
+
+def test_rag_engine_spans(rag_engine, trace_file):
+    """Test that answering a query records retrieval and Mistral spans under one trace."""
+    rag_engine.process_query("What is the refund policy?", k=1)
+    list(rag_engine.stream_query("How long does shipping take?", k=1))
+
+    records = load_spans(str(trace_file))
+    names = {r["name"] for r in records}
+    assert {"rag.process_query", "rag.query_embedding", "rag.search", "mistral.chat",
+            "rag.stream_query", "rag.prepare", "mistral.chat_stream"} <= names
+
+    by_name = {r["name"]: r for r in records}
+    query_trace = by_name["rag.process_query"]["traceId"]
+    assert by_name["mistral.chat"]["traceId"] == query_trace
+    stream_root = by_name["rag.stream_query"]
+    assert by_name["mistral.chat_stream"]["parentSpanId"] == stream_root["spanId"]
+    assert by_name["rag.prepare"]["parentSpanId"] == stream_root["spanId"]
+    # Streaming spans are never left current for the consumer
+    assert tracing.current_span() is None
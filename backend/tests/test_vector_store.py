@@ -0,0 +1,213 @@
+import json
+import os
+import pytest
+import threading
+import numpy as np
+from backend.storage.vector_store import VectorStore
+from backend.storage.locks import ReadWriteLock
+from backend.tokenizer import count_tokens
+
+@pytest.fixture
+def vector_store(tmp_path):
+    return VectorStore(4, persist_dir=str(tmp_path / "store"))
+
+def test_add_and_search(vector_store):
+    """Test adding chunks and retrieving the closest one."""
+    vector_store.add_documents(["alpha", "beta"], np.eye(4)[:2], "doc1")
+    results = vector_store.search([1, 0, 0, 0], k=1)
+    assert vector_store.search([1, 0, 0, 0], k=0) == []
+    assert results[0]["text"] == "alpha"
+    assert results[0]["source"] == "doc1"
+    assert results[0]["position"] == 0 and results[0]["tokens"] == count_tokens("alpha")
+    assert len(vector_store) == 2
+
+def test_persistence_roundtrip(vector_store):
+    """Test that a new store over the same directory sees persisted chunks."""
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+    vector_store.add_documents(["beta", "gamma"], np.eye(4)[1:3], "doc2")
+
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert reloaded.chunks == ["alpha", "beta", "gamma"]
+    assert reloaded.stats["tokens"] == [count_tokens(text) for text in ("alpha", "beta", "gamma")]
+    assert reloaded.stats["words"] == [1, 1, 1] and reloaded.stats["start"] == [None] * 3
+    assert reloaded.list_documents() == [
+        {"source": "doc1", "chunks": 1, "version": 1},
+        {"source": "doc2", "chunks": 2, "version": 2}
+    ]
+    assert reloaded.get_versions() == {"generation": 2, "sources": {"doc1": 1, "doc2": 2}}
+
+def test_clear_persists(vector_store):
+    """Test that clearing the store is persisted."""
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+    vector_store.clear()
+
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert len(reloaded) == 0
+    assert reloaded.search([1, 0, 0, 0]) == []
+
+def test_concurrent_reads_and_writes(vector_store):
+    """Test that searches running alongside ingest never see a torn store."""
+    vector_store.add_documents(["seed"], [[1, 0, 0, 0]], "seed")
+    errors = []
+
+    def writer(n):
+        try:
+            vector_store.add_documents([f"chunk {n}"], [[0, 1, 0, 0]], f"doc{n}")
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(20):
+                assert vector_store.search([1, 0, 0, 0], k=1)[0]["text"] == "seed"
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(10)]
+    threads += [threading.Thread(target=reader) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert len(vector_store) == 11
+    assert len(vector_store.embeddings) == 11
+
+def test_rw_lock_excludes_writer_from_readers():
+    """Test that a writer waits for active readers to finish."""
+    lock = ReadWriteLock()
+    events = []
+
+    lock.acquire_read()
+    writer = threading.Thread(target=lambda: (lock.acquire_write(), events.append("write"), lock.release_write()))
+    writer.start()
+    writer.join(timeout=0.1)
+    assert events == []
+
+    lock.release_read()
+    writer.join(timeout=1)
+    assert events == ["write"]
+
+def test_generation_tracks_source_changes(vector_store):
+    """Test that writes bump the generation and only the touched source's version."""
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+    vector_store.add_documents(["beta"], [[0, 1, 0, 0]], "doc2")
+    vector_store.add_documents(["alpha 2"], [[0, 0, 1, 0]], "doc1")
+
+    versions = vector_store.get_versions()
+    assert versions == {"generation": 3, "sources": {"doc1": 3, "doc2": 2}}
+    assert vector_store.search([0, 1, 0, 0], k=1)[0]["version"] == 2
+
+    vector_store.clear()
+    assert vector_store.get_versions() == {"generation": 4, "sources": {}}
+
+def test_stores_sharing_a_directory_stay_coherent(vector_store):
+    """Test that a store picks up writes made through another instance, as API workers do."""
+    other = VectorStore(4, persist_dir=vector_store.persist_dir)
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+
+    assert other.search([1, 0, 0, 0], k=1)[0]["text"] == "alpha"
+    # Writing through the other instance must not drop the first writer's rows
+    other.add_documents(["beta"], [[0, 1, 0, 0]], "doc2")
+    assert {doc["source"] for doc in vector_store.list_documents()} == {"doc1", "doc2"}
+    assert vector_store.get_versions() == other.get_versions()
+
+    vector_store.clear()
+    assert other.list_documents() == []
+    assert not other.refresh()
+
+def test_columnar_rows_are_memory_mapped(vector_store):
+    """Test that texts and sources are stored as columns and memory-mapped after a reload."""
+    vector_store.add_documents(["alpha", "βeta"], np.eye(4)[:2], "doc1")
+    vector_store.add_documents(["gamma"], [[0, 0, 1, 0]], "doc2")
+    vector_store.add_documents(["delta"], [[0, 0, 0, 1]], "doc1")
+
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert isinstance(reloaded._text, np.memmap) and isinstance(reloaded.embeddings, np.memmap)
+    assert reloaded.chunks == ["alpha", "βeta", "gamma", "delta"]
+    assert reloaded.sources == ["doc1", "doc1", "doc2", "doc1"]
+    assert reloaded._source_names == ["doc1", "doc2"]
+    assert reloaded.search([0, 1, 0, 0], k=1)[0]["text"] == "βeta"
+    assert reloaded.list_documents()[0] == {"source": "doc1", "chunks": 3, "version": 3}
+
+    reloaded.add_documents(["epsilon"], [[1, 1, 0, 0]], "doc3")
+    assert reloaded.chunks[-1] == "epsilon"
+    assert reloaded.memory_bytes() == 5 * 4 * 8 + len("alphaβetagammadeltaepsilon".encode()) + 6 * 8 + 5 * 4
+
+def test_adds_append_to_the_column_files(vector_store):
+    """Test that an add appends its rows instead of rewriting the column files."""
+    vector_store.add_documents(["alpha", "beta"], np.eye(4)[:2], "doc1")
+    texts_file = vector_store._column_file("texts")
+    inode = os.stat(texts_file).st_ino
+    vector_store.add_documents(["gamma"], [[0, 0, 1, 0]], "doc2")
+
+    assert os.stat(texts_file).st_ino == inode
+    assert isinstance(vector_store.embeddings, np.memmap) and len(vector_store.embeddings) == 3
+    assert os.path.getsize(texts_file) == len("alphabetagamma")
+    assert os.path.getsize(vector_store._column_file("embeddings")) == 3 * 4 * 8
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert reloaded.chunks == ["alpha", "beta", "gamma"]
+    assert reloaded.search([0, 0, 1, 0], k=1)[0]["source"] == "doc2"
+
+def test_float_rows_appended_after_integer_rows_keep_their_values(vector_store):
+    """Test that integer embeddings do not fix an integer dtype for later float rows."""
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+    vector_store.add_documents(["beta"], [[0.6, 0.8, 0, 0]], "doc2")
+
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert reloaded.embeddings.dtype == np.float64
+    assert np.allclose(reloaded.embeddings[1], [0.6, 0.8, 0, 0])
+    assert reloaded.search([0, 1, 0, 0], k=1)[0]["score"] == pytest.approx(0.8)
+
+def test_uncommitted_append_is_ignored_and_overwritten(vector_store):
+    """Test that rows a crashed writer appended but never committed are not read and get truncated."""
+    vector_store.add_documents(["alpha"], [[1, 0, 0, 0]], "doc1")
+    with open(vector_store._column_file("texts"), "ab") as f:
+        f.write(b"torn")
+
+    reloaded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert reloaded.chunks == ["alpha"]
+    reloaded.add_documents(["beta"], [[0, 1, 0, 0]], "doc1")
+    assert VectorStore(4, persist_dir=vector_store.persist_dir).chunks == ["alpha", "beta"]
+    assert os.path.getsize(vector_store._column_file("texts")) == len("alphabeta")
+
+def test_loads_stores_saved_as_json_lists(vector_store):
+    """Test that stores saved with chunk texts in chunks.json still load and are upgraded on save."""
+    os.makedirs(vector_store.persist_dir)
+    np.save(os.path.join(vector_store.persist_dir, "embeddings.npy"), np.eye(4)[:2])
+    with open(os.path.join(vector_store.persist_dir, "chunks.json"), "w") as f:
+        json.dump({"chunks": ["alpha", "beta"], "sources": ["doc1", "doc2"], "token_counts": [2, 1],
+                   "generation": 2, "source_versions": {"doc1": 1, "doc2": 2}}, f)
+
+    legacy = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert legacy.chunks == ["alpha", "beta"] and legacy.sources == ["doc1", "doc2"]
+    assert legacy.search([0, 1, 0, 0], k=1)[0]["tokens"] == 1
+
+    legacy.add_documents(["gamma"], [[0, 0, 1, 0]], "doc1")
+    upgraded = VectorStore(4, persist_dir=vector_store.persist_dir)
+    assert upgraded.chunks == ["alpha", "beta", "gamma"] and upgraded.stats["tokens"][:2] == [2, 1]
+    assert not os.path.exists(os.path.join(vector_store.persist_dir, "embeddings.npy"))
+
+def test_concurrent_searches_count_missing_stats_once_consistently(vector_store):
+    """Test that searches filling in counts for an older store never see a half-written row."""
+    os.makedirs(vector_store.persist_dir)
+    np.save(os.path.join(vector_store.persist_dir, "embeddings.npy"), np.eye(4)[:2])
+    with open(os.path.join(vector_store.persist_dir, "chunks.json"), "w") as f:
+        json.dump({"chunks": ["alpha beta", "gamma"], "sources": ["doc1", "doc1"]}, f)
+    legacy = VectorStore(4, persist_dir=vector_store.persist_dir)
+    results = []
+
+    def search():
+        for _ in range(20):
+            results.extend(legacy.search([1, 0, 0, 0], k=2))
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    expected = {"alpha beta": (2, count_tokens("alpha beta")), "gamma": (1, count_tokens("gamma"))}
+    assert all((r["words"], r["tokens"]) == expected[r["text"]] for r in results)
+    assert legacy.stats["words"] == [2, 1]
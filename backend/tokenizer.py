@@ -0,0 +1,66 @@
+import importlib.util
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+from backend.config import TOKENIZER_MODEL
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Words, numbers and single punctuation marks; long words are split into
+# sub-word pieces of about this many characters, as BPE vocabularies do
+_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+_CHARS_PER_PIECE = 4
+
+_encoder: Optional[Callable[[str], List[int]]] = None
+_encoder_name: Optional[str] = None
+_encoder_lock = threading.Lock()
+
+def heuristic_token_count(text: str) -> int:
+    """Token estimate from word and punctuation pieces, for when no tokenizer is installed."""
+    return sum(-(-len(piece) // _CHARS_PER_PIECE) for piece in _PIECE_PATTERN.findall(text))
+
+def _load_encoder():
+    global _encoder, _encoder_name
+    with _encoder_lock:
+        if _encoder_name is not None:
+            return
+        _encoder_name = "heuristic"
+        # Runs once per process, so each fallback is logged once
+        if importlib.util.find_spec("mistral_common") is None:
+            logger.warning("mistral_common is not installed; token counts are estimates, not exact")
+            return
+        try:
+            from mistral_common.tokens.tokenizers.mistral import MistralTokenizer
+            tokenizer = MistralTokenizer.from_model(TOKENIZER_MODEL).instruct_tokenizer.tokenizer
+            _encoder = lambda text: tokenizer.encode(text, bos=False, eos=False)
+            _encoder_name = f"mistral_common:{TOKENIZER_MODEL}"
+        except Exception as e:
+            logger.warning(f"Failed to load the {TOKENIZER_MODEL} tokenizer; token counts are estimates: {e}")
+
+def tokenizer_name() -> str:
+    """Which counter count_tokens uses: the model's tokenizer or the heuristic."""
+    _load_encoder()
+    return _encoder_name
+
+def count_tokens(text: str) -> int:
+    """Tokens in text for the chat model, exact when mistral_common is installed."""
+    if _encoder_name is None:
+        _load_encoder()
+    if _encoder is None:
+        return heuristic_token_count(text)
+    return len(_encoder(text))
+
+# Per-chunk counts kept with each stored chunk; start and end are character
+# offsets into the preprocessed document text, None when unknown
+CHUNK_STAT_FIELDS = ("words", "tokens", "chars", "start", "end")
+
+def chunk_stats(text: str, start: Optional[int] = None, words: Optional[int] = None) -> Dict[str, Optional[int]]:
+    """Word, token and character counts of a chunk and its offsets, computed once at chunking time."""
+    return {
+        "words": words if words is not None else len(text.split()),
+        "tokens": count_tokens(text),
+        "chars": len(text),
+        "start": start,
+        "end": start + len(text) if start is not None else None
+    }
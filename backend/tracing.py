@@ -0,0 +1,279 @@
+"""Lightweight request tracing with an OTLP-style JSON-lines file exporter.
+
+Spans nest through a context variable, so a request id started in the
+frontend follows the call into the API service (X-Request-ID and W3C
+traceparent headers) and down to each Mistral call. Summarize a trace log
+with:
+
+    python -m backend.tracing .traces/spans.jsonl --top 20
+"""
+import argparse
+import contextvars
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Mapping, MutableMapping, Optional
+import numpy as np
+from backend.config import TRACE_FILE
+import logging
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+class Span:
+    """A timed operation within a trace."""
+
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "attributes", "start_ns", "end_ns", "error")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def to_otlp(self, service_name: str) -> Dict[str, Any]:
+        """Span in the shape of an OTLP/JSON span, plus its service name."""
+        return {
+            "resource": {"service.name": service_name},
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": self.start_ns,
+            "endTimeUnixNano": self.end_ns,
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()
+            ],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": value}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class FileSpanExporter:
+    """Appends finished spans as JSON lines; safe across threads and appending processes."""
+
+    def __init__(self, path: str, service_name: str):
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_otlp(self.service_name)) + "\n"
+        try:
+            with self._lock, open(self.path, "a") as f:
+                # One write per line keeps lines from interleaving between processes
+                f.write(line)
+        except OSError as e:
+            logger.warning(f"Failed to export span to {self.path}: {e}")
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+_exporter: Optional[FileSpanExporter] = None
+
+def configure_tracing(service_name: str, path: Optional[str] = TRACE_FILE):
+    """Export this process's spans to path (JSON lines); tracing stays in-memory if path is empty."""
+    global _exporter
+    _exporter = FileSpanExporter(path, service_name) if path else None
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def current_trace_id() -> Optional[str]:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+@contextmanager
+def span(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attributes) -> Iterator[Span]:
+    """Time a block as a span, child of the current span unless trace_id/parent_id are given."""
+    parent = _current_span.get()
+    if trace_id is None:
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        parent_id = parent.span_id if parent else None
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if _exporter is not None:
+            _exporter.export(current)
+
+def start_span(name: str, parent: Optional[Span] = None, **attributes) -> Span:
+    """Start a child of parent (default: the current span) without making it current.
+
+    For work that spans generator yields, where a context variable set in
+    the generator would leak into the consumer; finish it with end_span().
+    """
+    parent = parent or _current_span.get()
+    return Span(name, parent.trace_id if parent else secrets.token_hex(16),
+                parent.span_id if parent else None, attributes)
+
+def end_span(finished: Span, error: Optional[BaseException] = None):
+    if error is not None:
+        finished.error = f"{type(error).__name__}: {error}"
+    finished.end_ns = time.time_ns()
+    if _exporter is not None:
+        _exporter.export(finished)
+
+def inject_headers(headers: Optional[MutableMapping[str, str]] = None) -> MutableMapping[str, str]:
+    """Add the current trace's request id and traceparent to outgoing request headers."""
+    headers = headers if headers is not None else {}
+    current = _current_span.get()
+    if current is not None:
+        headers[REQUEST_ID_HEADER] = current.trace_id
+        headers[TRACEPARENT_HEADER] = f"00-{current.trace_id}-{current.span_id}-01"
+    return headers
+
+def extract_context(headers: Mapping[str, str]) -> Dict[str, Optional[str]]:
+    """trace_id/parent_id for span() from incoming headers; a bare request id starts a trace with that id."""
+    match = _TRACEPARENT_PATTERN.match(headers.get(TRACEPARENT_HEADER, ""))
+    if match:
+        return {"trace_id": match.group(1), "parent_id": match.group(2)}
+    # Accept UUID-style request ids from other clients as trace ids
+    request_id = headers.get(REQUEST_ID_HEADER, "").replace("-", "").lower()
+    if re.fullmatch(r"[0-9a-f]{32}", request_id):
+        return {"trace_id": request_id, "parent_id": None}
+    return {"trace_id": None, "parent_id": None}
+
+def propagate(fn: Callable) -> Callable:
+    """Bind fn to a copy of the caller's context so spans in executor threads join the current trace.
+
+    Wrap once per submission: a copied context cannot run in two threads at once.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)
+
+def load_spans(path: str) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path) as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+def _duration_ms(span_record: Dict[str, Any]) -> float:
+    return (span_record["endTimeUnixNano"] - span_record["startTimeUnixNano"]) / 1e6
+
+def summarize(spans: List[Dict[str, Any]], top: int = 10) -> Dict[str, Any]:
+    """Slowest individual spans plus per-name count/mean/p95/max durations."""
+    by_name = defaultdict(list)
+    for record in spans:
+        by_name[(record["resource"]["service.name"], record["name"])].append(_duration_ms(record))
+    aggregates = sorted(
+        (
+            {
+                "service": service,
+                "name": name,
+                "count": len(durations),
+                "mean_ms": float(np.mean(durations)),
+                "p95_ms": float(np.percentile(durations, 95)),
+                "max_ms": float(np.max(durations)),
+                "total_ms": float(np.sum(durations))
+            }
+            for (service, name), durations in by_name.items()
+        ),
+        key=lambda row: row["total_ms"],
+        reverse=True
+    )
+    slowest = sorted(spans, key=_duration_ms, reverse=True)[:top]
+    return {
+        "slowest": [
+            {
+                "trace_id": record["traceId"],
+                "service": record["resource"]["service.name"],
+                "name": record["name"],
+                "duration_ms": _duration_ms(record),
+                "error": record["status"].get("message")
+            }
+            for record in slowest
+        ],
+        "by_name": aggregates
+    }
+
+def format_trace(spans: List[Dict[str, Any]], trace_id: str) -> str:
+    """Indented tree of one trace's spans with start offsets and durations."""
+    records = [record for record in spans if record["traceId"] == trace_id]
+    if not records:
+        return f"No spans for trace {trace_id}"
+    children = defaultdict(list)
+    ids = {record["spanId"] for record in records}
+    for record in records:
+        parent = record["parentSpanId"] if record["parentSpanId"] in ids else None
+        children[parent].append(record)
+    origin = min(record["startTimeUnixNano"] for record in records)
+    lines = []
+
+    def walk(parent: Optional[str], depth: int):
+        for record in sorted(children[parent], key=lambda r: r["startTimeUnixNano"]):
+            offset = (record["startTimeUnixNano"] - origin) / 1e6
+            error = "  ERROR" if record["status"].get("code") == 2 else ""
+            lines.append(
+                f"{'  ' * depth}{record['name']} [{record['resource']['service.name']}] "
+                f"+{offset:.1f}ms {_duration_ms(record):.1f}ms{error}"
+            )
+            walk(record["spanId"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Summarize the slowest spans in a trace log")
+    parser.add_argument("path", nargs="?", default=TRACE_FILE, help="JSON-lines span file")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest spans to list")
+    parser.add_argument("--trace", help="Print the span tree of one trace id instead")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args(argv)
+    if not args.path:
+        parser.error("No trace file given and TRACE_FILE is not set")
+
+    spans = load_spans(args.path)
+    if args.trace:
+        print(format_trace(spans, args.trace))
+        return
+    summary = summarize(spans, args.top)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    print(f"Slowest {len(summary['slowest'])} of {len(spans)} spans:")
+    for row in summary["slowest"]:
+        error = f"  ({row['error']})" if row["error"] else ""
+        print(f"  {row['duration_ms']:10.1f}ms  {row['service']:<10} {row['name']:<32} {row['trace_id']}{error}")
+    print("\nBy span name (total time):")
+    print(f"  {'service':<10} {'name':<32} {'count':>6} {'mean':>10} {'p95':>10} {'max':>10}")
+    for row in summary["by_name"]:
+        print(f"  {row['service']:<10} {row['name']:<32} {row['count']:>6} "
+              f"{row['mean_ms']:>8.1f}ms {row['p95_ms']:>8.1f}ms {row['max_ms']:>8.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import random
+from typing import List
+import numpy as np
+
+# Small fixed vocabulary; words are drawn with a Zipf-like skew like natural text
+VOCABULARY = (
+    "the of and to in a is that for it as was with be by on not he this are or his from at which "
+    "but have an they you were her she there been one all we their has would when if so no will "
+    "policy refund shipping invoice contract payment customer order delivery warranty account "
+    "report revenue quarter growth market product service support request approval review "
+    "document section clause agreement party term notice period liability data privacy security "
+    "system process analysis result method model training evaluation performance latency cache "
+    "index query search vector embedding chunk source storage network server client protocol"
+).split()
+
+def _word_weights(size: int) -> List[float]:
+    return [1.0 / (rank + 1) for rank in range(size)]
+
+def generate_document(num_words: int, seed: int = 0, paragraph_words: int = 120) -> str:
+    """Synthetic document of num_words words in sentences and blank-line separated paragraphs."""
+    rng = random.Random(seed)
+    words = rng.choices(VOCABULARY, weights=_word_weights(len(VOCABULARY)), k=num_words)
+    paragraphs = []
+    for start in range(0, num_words, paragraph_words):
+        paragraph = words[start:start + paragraph_words]
+        sentences = []
+        for s in range(0, len(paragraph), 15):
+            sentence = " ".join(paragraph[s:s + 15])
+            sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+def generate_corpus(num_documents: int, words_per_document: int, seed: int = 0) -> List[str]:
+    """Independent synthetic documents, reproducible for a given seed."""
+    return [generate_document(words_per_document, seed=seed * 100003 + i) for i in range(num_documents)]
+
+def _query_topics(num_queries: int, seed: int, words: int) -> List[List[str]]:
+    rng = random.Random(seed)
+    return [rng.choices(VOCABULARY[40:], k=words) for _ in range(num_queries)]
+
+def generate_queries(num_queries: int, seed: int = 0, words: int = 8) -> List[str]:
+    """Short question-like queries over the corpus vocabulary."""
+    return [
+        "What does the document say about " + " ".join(topic) + "?"
+        for topic in _query_topics(num_queries, seed, words)
+    ]
+
+# Rewordings of generate_queries' template; they change some of the question's words
+REWORDINGS = (
+    "What do the documents say about {}?",
+    "Tell me what the document says about {}.",
+    "What is said about {} in the document?"
+)
+
+def generate_paraphrases(num_queries: int, kind: str, seed: int = 0, words: int = 8) -> List[str]:
+    """Variants of generate_queries(num_queries, seed, words) with the same topics.
+
+    "reordered" shuffles the topic words and changes case, keeping every word;
+    "reworded" asks the same question in other words.
+    """
+    rng = random.Random(seed + 1)
+    paraphrases = []
+    for topic in _query_topics(num_queries, seed, words):
+        topic = rng.sample(topic, len(topic))
+        if kind == "reordered":
+            paraphrases.append(("what does the document say about " + " ".join(topic)).upper() + "?")
+        elif kind == "reworded":
+            paraphrases.append(rng.choice(REWORDINGS).format(" ".join(topic)))
+        else:
+            raise ValueError(f"Unknown paraphrase kind: {kind}")
+    return paraphrases
+
+def random_embeddings(count: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Unit-normalized float32 vectors for search benchmarks that skip the embedding API."""
+    vectors = np.random.default_rng(seed).standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+import numpy as np
+
+DEFAULT_RESPONSE = (
+    "Based on the provided context, the documents describe the requested topic in detail. "
+    "The key points are summarized above with supporting quotes from the sources."
+)
+
+@lru_cache(maxsize=4096)
+def _seeded_vector(token: str, dimension: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(token.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dimension)
+
+def fake_embedding(text: str, dimension: int) -> List[float]:
+    """Deterministic unit vector for a text, identical across runs and processes.
+
+    A bag of words: texts sharing most of their words get similar vectors, so
+    paraphrased queries can reach the semantic cache as they would with a real
+    embedding model.
+    """
+    words = re.findall(r"\w+", text.lower())
+    vector = sum(_seeded_vector(word, dimension) for word in words) if words else _seeded_vector(text, dimension)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+class FakeMistralServer:
+    """Local HTTP stand-in for the Mistral API speaking the v1 embeddings and chat protocol.
+
+    Point a MistralClient at `url` (endpoint=...) to run the real client code
+    without an API key. Latencies are simulated with sleeps, and a fraction of
+    requests (rate_limit_rate) is answered with 429 to exercise client retries.
+    """
+
+    def __init__(self, dimension: int = 1024, embedding_latency: float = 0.0, chat_latency: float = 0.0,
+                 token_latency: float = 0.0, rate_limit_rate: float = 0.0,
+                 response: str = DEFAULT_RESPONSE, seed: int = 0, host: str = "127.0.0.1", port: int = 0):
+        self.dimension = dimension
+        self.embedding_latency = embedding_latency
+        self.chat_latency = chat_latency
+        self.token_latency = token_latency
+        self.rate_limit_rate = rate_limit_rate
+        self.response = response
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMistralServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-mistral", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeMistralServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {"embedding_requests": 0, "embedded_texts": 0, "chat_requests": 0, "rate_limited": 0}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _should_rate_limit(self) -> bool:
+        with self._lock:
+            limited = self.rate_limit_rate > 0 and self._random.random() < self.rate_limit_rate
+            if limited:
+                self._stats["rate_limited"] += 1
+            return limited
+
+    def _embeddings(self, body: Dict) -> Dict:
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        self._count("embedding_requests")
+        self._count("embedded_texts", len(texts))
+        time.sleep(self.embedding_latency)
+        tokens = sum(len(text.split()) for text in texts)
+        return {
+            "id": "embd-fake",
+            "object": "list",
+            "model": body.get("model", "mistral-embed"),
+            "data": [
+                {"object": "embedding", "embedding": fake_embedding(text, self.dimension), "index": i}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens, "completion_tokens": 0}
+        }
+
+    def _chat_completion(self, body: Dict) -> Dict:
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        completion_tokens = len(self.response.split())
+        return {
+            "id": "cmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mistral-large-latest"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": self.response},
+                "finish_reason": "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        }
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, payload: Dict):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream_chat(self, body: Dict):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for token in re.findall(r"\S+\s*", server.response):
+                    time.sleep(server.token_latency)
+                    chunk = {
+                        "id": "cmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "model": body.get("model", "mistral-large-latest"),
+                        "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if server._should_rate_limit():
+                    self._send_json(429, {"object": "error", "message": "Requests rate limit exceeded"})
+                    return
+                if self.path.endswith("/v1/embeddings"):
+                    self._send_json(200, server._embeddings(body))
+                elif self.path.endswith("/v1/chat/completions"):
+                    server._count("chat_requests")
+                    time.sleep(server.chat_latency)
+                    if body.get("stream"):
+                        self._stream_chat(body)
+                    else:
+                        self._send_json(200, server._chat_completion(body))
+                else:
+                    self._send_json(404, {"object": "error", "message": f"Unknown path {self.path}"})
+
+        return Handler
@@ -0,0 +1,114 @@
+"""Run the benchmark scenarios against a local fake Mistral server and write JSON results.
+
+    python -m benchmarks.run --scenarios ingest,search,query --output results.json
+    python -m benchmarks.run --scenarios startup   # exits 1 if an import exceeds its budget
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+from benchmarks.fake_mistral import FakeMistralServer
+from benchmarks.scenarios import QUICK_PARAMS, SCENARIOS, needs_server
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except Exception:
+        return None
+
+def run_benchmarks(scenarios: List[str], quick: bool = False, embedding_latency: float = 0.02,
+                   chat_latency: float = 0.2, token_latency: float = 0.005,
+                   rate_limit_rate: float = 0.0, dimension: int = 1024) -> Dict:
+    """Run the named scenarios and return a JSON-serializable report."""
+    report = {
+        "metadata": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "quick": quick,
+            "server": {
+                "embedding_latency": embedding_latency,
+                "chat_latency": chat_latency,
+                "token_latency": token_latency,
+                "rate_limit_rate": rate_limit_rate,
+                "dimension": dimension
+            }
+        },
+        "scenarios": {}
+    }
+    server = FakeMistralServer(
+        dimension=dimension,
+        embedding_latency=embedding_latency,
+        chat_latency=chat_latency,
+        token_latency=token_latency,
+        rate_limit_rate=rate_limit_rate
+    )
+    with server, tempfile.TemporaryDirectory(prefix="bench-") as workdir:
+        for name in scenarios:
+            params = dict(QUICK_PARAMS[name]) if quick else {}
+            if name == "search":
+                params["dimension"] = dimension
+            elif name != "startup":
+                params["workdir"] = os.path.join(workdir, name)
+            args = (server,) if needs_server(name) else ()
+            start = time.perf_counter()
+            result = SCENARIOS[name](*args, **params)
+            result["wall_seconds"] = time.perf_counter() - start
+            report["scenarios"][name] = result
+            print(f"{name}: done in {result['wall_seconds']:.1f}s", file=sys.stderr)
+    return report
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--quick", action="store_true", help="Small corpora for smoke runs")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="Seconds per embeddings request")
+    parser.add_argument("--chat-latency", type=float, default=0.2, help="Seconds before a chat response starts")
+    parser.add_argument("--token-latency", type=float, default=0.005, help="Seconds between streamed tokens")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--dimension", type=int, default=1024, help="Embedding dimension")
+    args = parser.parse_args(argv)
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    # Importing the backend configures verbose service logging; keep the report readable
+    logging.basicConfig(level=logging.WARNING, force=True)
+    report = run_benchmarks(
+        scenarios,
+        quick=args.quick,
+        embedding_latency=args.embedding_latency,
+        chat_latency=args.chat_latency,
+        token_latency=args.token_latency,
+        rate_limit_rate=args.rate_limit_rate,
+        dimension=args.dimension
+    )
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    over_budget = report["scenarios"].get("startup", {}).get("over_budget")
+    if over_budget:
+        print(f"Import time over budget: {', '.join(over_budget)}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+from mistralai.client import MistralClient
+from backend.processors.document_processor import DocumentProcessor
+from backend.rag_engine import RAGEngine
+from backend.storage.cache_manager import CacheManager
+from backend.storage.vector_store import VectorStore
+from benchmarks.corpus import generate_corpus, generate_paraphrases, generate_queries, random_embeddings
+from benchmarks.fake_mistral import FakeMistralServer
+
+def latency_summary(samples: Sequence[float]) -> Dict[str, float]:
+    """Percentiles of latencies given in seconds, reported in milliseconds."""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    if not len(values):
+        return {"count": 0}
+    return {
+        "count": int(len(values)),
+        "mean_ms": float(values.mean()),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(values.max())
+    }
+
+def timed(fn: Callable, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def make_client(server: FakeMistralServer) -> MistralClient:
+    # Few, short retries so injected 429s cost the benchmark seconds, not minutes
+    return MistralClient(api_key="benchmark", endpoint=server.url, max_retries=3, timeout=30)
+
+def make_processor(server: FakeMistralServer, cache_dir: str) -> DocumentProcessor:
+    processor = DocumentProcessor()
+    processor.client = make_client(server)
+    processor.cache_manager = CacheManager(cache_dir, sweep_interval=None)
+    return processor
+
+def ingest_throughput(server: FakeMistralServer, workdir: str, num_documents: int = 20,
+                      words_per_document: int = 5000) -> Dict:
+    """DocumentProcessor.process_document over a synthetic corpus, cold and with a warm embedding cache."""
+    corpus = generate_corpus(num_documents, words_per_document)
+    processor = make_processor(server, os.path.join(workdir, "ingest_cache"))
+    results = {"documents": num_documents, "words_per_document": words_per_document}
+
+    for phase in ("cold", "warm"):
+        server.reset_stats()
+        latencies = []
+        chunks = 0
+        start = time.perf_counter()
+        for text in corpus:
+            result, elapsed = timed(processor.process_document, text)
+            latencies.append(elapsed)
+            chunks += len(result["chunks"])
+        total = time.perf_counter() - start
+        results[phase] = {
+            "seconds": total,
+            "documents_per_s": num_documents / total,
+            "words_per_s": num_documents * words_per_document / total,
+            "chunks_per_s": chunks / total,
+            "chunks": chunks,
+            "document_latency": latency_summary(latencies),
+            "server": server.stats()
+        }
+    return results
+
+def search_latency(sizes: Sequence[int] = (1000, 10000, 50000), dimension: int = 1024,
+                   num_queries: int = 200, k: int = 3) -> Dict:
+    """VectorStore.search latency percentiles at several corpus sizes."""
+    queries = random_embeddings(num_queries, dimension, seed=1)
+    results = {"dimension": dimension, "k": k, "sizes": {}}
+    for size in sizes:
+        store = VectorStore(dimension)
+        embeddings = random_embeddings(size, dimension, seed=size)
+        chunks = [f"chunk {i}" for i in range(size)]
+        _, load_seconds = timed(store.add_documents, chunks, embeddings, "corpus")
+        store.search(queries[0], k)  # warm up
+        latencies = [timed(store.search, query, k)[1] for query in queries]
+        results["sizes"][str(size)] = {
+            "add_seconds": load_seconds,
+            "store_bytes": store.memory_bytes(),
+            "search": latency_summary(latencies)
+        }
+    return results
+
+def query_paths(server: FakeMistralServer, workdir: str, num_documents: int = 10,
+                words_per_document: int = 3000, num_queries: int = 20) -> Dict:
+    """RAGEngine.process_query latency for a full miss, an exact cache hit and paraphrased repeats.
+
+    Paraphrases miss the exact query cache; their semantic cache hit rate shows
+    how far the similarity threshold stretches to reworded questions.
+    """
+    processor = make_processor(server, os.path.join(workdir, "query_processor_cache"))
+    store = VectorStore()
+    for i, text in enumerate(generate_corpus(num_documents, words_per_document, seed=7)):
+        result = processor.process_document(text)
+        store.add_documents(result["chunks"], result["embeddings"], f"doc{i}.txt")
+
+    engine = RAGEngine(processor, store, CacheManager(os.path.join(workdir, "query_cache"), sweep_interval=None))
+    engine.client = processor.client
+    queries = generate_queries(num_queries)
+
+    def run(batch: List[str]) -> Dict:
+        server.reset_stats()
+        hits = engine.semantic_cache.stats()["hits"]
+        latencies = [timed(engine.process_query, query)[1] for query in batch]
+        return {
+            "latency": latency_summary(latencies),
+            "semantic_hit_rate": (engine.semantic_cache.stats()["hits"] - hits) / len(batch),
+            "server": server.stats()
+        }
+
+    results = {"chunks": len(store), "queries": num_queries}
+    results["miss"] = run(queries)
+    results["exact_hit"] = run(queries)
+    for kind in ("reordered", "reworded"):
+        results[f"paraphrase_{kind}"] = run(generate_paraphrases(num_queries, kind))
+
+    server.reset_stats()
+    engine.clear_cache()
+    first_token = []
+    for query in generate_queries(num_queries, seed=1):
+        start = time.perf_counter()
+        stream = engine.stream_query(query)
+        next(stream)
+        first_token.append(time.perf_counter() - start)
+        for _ in stream:
+            pass
+    results["stream_first_token"] = {"latency": latency_summary(first_token), "server": server.stats()}
+    return results
+
+# Cold import budgets in seconds; the frontend imports the first three on every start
+STARTUP_BUDGETS: Dict[str, float] = {
+    "backend.rag_engine": 0.5,
+    "backend.storage.remote_vector_store": 0.5,
+    "backend.api.batch_ingest": 0.5,
+    "backend.api.document_processor_service": 1.5
+}
+
+# Dependencies that must only load when a feature needs them
+HEAVY_MODULES = ("sklearn", "pandas", "PyPDF2", "pdf2image", "pytesseract", "aiohttp", "mistralai")
+
+_IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+print(json.dumps({{"seconds": time.perf_counter() - start, "loaded": sorted(set(sys.modules) & set({heavy!r}))}}))
+"""
+
+def import_time(module: str) -> Dict:
+    """Seconds to import module in a fresh interpreter, and which heavy dependencies it loaded."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probe = _IMPORT_PROBE.format(module=module, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True, check=True, cwd=root,
+        env={**os.environ, "PYTHONPATH": root}
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def startup_time(budgets: Dict[str, float] = STARTUP_BUDGETS, repeats: int = 5) -> Dict:
+    """Cold import time per entry-point module against its budget, median of several runs."""
+    results = {"repeats": repeats, "modules": {}, "over_budget": []}
+    for module, budget in budgets.items():
+        runs = [import_time(module) for _ in range(repeats)]
+        seconds = float(np.median([run["seconds"] for run in runs]))
+        results["modules"][module] = {
+            "seconds": seconds,
+            "budget": budget,
+            "heavy_modules": runs[0]["loaded"]
+        }
+        if seconds > budget:
+            results["over_budget"].append(module)
+    return results
+
+SCENARIOS: Dict[str, Callable] = {
+    "ingest": ingest_throughput,
+    "search": search_latency,
+    "query": query_paths,
+    "startup": startup_time
+}
+
+QUICK_PARAMS: Dict[str, Dict] = {
+    "ingest": {"num_documents": 3, "words_per_document": 3000},
+    "search": {"sizes": (1000, 5000), "num_queries": 50},
+    "query": {"num_documents": 3, "words_per_document": 2000, "num_queries": 5},
+    "startup": {"repeats": 2}
+}
+
+def needs_server(name: str) -> bool:
+    return name in ("ingest", "query")
@@ -1,10 +1,5 @@
 import streamlit as st
-import pandas as pd
-import aiohttp
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-import time
+import asyncio
 import logging
 import os
 import sys
@@ -15,10 +10,15 @@ if project_root not in sys.path:
     sys.path.append(project_root)
 
 from backend.processors.document_processor import DocumentProcessor
-from backend.storage.vector_store import VectorStore 
+from backend.storage.remote_vector_store import RemoteVectorStore
+from backend.api.batch_ingest import ingest_files
+from backend.api.client import get_service_client
+from backend.metrics import REGISTRY
 from backend.rag_engine import RAGEngine
-from backend.config import VECTOR_DIMENSION, MISTRAL_API_KEY
-from backend.processors.pdf_processor import PDFProcessor
+from backend.tracing import configure_tracing, span
+from backend.storage.cache_manager import CacheManager
+from backend.storage.collections import validate_collection_name
+from backend.config import API_URL, MISTRAL_API_KEY, CACHE_DIR, DEFAULT_COLLECTION
 
 # Configure detailed logging
 logging.basicConfig(
@@ -29,28 +29,48 @@ logging.basicConfig(
     ]
 )
 logger = logging.getLogger(__name__)
+configure_tracing("frontend")
+
+@st.cache_resource
+def get_shared_vector_store(collection: str = DEFAULT_COLLECTION):
+    """Client for a collection shared by all sessions through the API service."""
+    return RemoteVectorStore(API_URL, collection=collection)
+
+def create_rag_engine(collection: str) -> RAGEngine:
+    """Create a RAG engine bound to a collection and its cache namespace."""
+    return RAGEngine(
+        st.session_state.processor,
+        st.session_state.vector_store,
+        CacheManager(os.path.join(CACHE_DIR, collection))
+    )
+
+def select_collection(collection: str):
+    """Switch the session to another collection."""
+    if collection == st.session_state.collection:
+        return
+    st.session_state.collection = collection
+    st.session_state.vector_store = get_shared_vector_store(collection)
+    st.session_state.rag_engine = create_rag_engine(collection)
+    st.session_state.uploaded_files = set()
 
 def initialize_session_state():
     """Initialize session state variables."""
     try:
         if 'processor' not in st.session_state:
             st.session_state.processor = DocumentProcessor()
+        if 'collection' not in st.session_state:
+            st.session_state.collection = DEFAULT_COLLECTION
         if 'vector_store' not in st.session_state:
-            st.session_state.vector_store = VectorStore(VECTOR_DIMENSION)
+            st.session_state.vector_store = get_shared_vector_store(st.session_state.collection)
         if 'rag_engine' not in st.session_state:
             if not MISTRAL_API_KEY:
                 st.error("Mistral API key is not set. Please set your API key in the environment variables.")
                 return False
             try:
-                st.session_state.rag_engine = RAGEngine(
-                    st.session_state.processor,
-                    st.session_state.vector_store
-                )
+                st.session_state.rag_engine = create_rag_engine(st.session_state.collection)
             except ValueError as e:
                 st.error(str(e))
                 return False
-        if 'pdf_processor' not in st.session_state:
-            st.session_state.pdf_processor = PDFProcessor()
         if 'processing_queue' not in st.session_state:
             st.session_state.processing_queue = []
         if 'uploaded_files' not in st.session_state:
@@ -109,47 +129,17 @@ def set_page_config():
     """, unsafe_allow_html=True)
 
 @st.cache_data(ttl=3600)
-def process_document_api_cached(text: str, source_name: str):
-    """Process single document using FastAPI endpoint with caching and retries."""
-
-    # Configure retry strategy with more attempts and shorter intervals
-    retry_strategy = Retry(
-        total=10,  # increased number of retries
-        backoff_factor=0.1,  # shorter wait times between retries
-        status_forcelist=[500, 502, 503, 504],
-        allowed_methods=["GET", "POST"]  # Allow retries on both GET and POST
-    )
-
-    # Create session with retry strategy
-    session = requests.Session()
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-
-    api_url = "http://127.0.0.1:8002"  # Using 127.0.0.1 instead of 0.0.0.0
-
+def ingest_document_api_cached(file_bytes: bytes, filename: str, content_type: str,
+                               collection: str = DEFAULT_COLLECTION):
+    """Upload a file to the FastAPI service, which extracts, embeds and stores it."""
     try:
-        # Wait for FastAPI server to be ready
-        logger.info("Checking FastAPI service availability...")
-        for attempt in range(10):  # More attempts with shorter waits
-            try:
-                health_check = session.get(f"{api_url}/health", timeout=2)
-                if health_check.status_code == 200:
-                    logger.info("FastAPI service is healthy")
-                    break
-                logger.warning(f"Health check attempt {attempt + 1} failed with status {health_check.status_code}")
-                time.sleep(0.5)  # Shorter sleep between attempts
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Health check attempt {attempt + 1} failed: {str(e)}")
-                if attempt == 9:  # Last attempt
-                    raise Exception("Document processing service is not available")
-                time.sleep(0.5)
-
-        # Process document
-        logger.info(f"Processing document: {source_name}")
-        response = session.post(
-            f"{api_url}/process-document",
-            json={"text": text, "source_name": source_name},
+        # Pooled keep-alive connection; health is tracked in the background, not per upload
+        logger.info(f"Uploading document: {filename}")
+        response = get_service_client(API_URL).request(
+            "POST",
+            "/ingest",
+            files={"file": (filename, file_bytes, content_type)},
+            data={"collection": collection},
             timeout=300  # 5 minutes timeout for large documents
         )
 
@@ -160,41 +150,6 @@ def process_document_api_cached(text: str, source_name: str):
     except Exception as e:
         logger.error(f"Document processing error: {str(e)}", exc_info=True)
         raise Exception(f"Failed to process document: {str(e)}")
-    finally:
-        session.close()
-
-def read_file(uploaded_file):
-    """Read uploaded file based on its type."""
-    try:
-        if uploaded_file.type == "application/pdf":
-            return read_pdf(uploaded_file)
-        else:
-            return uploaded_file.getvalue().decode('utf-8')
-    except Exception as e:
-        st.error(f"Error reading file: {str(e)}")
-        return None
-
-def read_pdf(file):
-    """Read and extract text from PDF file."""
-    try:
-        logger.info(f"Processing PDF file: {file.name}")
-        pdf_bytes = file.getvalue()
-        text = st.session_state.pdf_processor.extract_text(pdf_bytes)
-
-        if not text:
-            raise ValueError("No text could be extracted from the PDF")
-
-        logger.info(f"Successfully extracted text from PDF: {file.name}")
-        return text
-    except Exception as e:
-        logger.error(f"Error reading PDF: {str(e)}")
-        if "stream" in str(e).lower():
-            st.error("Error: This PDF file appears to be corrupted or in an unsupported format.")
-        elif "password" in str(e).lower():
-            st.error("Error: This PDF file is password-protected. Please provide an unprotected file.")
-        else:
-            st.error(f"Error reading PDF: {str(e)}")
-        return None
 
 def format_time(seconds):
     """Format time duration in a human-readable format."""
@@ -207,64 +162,136 @@ def format_time(seconds):
         hours = seconds / 3600
         return f"{hours:.1f} hours"
 
+def process_files_batch(files):
+    """Upload files concurrently, updating each file's status as it finishes."""
+    files_by_name = {f.name: f for f in files}
+    progress_bar = st.progress(0, text=f"Processing {len(files)} documents...")
+    rows = {f.name: st.empty() for f in files}
+    for name, row in rows.items():
+        row.info(f"⏳ Queued: {name}")
+    finished = []
+
+    def on_start(name):
+        rows[name].info(f"🔄 Processing: {name}")
+
+    def on_done(name, result, error):
+        finished.append(name)
+        if error is not None:
+            rows[name].error(f"❌ {name}: {error}")
+        else:
+            stats = result["processing_stats"]
+            rows[name].success(
+                f"✅ {name}: {stats['total_chunks']:,} chunks in {format_time(stats['processing_time'])}"
+            )
+            # The service has already stored it; later reruns must not upload it again
+            st.session_state.uploaded_files.add(name)
+        progress_bar.progress(len(finished) / len(files), text=f"Processed {len(finished)} of {len(files)} documents")
+
+    items = [(name, f.getvalue(), f.type) for name, f in files_by_name.items()]
+    try:
+        with span("frontend.batch_ingest", files=len(items)):
+            asyncio.run(ingest_files(items, st.session_state.collection, on_start=on_start, on_done=on_done))
+    except Exception as e:
+        st.error(f"Batch processing failed: {str(e)}")
+        logger.error(f"Batch processing failed: {str(e)}", exc_info=True)
+
 def process_uploaded_files(uploaded_files):
-    """Process the uploaded files using synchronous API calls."""
+    """Process the uploaded files, concurrently when batch processing is enabled."""
+    stored_sources = {doc["source"] for doc in st.session_state.vector_store.list_documents()}
+    for f in uploaded_files:
+        if f.name in stored_sources:
+            # Already ingested by this or another session
+            st.session_state.uploaded_files.add(f.name)
+
     new_files = [f for f in uploaded_files if f.name not in st.session_state.uploaded_files]
     if not new_files:
         return
 
+    if st.session_state.batch_processing and len(new_files) > 1:
+        process_files_batch(new_files)
+        return
+
     progress_placeholder = st.empty()
     progress_bar = progress_placeholder.progress(0)
     files_processed = 0
 
     for file in new_files:
-        text = read_file(file)
-        if text:
-            try:
-                with st.status(f"📄 Processing {file.name}...", expanded=True) as status:
-                    total_words = len(text.split())
-                    status.markdown(f"""
-                    - Document: {file.name}
-                    - Size: {total_words:,} words
-                    - Estimated time: {format_time(total_words / 2000)}
-                    """)
-
-                    # Show processing spinner
-                    with st.spinner('🔄 Processing document...'):
-                        # Process document
-                        result = process_document_api_cached(text, file.name)
-
-                    # Show embedding spinner
-                    with st.spinner('🧠 Adding to knowledge base...'):
-                        # Update vector store
-                        st.session_state.vector_store.add_documents(
-                            [chunk["text"] for chunk in result["chunks"]],
-                            result["embeddings"],
-                            file.name
+        try:
+            with st.status(f"📄 Processing {file.name}...", expanded=True) as status:
+                status.markdown(f"""
+                - Document: {file.name}
+                - Size: {file.size / 1024 ** 2:.1f} MB
+                """)
+
+                # Show processing spinner
+                with st.spinner('🔄 Processing document...'):
+                    # Upload the file; the service extracts it and adds it to the shared store
+                    with span("frontend.ingest", filename=file.name):
+                        result = ingest_document_api_cached(
+                            file.getvalue(), file.name, file.type, st.session_state.collection
                         )
 
-                    # Display processing stats
-                    stats = result["processing_stats"]
-                    status.markdown(f"""
-                    ✅ Processing complete!
-                    - Time taken: {format_time(stats['processing_time'])}
-                    - Chunks created: {stats['total_chunks']:,}
-                    - Average chunk size: {int(stats['avg_chunk_size']):,} words
-                    """)
+                # Display processing stats
+                stats = result["processing_stats"]
+                status.markdown(f"""
+                ✅ Processing complete!
+                - Time taken: {format_time(stats['processing_time'])}
+                - Chunks created: {stats['total_chunks']:,}
+                - Average chunk size: {int(stats['avg_chunk_size']):,} words
+                - Total tokens: {stats.get('total_tokens', 0):,}
+                """)
 
-                    # Update progress bar
-                    files_processed += 1
-                    progress = files_processed / len(new_files)
-                    progress_bar.progress(progress)
+                # Update progress bar
+                files_processed += 1
+                progress = files_processed / len(new_files)
+                progress_bar.progress(progress)
 
-                    if progress == 1.0:
-                        progress_placeholder.empty()
+                if progress == 1.0:
+                    progress_placeholder.empty()
 
-                    st.session_state.uploaded_files.add(file.name)
+                st.session_state.uploaded_files.add(file.name)
 
-            except Exception as e:
-                st.error(f"Error processing {file.name}: {str(e)}")
-                logger.error(f"Error processing {file.name}: {str(e)}", exc_info=True)
+        except Exception as e:
+            st.error(f"Error processing {file.name}: {str(e)}")
+            logger.error(f"Error processing {file.name}: {str(e)}", exc_info=True)
+
+def fetch_service_metrics():
+    """Metrics snapshot from the API service, or None if it cannot be reached."""
+    try:
+        response = get_service_client(API_URL).request("GET", "/metrics", params={"format": "json"}, timeout=5)
+        return response.json() if response.status_code == 200 else None
+    except Exception as e:
+        logger.warning(f"Could not fetch service metrics: {str(e)}")
+        return None
+
+def snapshot_worker(snapshot):
+    """The API worker a metrics snapshot came from; each worker reports only its own."""
+    for series_list in (snapshot or {}).values():
+        for series in series_list:
+            if "worker" in series["labels"]:
+                return series["labels"]["worker"]
+    return None
+
+def render_stage_timings(title, snapshot):
+    """Show per-stage timings from a metrics snapshot, slowest total first."""
+    stages = (snapshot or {}).get("rag_stage_duration_seconds", [])
+    if not stages:
+        return
+    st.caption(title)
+    st.dataframe(
+        [
+            {
+                "Stage": f"{s['labels'].get('component')} · {s['labels'].get('stage')}",
+                "Calls": s["count"],
+                "Mean (ms)": round(s["mean"] * 1000, 1),
+                "p95 (ms)": round(s["p95"] * 1000, 1),
+                "Total (s)": round(s["sum"], 2)
+            }
+            for s in sorted(stages, key=lambda s: s["sum"], reverse=True)
+        ],
+        hide_index=True,
+        use_container_width=True
+    )
 
 def render_sidebar():
     """Render the sidebar with navigation and settings."""
@@ -283,6 +310,17 @@ def render_sidebar():
 
         # Settings
         st.subheader("Settings")
+        collection = st.text_input(
+            "Collection",
+            value=st.session_state.collection,
+            help="Documents and cached answers are kept separate per collection"
+        ).strip() or DEFAULT_COLLECTION
+        try:
+            select_collection(validate_collection_name(collection))
+        except ValueError as e:
+            # Keep the current collection rather than creating a store or cache for a bad name
+            st.error(str(e))
+
         st.session_state.batch_processing = st.toggle(
             "Enable Batch Processing",
             value=st.session_state.get('batch_processing', False),
@@ -292,11 +330,38 @@ def render_sidebar():
         # System Status
         st.markdown("---")
         st.subheader("System Status")
-        st.info(f"Documents Loaded: {len(st.session_state.uploaded_files)}")
+        if get_service_client(API_URL).healthy is False:
+            st.warning("Document service unavailable")
+        else:
+            try:
+                documents = st.session_state.vector_store.list_documents()
+                st.info(f"Documents Loaded: {len(documents)}")
+            except Exception as e:
+                logger.warning(f"Could not fetch document list: {str(e)}")
+                st.warning("Document service unavailable")
+
+        cache_stats = st.session_state.rag_engine.get_cache_stats()
+        if cache_stats["hits"] + cache_stats["misses"]:
+            st.caption(
+                f"Semantic cache: {cache_stats['hit_rate']:.0%} hit rate "
+                f"({cache_stats['hits']} hits, {cache_stats['entries']} answers cached)"
+            )
+
+        with st.expander("⏱️ Performance", expanded=False):
+            # Ingest runs in the service; queries run in this Streamlit process. With
+            # several API workers the request lands on one of them, so name which
+            service_metrics = fetch_service_metrics()
+            worker = snapshot_worker(service_metrics)
+            render_stage_timings(
+                f"Document service (worker {worker} only)" if worker is not None else "Document service",
+                service_metrics
+            )
+            render_stage_timings("Queries (this app)", REGISTRY.snapshot())
 
         if st.button("🗑️ Clear All Documents", use_container_width=True):
             st.session_state.vector_store.clear()
             st.session_state.uploaded_files.clear()
+            ingest_document_api_cached.clear()
             st.success("System cleared successfully!")
             st.experimental_rerun()
 
@@ -334,14 +399,15 @@ def render_qa_section():
     """Render the Q&A section."""
     st.header("❓ Ask Questions")
 
-    if not st.session_state.vector_store.chunks:
+    documents = st.session_state.vector_store.list_documents()
+    if not documents:
         st.warning("⚠️ Please upload at least one document before asking questions.")
         return
 
     # Display loaded documents
     with st.expander("📚 Available Documents", expanded=False):
-        for doc in st.session_state.uploaded_files:
-            st.write(f"📄 {doc}")
+        for doc in documents:
+            st.write(f"📄 {doc['source']}")
 
     # Question input
     query = st.text_input(
@@ -355,28 +421,35 @@ def render_qa_section():
             st.warning("Please enter a question.")
             return
 
-        # Show animated progress during processing
-        with st.spinner("🤔 Analyzing documents..."):
-            try:
-                result = st.session_state.rag_engine.process_query(query)
-
-                # Display response in a nice format
-                st.markdown("### 📝 Answer")
-                st.markdown(result["response"])
-
-                # Show relevant contexts in an expander
-                with st.expander("🔍 Relevant Contexts", expanded=False):
-                    for idx, chunk in enumerate(result["context"], 1):
-                        with st.container():
-                            st.markdown(f"**Source {idx}:** {chunk['source']}")
-                            st.markdown(f"**Relevance Score:** {chunk['score']:.2f}")
-                            st.markdown("**Context:**")
-                            st.markdown(f">{chunk['text']}")
-                            st.markdown("---")
-
-            except Exception as e:
-                st.error(f"Error generating answer: {str(e)}")
-                logger.error(f"Error generating answer: {str(e)}", exc_info=True)
+        try:
+            contexts = []
+
+            # Stream the answer as it is generated instead of waiting for all of it
+            st.markdown("### 📝 Answer")
+            with st.spinner("🤔 Analyzing documents..."), span("frontend.query"):
+                # The generator picks up frontend.query as its parent on the first next()
+                stream = st.session_state.rag_engine.stream_query(query, on_context=contexts.extend)
+                first_token = next(stream, "")
+
+            def answer_tokens():
+                yield first_token
+                yield from stream
+
+            st.write_stream(answer_tokens())
+
+            # Show relevant contexts in an expander
+            with st.expander("🔍 Relevant Contexts", expanded=False):
+                for idx, chunk in enumerate(contexts, 1):
+                    with st.container():
+                        st.markdown(f"**Source {idx}:** {chunk['source']}")
+                        st.markdown(f"**Relevance Score:** {chunk['score']:.2f}")
+                        st.markdown("**Context:**")
+                        st.markdown(f">{chunk['text']}")
+                        st.markdown("---")
+
+        except Exception as e:
+            st.error(f"Error generating answer: {str(e)}")
+            logger.error(f"Error generating answer: {str(e)}", exc_info=True)
 
 def main():
     """Main entry point for the Streamlit application."""
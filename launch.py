@@ -1,52 +1,249 @@
+import argparse
+import http.client
+import os
+import select
+import signal
+import socket
 import subprocess
 import sys
+import threading
 import time
-import os
+from typing import Dict, List, Optional
+from backend.config import (
+    API_PORT,
+    API_WORKERS,
+    FRONTEND_PORT,
+    LAUNCH_READY_TIMEOUT,
+    LAUNCH_DRAIN_TIMEOUT,
+    LAUNCH_MAX_RESTART_DELAY,
+    LAUNCH_LISTEN_FD,
+    LAUNCH_READY_FD,
+    LAUNCH_WORKER_INDEX
+)
 
-def launch_services():
-    # Get the project root directory and add to PYTHONPATH
-    project_root = os.path.dirname(os.path.abspath(__file__))
-    os.environ["PYTHONPATH"] = project_root
-    
-    try:
-        # Start FastAPI backend
-        backend_process = subprocess.Popen(
-            [sys.executable, "backend/api/document_processor_service.py"],
-            cwd=project_root,
-            env={**os.environ, "PYTHONPATH": project_root}
-        )
-        print("Started FastAPI backend service on http://localhost:8002")
-        
-        # Give the backend a moment to start
-        time.sleep(2)
-        
-        # Start Streamlit frontend with specific port and host
-        frontend_process = subprocess.Popen(
-            [
-                sys.executable,
-                "-m", "streamlit",
-                "run", "frontend/main.py",
-                "--server.port=5000",
-                "--server.address=0.0.0.0",
-                "--browser.serverAddress=localhost",
-                "--server.headless=true"
-            ],
-            cwd=project_root,
-            env={**os.environ, "PYTHONPATH": project_root}
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+SERVICE_SCRIPT = os.path.join("backend", "api", "document_processor_service.py")
+STABLE_SECONDS = 30  # A worker that ran this long is no longer crash-looping
+
+class Worker:
+    """One API worker process and the pipe it reports readiness on."""
+
+    def __init__(self, index: int, process: subprocess.Popen, ready_fd: int):
+        self.index = index
+        self.process = process
+        self.ready_fd = ready_fd
+        self.ready = False
+        self.started = time.monotonic()
+
+    def mark_ready(self):
+        self.ready = True
+        self._close_pipe()
+
+    def _close_pipe(self):
+        if self.ready_fd is not None:
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+class Supervisor:
+    """Runs API workers on one pre-bound port, restarting crashed ones, then the frontend.
+
+    The supervisor binds the port once and hands the listening socket to each
+    worker, so the kernel balances connections between them and nothing has
+    to kill whatever held the port. Each worker writes to a pipe once it can
+    serve; the frontend starts after the first worker is ready and the health
+    endpoint answers.
+    """
+
+    def __init__(self, workers: int = API_WORKERS, port: int = API_PORT, host: str = "0.0.0.0",
+                 worker_command: Optional[List[str]] = None, frontend_command: Optional[List[str]] = None,
+                 ready_timeout: float = LAUNCH_READY_TIMEOUT, drain_timeout: float = LAUNCH_DRAIN_TIMEOUT,
+                 env: Optional[Dict[str, str]] = None):
+        self.num_workers = workers
+        self.port = port
+        self.host = host
+        self.worker_command = worker_command or [sys.executable, SERVICE_SCRIPT]
+        self.frontend_command = frontend_command
+        self.ready_timeout = ready_timeout
+        self.drain_timeout = drain_timeout
+        self.env = {**os.environ, "PYTHONPATH": PROJECT_ROOT, **(env or {})}
+        self.workers: Dict[int, Worker] = {}
+        self.frontend: Optional[subprocess.Popen] = None
+        self.sock: Optional[socket.socket] = None
+        self.restarts = 0
+        self._crashes: Dict[int, int] = {}
+        self._restart_at: Dict[int, float] = {}
+        self._stopping = threading.Event()
+
+    def bind(self) -> socket.socket:
+        """Bind and listen once; workers inherit this socket instead of binding themselves."""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((self.host, self.port))
+        except OSError as e:
+            sock.close()
+            raise RuntimeError(f"Port {self.port} is in use; stop the other service or set PORT ({e})")
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        self.sock = sock
+        self.port = sock.getsockname()[1]
+        return sock
+
+    def spawn(self, index: int) -> Worker:
+        read_fd, write_fd = os.pipe()
+        env = {
+            **self.env, LAUNCH_LISTEN_FD: str(self.sock.fileno()), LAUNCH_READY_FD: str(write_fd),
+            LAUNCH_WORKER_INDEX: str(index)
+        }
+        process = subprocess.Popen(
+            self.worker_command, cwd=PROJECT_ROOT, env=env, pass_fds=(self.sock.fileno(), write_fd)
         )
-        print("Started Streamlit frontend on http://localhost:5000")
-        
-        # Keep the script running
-        frontend_process.wait()
-        
-    except KeyboardInterrupt:
-        print("\nShutting down services...")
-        frontend_process.terminate()
-        backend_process.terminate()
-        sys.exit(0)
+        os.close(write_fd)
+        worker = self.workers[index] = Worker(index, process, read_fd)
+        print(f"Started API worker {index} (pid {process.pid})")
+        return worker
+
+    def poll_ready(self, timeout: float) -> List[Worker]:
+        """Wait up to timeout for pending workers to report ready; returns those that did."""
+        pending = {w.ready_fd: w for w in self.workers.values() if not w.ready and w.ready_fd is not None}
+        if not pending:
+            return []
+        readable, _, _ = select.select(list(pending), [], [], timeout)
+        ready = []
+        for fd in readable:
+            worker = pending[fd]
+            if os.read(fd, 64):
+                worker.mark_ready()
+                ready.append(worker)
+                print(f"API worker {worker.index} ready in {time.monotonic() - worker.started:.1f}s")
+            else:
+                # EOF without a message: the worker exited during startup
+                worker._close_pipe()
+        return ready
+
+    def wait_ready(self) -> bool:
+        """Block until at least one worker is ready and /health answers, or the timeout passes."""
+        deadline = time.monotonic() + self.ready_timeout
+        while not self._stopping.is_set() and time.monotonic() < deadline:
+            self.poll_ready(0.2)
+            self.check_workers()
+            if any(w.ready for w in self.workers.values()) and self.healthy():
+                return True
+        return False
+
+    def healthy(self) -> bool:
+        connection = http.client.HTTPConnection("127.0.0.1", self.port, timeout=5)
+        try:
+            connection.request("GET", "/health")
+            return connection.getresponse().status == 200
+        except OSError:
+            return False
+        finally:
+            connection.close()
+
+    def check_workers(self):
+        """Restart exited workers, backing off exponentially while one keeps crashing."""
+        now = time.monotonic()
+        for index, worker in list(self.workers.items()):
+            code = worker.process.poll()
+            if code is None or self._stopping.is_set():
+                continue
+            if index not in self._restart_at:
+                worker._close_pipe()
+                crashes = 0 if now - worker.started > STABLE_SECONDS else self._crashes.get(index, 0)
+                self._crashes[index] = crashes + 1
+                delay = min(LAUNCH_MAX_RESTART_DELAY, 2 ** crashes - 1)
+                self._restart_at[index] = now + delay
+                print(f"API worker {index} exited with {code}; restarting in {delay:.0f}s")
+            if now >= self._restart_at[index]:
+                del self._restart_at[index]
+                self.restarts += 1
+                self.spawn(index)
+
+    def start(self):
+        self.bind()
+        for index in range(self.num_workers):
+            self.spawn(index)
+
+    def start_frontend(self):
+        if self.frontend_command:
+            self.frontend = subprocess.Popen(self.frontend_command, cwd=PROJECT_ROOT, env=self.env)
+
+    def run(self):
+        """Start everything and supervise until a signal arrives or the frontend exits."""
+        self.start()
+        try:
+            if not self.wait_ready():
+                if not self._stopping.is_set():
+                    raise RuntimeError(f"No API worker became ready within {self.ready_timeout:.0f}s")
+                return
+            print(f"API service ready on http://localhost:{self.port} ({self.num_workers} workers)")
+            self.start_frontend()
+            if self.frontend:
+                print(f"Started Streamlit frontend on http://localhost:{FRONTEND_PORT}")
+            while not self._stopping.wait(0.5):
+                self.poll_ready(0)
+                self.check_workers()
+                if self.frontend and self.frontend.poll() is not None:
+                    print("Frontend exited; shutting down")
+                    break
+        finally:
+            self.shutdown()
+
+    def stop(self, *args):
+        self._stopping.set()
+
+    def shutdown(self):
+        """Stop the frontend, then let workers finish in-flight requests before exiting."""
+        self._stopping.set()
+        if self.frontend and self.frontend.poll() is None:
+            self.frontend.terminate()
+            _wait_or_kill(self.frontend, 10)
+        if self.sock:
+            # Workers keep their copies of the socket until they finish draining
+            self.sock.close()
+            self.sock = None
+        for worker in self.workers.values():
+            worker._close_pipe()
+            if worker.process.poll() is None:
+                worker.process.send_signal(signal.SIGTERM)
+        deadline = time.monotonic() + self.drain_timeout + 5
+        for worker in self.workers.values():
+            _wait_or_kill(worker.process, max(0.0, deadline - time.monotonic()))
+
+def _wait_or_kill(process: subprocess.Popen, timeout: float):
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def frontend_command() -> List[str]:
+    return [
+        sys.executable,
+        "-m", "streamlit",
+        "run", "frontend/main.py",
+        f"--server.port={FRONTEND_PORT}",
+        "--server.address=0.0.0.0",
+        "--browser.serverAddress=localhost",
+        "--server.headless=true"
+    ]
+
+def launch_services(profiling: bool = False, workers: int = API_WORKERS):
+    env = {"PROFILING_ENABLED": "1"} if profiling else {}
+    supervisor = Supervisor(workers=workers, frontend_command=frontend_command(), env=env)
+    signal.signal(signal.SIGINT, supervisor.stop)
+    signal.signal(signal.SIGTERM, supervisor.stop)
+    try:
+        supervisor.run()
+        print("\nServices stopped")
     except Exception as e:
         print(f"Error launching services: {e}")
         sys.exit(1)
 
 if __name__ == "__main__":
-    launch_services()
+    parser = argparse.ArgumentParser(description="Start the API service and the Streamlit frontend")
+    parser.add_argument("--profiling", action="store_true", help="Enable the sampling profiler endpoint")
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="API worker processes sharing the port")
+    args = parser.parse_args()
+    launch_services(args.profiling, args.workers)